@@ -44,6 +44,9 @@ setuptools.setup(
         "tensorboard_plugins": [
             "torch_profiler = torch_tb_profiler.plugin:TorchProfilerPlugin",
         ],
+        "console_scripts": [
+            "torch-tb-profiler = torch_tb_profiler.cli:main",
+        ],
     },
     python_requires=">= 2.7, != 3.0.*, != 3.1.*",
     install_requires=INSTALL_REQUIRED,
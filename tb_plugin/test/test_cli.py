@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from torch_tb_profiler import cli
+from torch_tb_profiler.exporter import EXPORT_TABLES, MANIFEST_FILE_NAME, Exporter
+
+
+def write_trace(run_dir, op_dur):
+    events = [{"ph": "X", "cat": "Operator", "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+               "ts": 100, "dur": op_dur + 100, "args": {"Input dims": [], "External id": 1}},
+              {"ph": "X", "cat": "Operator", "name": "aten::mm", "pid": 13721, "tid": "123",
+               "ts": 110, "dur": op_dur, "args": {"Input dims": [[2, 3], [3, 4]], "External id": 2}}]
+    os.makedirs(run_dir)
+    with open(os.path.join(run_dir, "worker0.pt.trace.json"), "w") as f:
+        json.dump(events, f)
+
+
+class TestCli(unittest.TestCase):
+    def test_export_and_compare(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            base_dir = os.path.join(tmp_dir, "base")
+            exp_dir = os.path.join(tmp_dir, "exp")
+            output_dir = os.path.join(tmp_dir, "output")
+            write_trace(base_dir, 100)
+            write_trace(exp_dir, 200)
+
+            self.assertEqual(cli.main([exp_dir, "-o", output_dir, "--format", "csv"]), 0)
+            worker_dir = os.path.join(output_dir, "exp", "worker0")
+            self.assertTrue(os.path.isfile(os.path.join(worker_dir, "overview.csv")))
+            with open(os.path.join(worker_dir, "operators.csv")) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(lines[0], "Name,Calls,Host Self Duration (us),Host Total Duration (us)")
+            self.assertEqual(lines[1], "aten::mm,1,200,200")
+
+            # The step time grows from 200us to 300us.
+            self.assertEqual(cli.main([exp_dir, "--compare", base_dir, "--workers", "2"]), cli.EXIT_REGRESSION)
+            self.assertEqual(cli.main([exp_dir, "--compare", base_dir, "--step-time-threshold", "60"]), 0)
+            self.assertEqual(cli.main([exp_dir, "--compare", base_dir, "--step-time-threshold", "60",
+                                       "--op-threshold", "50"]), cli.EXIT_REGRESSION)
+            self.assertEqual(cli.main([os.path.join(tmp_dir, "missing")]), cli.EXIT_ERROR)
+
+    def test_compare_errors(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            base_logdir = os.path.join(tmp_dir, "base")
+            exp_logdir = os.path.join(tmp_dir, "exp")
+            for name in ["run1", "run2"]:
+                write_trace(os.path.join(base_logdir, "base_" + name), 100)
+                write_trace(os.path.join(exp_logdir, name), 100)
+
+            # No run name matches the baseline, so nothing is compared.
+            self.assertEqual(cli.main([exp_logdir, "--compare", base_logdir]), cli.EXIT_ERROR)
+
+            # A run failing to load isn't taken as a regression.
+            with mock.patch.object(cli.RunLoader, "load", side_effect=RuntimeError("bad trace")):
+                self.assertEqual(cli.main([exp_logdir, "--compare", base_logdir]), cli.EXIT_ERROR)
+            with open(os.path.join(exp_logdir, "run1", "worker0.pt.trace.json"), "w") as f:
+                f.write("[{")
+            self.assertEqual(cli.main([exp_logdir]), cli.EXIT_ERROR)
+
+    def test_export_incremental(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            logdir = os.path.join(tmp_dir, "logs")
+            export_dir = os.path.join(tmp_dir, "export")
+            write_trace(os.path.join(logdir, "run1"), 100)
+
+            exporter = Exporter(export_dir, "csv")
+            self.assertEqual(len(exporter.export(logdir, "job1")), 1)
+            ops_dir = os.path.join(export_dir, "ops", "job=job1", "run=run1", "worker=worker0")
+            files = os.listdir(ops_dir)
+            self.assertEqual(len(files), 1)
+            with open(os.path.join(ops_dir, files[0])) as f:
+                lines = f.read().splitlines()
+            self.assertTrue(lines[0].startswith("job,run,worker,fingerprint,name,input_shape,calls"))
+            self.assertTrue(lines[1].startswith("job1,run1,worker0,"))
+            for table in EXPORT_TABLES:
+                self.assertTrue(os.path.isdir(os.path.join(export_dir, table, "job=job1", "run=run1")))
+
+            # The unchanged trace is skipped, and the new one is appended.
+            write_trace(os.path.join(logdir, "run2"), 200)
+            exported = exporter.export(logdir, "job1")
+            self.assertEqual([entry["run"] for entry in exported], ["run2"])
+            self.assertEqual(exporter.skipped, [("job1", "run1", "worker0")])
+
+            # The changed trace replaces the files of its previous version.
+            with open(os.path.join(logdir, "run1", "worker0.pt.trace.json"), "a") as f:
+                f.write("\n")
+            self.assertEqual(cli.main([logdir, "--export", export_dir, "--export-format", "csv", "--job", "job1"]), 0)
+            new_files = os.listdir(ops_dir)
+            self.assertEqual(len(new_files), 1)
+            self.assertNotEqual(new_files, files)
+            with open(os.path.join(export_dir, MANIFEST_FILE_NAME)) as f:
+                self.assertEqual(len(json.load(f)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,26 @@
+import copy
 import json
+import os
+import tempfile
+import threading
 import unittest
 
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
 import torch_tb_profiler.profiler.trace as trace
+from torch_tb_profiler import api, consts
+from torch_tb_profiler.plugin import TorchProfilerPlugin
 from torch_tb_profiler.profiler.data import RunProfileData
+from torch_tb_profiler.profiler.kernel_name import KernelNameNormalizer
+from torch_tb_profiler.profiler.overall_parser import COST_CATEGORIES, COSTS_DISPLAY_NAMES
+from torch_tb_profiler.profiler.run_generator import RunGenerator, generate_run_diff, generate_trend
+from torch_tb_profiler.profiler.rules import Rule, RuleEngine, discover_rules, SEVERITY_HIGH, SEVERITY_LOW
+from torch_tb_profiler.profiler.rules.builtin import CommunicationRule, StragglerRule, SynchronizationRule
+from torch_tb_profiler.profiler.steady_state import StepsConfig, detect_tail_steps, detect_warmup_steps
+from torch_tb_profiler.profiler.step_skew_parser import StepSkewParser
+from torch_tb_profiler.profiler.trend import RunSummary, SummaryCache
+from torch_tb_profiler.run import Run
 
 SCHEMA_VERSION = 1
 WORKER_NAME = "worker0"
@@ -895,6 +913,1423 @@ class TestProfiler(unittest.TestCase):
         self.assertEqual(step.other_cost, 100 - 40)
         self.assertEqual(step.step_total_cost, 100)
 
+    # Test launch configuration and occupancy of kernels are aggregated by kernel name.
+    def test_kernel_launch_config(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 200,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 120, "dur": 10,
+            "args": {"correlation": 1, "external id": 1, "registers per thread": 128, "shared memory": 1024,
+                     "blocks per SM": 0.5, "est. achieved occupancy %": 10, "grid": [40, 1, 1], "block": [256, 1, 1]}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 140, "dur": 30,
+            "args": {"correlation": 2, "external id": 1, "registers per thread": 128, "shared memory": 1024,
+                     "blocks per SM": 0.25, "est. achieved occupancy %": 30, "grid": [20, 1, 1], "block": [256, 1, 1]}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 180, "dur": 10,
+            "args": {"correlation": 3, "external id": 1, "registers per thread": 128, "shared memory": 1024,
+                     "blocks per SM": 0.25, "est. achieved occupancy %": 10, "grid": [20, 1, 1], "block": [256, 1, 1]}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+        profile.analyze()
+
+        self.assertEqual(profile.kernel_stat.shape[0], 1)
+        stat = profile.kernel_stat.iloc[0]
+        self.assertEqual(stat["count"], 3)
+        self.assertEqual(stat["registers_per_thread"], 128)
+        self.assertEqual(stat["shared_memory"], 1024)
+        self.assertAlmostEqual(stat["blocks_per_sm"], (0.5 * 10 + 0.25 * 30 + 0.25 * 10) / 50)
+        self.assertAlmostEqual(stat["occupancy"], (10 * 10 + 30 * 30 + 10 * 10) / 50)
+        self.assertEqual(stat["min_occupancy"], 10)
+        self.assertEqual(stat["occupancy_p50"], 10)
+        self.assertAlmostEqual(stat["occupancy_p90"], 26)
+        self.assertEqual(stat["blocks_per_sm_p50"], 0.25)
+        self.assertAlmostEqual(stat["blocks_per_sm_p90"], 0.45)
+        self.assertEqual(stat["grid"], "[20, 1, 1]")
+        self.assertEqual(stat["grid_count"], 2)
+        self.assertEqual(stat["block"], "[256, 1, 1]")
+        self.assertEqual(len([text for text in profile.recommendations if "low occupancy" in text]), 1)
+
+    # Test Tensor Cores usage of kernels is attributed to the operators launching them.
+    def test_tensor_cores(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "aten::addmm", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 100,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 10,
+            "args": {"correlation": 1, "external id": 1}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_h884gemm_64x64_ldg8_nn", "pid": 0, "tid": "stream 7",
+            "ts": 130, "dur": 30,
+            "args": {"correlation": 1, "external id": 1}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 130, "dur": 10,
+            "args": {"correlation": 2, "external id": 1}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "void splitKreduce_kernel<float, float, float>", "pid": 0, "tid": "stream 7",
+            "ts": 160, "dur": 10,
+            "args": {"correlation": 2, "external id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::add", "pid": 13721, "tid": "123",
+            "ts": 200, "dur": 50,
+            "args": {"Input dims": [], "External id": 2}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 210, "dur": 10,
+            "args": {"correlation": 3, "external id": 2}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "void at::native::vectorized_elementwise_kernel<4, at::native::AddFunctor<float> >", "pid": 0,
+            "tid": "stream 7",
+            "ts": 230, "dur": 10,
+            "args": {"correlation": 3, "external id": 2}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        op_count = 0
+        for op_agg in profile.op_list_groupby_name:
+            if op_agg.name == "aten::addmm":
+                op_count += 1
+                self.assertTrue(op_agg.tc_eligible)
+                self.assertEqual(op_agg.tc_self_device_duration, 30)
+                self.assertAlmostEqual(op_agg.tc_self_ratio, 30 / 40)
+            if op_agg.name == "aten::add":
+                op_count += 1
+                self.assertFalse(op_agg.tc_eligible)
+                self.assertEqual(op_agg.tc_self_device_duration, 0)
+        self.assertEqual(op_count, 2)
+        self.assertAlmostEqual(profile.tc_ratio, 30 / 50)
+        self.assertAlmostEqual(profile.tc_eligible_ratio, 30 / 40)
+
+        profile.analyze()
+        run_profile = RunGenerator(WORKER_NAME, profile).generate_run_profile()
+        gpu_metrics = {item["title"]: item["value"] for item in run_profile.overview["gpu_metrics"]}
+        self.assertEqual(gpu_metrics["Kernel Time Using Tensor Cores"], "60.0 %")
+        self.assertEqual(gpu_metrics["Kernel Time Using Tensor Cores in Eligible Operators"], "75.0 %")
+
+    # Test memory timeline and attribution of allocations to operators.
+    def test_memory(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "aten::empty", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 10,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::add", "pid": 13721, "tid": "123",
+            "ts": 200, "dur": 50,
+            "args": {"Input dims": [], "External id": 2}
+          },
+          {
+            "ph": "i", "cat": "cpu_instant_event", "s": "t", "name": "[memory]",
+            "pid": 13721, "tid": 123, "ts": 105,
+            "args": {"Device Type": 1, "Device Id": 0, "Addr": 1, "Bytes": 1000}
+          },
+          {
+            "ph": "i", "cat": "cpu_instant_event", "s": "t", "name": "[memory]",
+            "pid": 13721, "tid": 123, "ts": 210,
+            "args": {"Device Type": 1, "Device Id": 0, "Addr": 2, "Bytes": 500}
+          },
+          {
+            "ph": "i", "cat": "cpu_instant_event", "s": "t", "name": "[memory]",
+            "pid": 13721, "tid": 123, "ts": 260,
+            "args": {"Device Type": 1, "Device Id": 0, "Addr": 1, "Bytes": -1000}
+          },
+          {
+            "ph": "i", "cat": "cpu_instant_event", "s": "t", "name": "[memory]",
+            "pid": 13721, "tid": 123, "ts": 220,
+            "args": {"Device Type": 0, "Device Id": -1, "Addr": 3, "Bytes": 64}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        self.assertTrue(profile.has_memory)
+        self.assertEqual(profile.memory_devices, ["CPU", "GPU0"])
+        self.assertEqual(profile.memory_curves["GPU0"], [(105, 1000), (210, 1500), (260, 500)])
+        self.assertEqual(profile.memory_peaks["GPU0"], (210, 1500))
+        op_stats = {stats.name: stats for stats in profile.memory_op_stats["GPU0"]}
+        self.assertEqual(op_stats["aten::empty"].allocated_bytes, 1000)
+        self.assertEqual(op_stats["aten::empty"].peak_bytes, 1000)
+        self.assertEqual(op_stats["aten::add"].allocated_bytes, 500)
+        self.assertEqual(op_stats["aten::add"].peak_bytes, 500)
+        self.assertEqual(op_stats["N/A"].freed_bytes, 1000)
+        self.assertEqual(op_stats["N/A"].increase_bytes, -1000)
+        self.assertEqual(profile.memory_curves["CPU"], [(220, 64)])
+
+    # Test communication kernels are separated from computation kernels,
+    # and only the part not overlapped with computation is counted in step breakdown.
+    def test_communication(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 200,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 10,
+            "args": {"correlation": 1, "external id": 1}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 130, "dur": 50,
+            "args": {"correlation": 1, "external id": 1}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 120, "dur": 10,
+            "args": {"correlation": 2, "external id": 1}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "ncclAllReduceRingLLKernel_sum_f32(ncclColl)", "pid": 0, "tid": "stream 13",
+            "ts": 150, "dur": 100,
+            "args": {"correlation": 2, "external id": 1}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        self.assertTrue(profile.has_kernel)
+        self.assertTrue(profile.has_communication)
+        step = profile.steps_costs[0]
+        self.assertEqual(step.kernel_cost, 50)
+        self.assertEqual(step.communication_cost, 100)
+        self.assertEqual(step.exposed_communication_cost, 250 - 180)
+        self.assertEqual(step.runtime_cost, 20)
+        self.assertEqual(step.step_total_cost, 200)
+        self.assertEqual(step.other_cost, 200 - 50 - 70 - 20)
+
+        # The step categories and the display names of the costs are kept in sync with the Costs fields.
+        self.assertEqual(sum(getattr(step, field) for field, _ in COST_CATEGORIES), step.step_total_cost)
+        self.assertEqual([field for field, _ in COSTS_DISPLAY_NAMES], list(vars(step)))
+
+        self.assertEqual(len(CommunicationRule().check(profile)), 1)
+        # No finding, instead of ZeroDivisionError, without step time.
+        profile.avg_costs.step_total_cost = 0
+        self.assertEqual(CommunicationRule().check(profile), [])
+
+    # Test GPU utilization and concurrency with kernels running on multiple streams.
+    def test_gpu_metrics(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 200,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 120, "dur": 50,
+            "args": {"device": 0, "stream": 7, "correlation": 1, "external id": 1}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nt", "pid": 0, "tid": "stream 13",
+            "ts": 150, "dur": 50,
+            "args": {"device": 0, "stream": 13, "correlation": 2, "external id": 1}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        self.assertEqual(profile.gpu_devices, [0])
+        stats = profile.gpu_device_stats[0]
+        self.assertEqual(stats.total_time, 200)
+        self.assertEqual(stats.busy_time, 80)
+        self.assertEqual(stats.streams_busy_time, {7: 50, 13: 50})
+        self.assertAlmostEqual(stats.utilization, 0.4)
+        self.assertAlmostEqual(stats.concurrency, 1.25)
+        self.assertEqual(stats.idle_gaps_histogram, [0, 1, 1, 0, 0])
+        self.assertEqual(stats.idle_gaps_time, [0, 20, 100, 0, 0])
+
+        profile.analyze()
+        steps = RunGenerator(WORKER_NAME, profile).generate_run_profile().gpu_metrics["devices"][0]["steps"]
+        columns = [column["name"] for column in steps["columns"]]
+        self.assertEqual(columns[-5:], ["Idle Gaps <10us", "Idle Gaps 10us-100us", "Idle Gaps 100us-1ms",
+                                        "Idle Gaps 1ms-10ms", "Idle Gaps >=10ms"])
+        self.assertEqual(steps["rows"], [["1", 40.0, 1.25, 80, 120, 0, 1, 1, 0, 0]])
+
+    # Test launch latency and attributing GPU idle gaps to their causes.
+    def test_launch(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 300,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mul", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 90,
+            "args": {"Input dims": [], "External id": 2}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 120, "dur": 10,
+            "args": {"correlation": 1, "external id": 2}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "vectorized_elementwise_kernel", "pid": 0, "tid": "stream 7",
+            "ts": 150, "dur": 20,
+            "args": {"correlation": 1, "external id": 2}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaStreamSynchronize", "pid": 13721, "tid": "123",
+            "ts": 200, "dur": 60,
+            "args": {"correlation": 2, "external id": 0}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::add", "pid": 13721, "tid": "123",
+            "ts": 270, "dur": 30,
+            "args": {"Input dims": [], "External id": 3}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 280, "dur": 10,
+            "args": {"correlation": 3, "external id": 3}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "vectorized_elementwise_kernel", "pid": 0, "tid": "stream 7",
+            "ts": 300, "dur": 20,
+            "args": {"correlation": 3, "external id": 3}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        op_latency = {stats.name: stats for stats in profile.launch_op_latency_stats}
+        self.assertEqual(op_latency["aten::mul"].count, 1)
+        self.assertEqual(op_latency["aten::mul"].mean, 30)
+        self.assertEqual(op_latency["aten::add"].max, 20)
+        self.assertEqual(len(profile.launch_steps_latency_stats), 1)
+        step_latency = profile.launch_steps_latency_stats[0]
+        self.assertEqual(step_latency.count, 2)
+        self.assertEqual(step_latency.p50, 25)
+        self.assertEqual(step_latency.p90, 29)
+
+        self.assertEqual(profile.launch_idle_costs, {"Synchronization": 60, "Memcpy": 0, "DataLoader": 0,
+                                                     "CPU-bound Launch": 100, "Other": 100})
+        profile.analyze()
+        self.assertEqual(len([text for text in profile.recommendations if "launch-bound" in text]), 1)
+
+    # Test blocking synchronization calls are separated from runtime and aggregated by call stack.
+    def test_sync(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 200,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::item", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 60,
+            "args": {"Input dims": [], "External id": 2}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::_local_scalar_dense", "pid": 13721, "tid": "123",
+            "ts": 115, "dur": 50,
+            "args": {"Input dims": [], "External id": 3}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaMemcpyAsync", "pid": 13721, "tid": "123",
+            "ts": 120, "dur": 5,
+            "args": {"correlation": 1, "external id": 3}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaStreamSynchronize", "pid": 13721, "tid": "123",
+            "ts": 130, "dur": 30,
+            "args": {"correlation": 2, "external id": 3}
+          },
+          {
+            "ph": "X", "cat": "Memcpy",
+            "name": "Memcpy DtoH (Device -> Pageable)", "pid": 0, "tid": "stream 7",
+            "ts": 150, "dur": 5,
+            "args": {"correlation": 1, "external id": 3}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaDeviceSynchronize", "pid": 13721, "tid": "123",
+            "ts": 200, "dur": 20,
+            "args": {"correlation": 3, "external id": 0}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        self.assertTrue(profile.has_sync)
+        step = profile.steps_costs[0]
+        self.assertEqual(step.memcpy_cost, 5)
+        self.assertEqual(step.sync_cost, 45)
+        self.assertEqual(step.runtime_cost, 5)
+        self.assertEqual(profile.steps_sync_duration, [50])
+
+        self.assertEqual(len(profile.sync_points), 2)
+        top_point = profile.sync_points[0]
+        self.assertEqual(top_point.name, "cudaStreamSynchronize")
+        self.assertEqual(top_point.stack, ("aten::item", "aten::_local_scalar_dense"))
+        self.assertEqual(top_point.calls, 1)
+        self.assertEqual(top_point.total_duration, 30)
+        self.assertEqual(profile.sync_points[1].stack, ())
+
+        profile.analyze()
+        self.assertEqual(len([text for text in profile.recommendations if "synchronization" in text]), 1)
+
+        # The finding is still given without any sync point reachable from the operator trees.
+        profile.sync_points = []
+        findings = SynchronizationRule().check(profile)
+        self.assertEqual(len(findings), 1)
+        self.assertNotIn("most costly", findings[0].message)
+        # No finding, instead of ZeroDivisionError, without step time.
+        profile.avg_costs.step_total_cost = 0
+        self.assertEqual(SynchronizationRule().check(profile), [])
+
+    # Test the critical path goes through the host chain, launches and stream ordered kernels.
+    def test_critical_path(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 160,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 90,
+            "args": {"Input dims": [], "External id": 2}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 120, "dur": 10,
+            "args": {"correlation": 1, "external id": 2}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 150, "dur": 150,
+            "args": {"correlation": 1, "external id": 2}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::relu", "pid": 13721, "tid": "123",
+            "ts": 200, "dur": 50,
+            "args": {"Input dims": [], "External id": 3}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 210, "dur": 10,
+            "args": {"correlation": 2, "external id": 3}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "vectorized_elementwise_kernel", "pid": 0, "tid": "stream 7",
+            "ts": 300, "dur": 50,
+            "args": {"correlation": 2, "external id": 3}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        self.assertEqual(len(profile.critical_paths), 1)
+        critical_path = profile.critical_paths[0]
+        self.assertEqual(critical_path.length, 230)
+        self.assertEqual([(kind, name, op_name, dur) for kind, name, op_name, dur in critical_path.vertices],
+                         [("CPU", None, None, 20),
+                          ("Runtime", "cudaLaunchKernel", "aten::mm", 10),
+                          ("Kernel", "volta_sgemm_128x64_nn", "aten::mm", 150),
+                          ("Kernel", "vectorized_elementwise_kernel", "aten::relu", 50)])
+        self.assertEqual(critical_path.kind_costs, {"CPU": 20, "Runtime": 10, "Kernel": 200})
+        self.assertEqual(critical_path.op_costs, {"aten::mm": {"Runtime": 10, "Kernel": 150},
+                                                  "aten::relu": {"Kernel": 50}})
+        what_if = {(op_name, speedup): saved for op_name, speedup, saved in critical_path.what_if}
+        self.assertEqual(what_if[("aten::mm", 2)], 80)
+        self.assertEqual(what_if[("aten::relu", 2)], 25)
+
+    # Test the same call paths of different steps are merged in the aggregated call tree.
+    def test_call_tree(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 100,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 40,
+            "args": {"Input dims": [], "External id": 2}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 120, "dur": 10,
+            "args": {"correlation": 1, "external id": 2}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 130, "dur": 10,
+            "args": {"correlation": 1, "external id": 2}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#2", "pid": 13721, "tid": "123",
+            "ts": 200, "dur": 100,
+            "args": {"Input dims": [], "External id": 3}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 210, "dur": 40,
+            "args": {"Input dims": [], "External id": 4}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 220, "dur": 10,
+            "args": {"correlation": 2, "external id": 4}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 230, "dur": 10,
+            "args": {"correlation": 2, "external id": 4}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        root = profile.call_tree_nodes[0]
+        self.assertEqual(list(root.children.keys()), ["Thread 123"])
+        thread = root.children["Thread 123"]
+        self.assertEqual(thread.host_duration, 200)
+        self.assertEqual(thread.device_duration, 20)
+        self.assertEqual(list(thread.children.keys()), ["ProfilerStep#*"])
+        step = thread.children["ProfilerStep#*"]
+        self.assertEqual(step.calls, 2)
+        self.assertEqual(step.host_duration, 200)
+        self.assertEqual(step.self_host_duration, 120)
+        self.assertEqual(step.device_duration, 20)
+        self.assertEqual(step.self_device_duration, 0)
+        mm = step.children["aten::mm"]
+        self.assertEqual(mm.calls, 2)
+        self.assertEqual(mm.host_duration, 80)
+        self.assertEqual(mm.self_host_duration, 60)
+        self.assertEqual(mm.self_device_duration, 20)
+        launch = mm.children["cudaLaunchKernel"]
+        self.assertEqual(launch.calls, 2)
+        self.assertEqual(launch.host_duration, 20)
+        self.assertEqual(len(launch.children), 0)
+        self.assertEqual(len(profile.call_tree_nodes), 5)
+
+    # Test operators and kernels are attributed to the enclosing nn.Module path or Python function.
+    def test_module_attribution(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Python",
+            "name": "train.py(10): train_step", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 200,
+            "args": {}
+          },
+          {
+            "ph": "X", "cat": "Python",
+            "name": "nn.Module: Net_0", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 100,
+            "args": {}
+          },
+          {
+            "ph": "X", "cat": "Python",
+            "name": "nn.Module: Linear_0", "pid": 13721, "tid": "123",
+            "ts": 120, "dur": 80,
+            "args": {}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::addmm", "pid": 13721, "tid": "123",
+            "ts": 130, "dur": 60,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 140, "dur": 10,
+            "args": {"correlation": 1, "external id": 1}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 150, "dur": 30,
+            "args": {"correlation": 1, "external id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::addmm", "pid": 13721, "tid": "123",
+            "ts": 220, "dur": 50,
+            "args": {"Input dims": [], "External id": 2}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        self.assertEqual(len(profile.op_list_groupby_name), 1)
+        op_modules = {op.module: op for op in profile.op_list_groupby_name_module}
+        self.assertEqual(set(op_modules.keys()), {"Net_0.Linear_0", "train.py(10): train_step"})
+        self.assertEqual(op_modules["Net_0.Linear_0"].calls, 1)
+        self.assertEqual(op_modules["Net_0.Linear_0"].device_duration, 30)
+        self.assertEqual(op_modules["train.py(10): train_step"].host_duration, 50)
+        self.assertEqual(len(profile.kernel_list_groupby_name_module), 1)
+        kernel_agg = profile.kernel_list_groupby_name_module[0]
+        self.assertEqual(kernel_agg.module, "Net_0.Linear_0")
+        self.assertEqual(kernel_agg.total_duration, 30)
+
+    # Test operators are split into forward, backward and optimizer phases.
+    def test_phase(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 300,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 40,
+            "args": {"Input dims": [], "External id": 2}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "MmBackward", "pid": 13721, "tid": "456",
+            "ts": 160, "dur": 100,
+            "args": {"Input dims": [], "External id": 3}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "456",
+            "ts": 170, "dur": 60,
+            "args": {"Input dims": [], "External id": 4}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "456",
+            "ts": 180, "dur": 10,
+            "args": {"correlation": 1, "external id": 4}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 200, "dur": 50,
+            "args": {"correlation": 1, "external id": 4}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "Optimizer.step#SGD.step", "pid": 13721, "tid": "123",
+            "ts": 300, "dur": 50,
+            "args": {"Input dims": [], "External id": 5}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::add_", "pid": 13721, "tid": "123",
+            "ts": 310, "dur": 20,
+            "args": {"Input dims": [], "External id": 6}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        op_phases = {(op.name, op.phase): op for op in profile.op_list_groupby_name_phase}
+        self.assertEqual(set(op_phases.keys()),
+                         {("aten::mm", "Forward"), ("aten::mm", "Backward"), ("MmBackward", "Backward"),
+                          ("aten::add_", "Optimizer")})
+        self.assertEqual(op_phases[("aten::mm", "Backward")].device_duration, 50)
+        self.assertEqual(len(profile.kernel_list_groupby_name_phase), 1)
+        self.assertEqual(profile.kernel_list_groupby_name_phase[0].phase, "Backward")
+
+        self.assertEqual(profile.steps_phase_host_costs, [{"Forward": 40, "Backward": 100, "Optimizer": 50}])
+        self.assertEqual(profile.steps_phase_device_costs, [{"Forward": 0, "Backward": 50, "Optimizer": 0}])
+
+    # Test DataLoader wait time, its correlation with GPU idle time, and the blocking host to device copies.
+    def test_dataloader(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 400,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "enumerate(DataLoader)#_SingleProcessDataLoaderIter.__next__", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 100,
+            "args": {"Input dims": [], "External id": 2}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::copy_", "pid": 13721, "tid": "123",
+            "ts": 220, "dur": 40,
+            "args": {"Input dims": [], "External id": 3}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaMemcpyAsync", "pid": 13721, "tid": "123",
+            "ts": 225, "dur": 10,
+            "args": {"correlation": 1, "external id": 3}
+          },
+          {
+            "ph": "X", "cat": "Memcpy",
+            "name": "Memcpy HtoD (Pageable -> Device)", "pid": 0, "tid": "stream 7",
+            "ts": 240, "dur": 10,
+            "args": {"correlation": 1, "external id": 3}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaStreamSynchronize", "pid": 13721, "tid": "123",
+            "ts": 236, "dur": 20,
+            "args": {"correlation": 2, "external id": 3}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 300, "dur": 100,
+            "args": {"Input dims": [], "External id": 4}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 310, "dur": 10,
+            "args": {"correlation": 3, "external id": 4}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 330, "dur": 150,
+            "args": {"correlation": 3, "external id": 4}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#2", "pid": 13721, "tid": "123",
+            "ts": 500, "dur": 300,
+            "args": {"Input dims": [], "External id": 5}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "enumerate(DataLoader)#_SingleProcessDataLoaderIter.__next__", "pid": 13721, "tid": "123",
+            "ts": 510, "dur": 20,
+            "args": {"Input dims": [], "External id": 6}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::copy_", "pid": 13721, "tid": "123",
+            "ts": 535, "dur": 10,
+            "args": {"Input dims": [], "External id": 8}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaMemcpyAsync", "pid": 13721, "tid": "123",
+            "ts": 537, "dur": 5,
+            "args": {"correlation": 5, "external id": 8}
+          },
+          {
+            "ph": "X", "cat": "Memcpy",
+            "name": "Memcpy HtoD (Pinned -> Device)", "pid": 0, "tid": "stream 7",
+            "ts": 545, "dur": 5,
+            "args": {"correlation": 5, "external id": 8}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 550, "dur": 150,
+            "args": {"Input dims": [], "External id": 7}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 560, "dur": 10,
+            "args": {"correlation": 4, "external id": 7}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 580, "dur": 200,
+            "args": {"correlation": 4, "external id": 7}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+        profile.analyze()
+
+        steps_stats = profile.dataloader_steps_stats
+        self.assertEqual(len(steps_stats), 2)
+        self.assertEqual([s.wait_duration for s in steps_stats], [100, 20])
+        self.assertEqual([s.gpu_idle_duration for s in steps_stats], [240, 95])
+        self.assertEqual([s.exposed_wait_duration for s in steps_stats], [100, 20])
+        self.assertEqual(profile.dataloader_mean_wait, 60)
+        self.assertEqual(profile.dataloader_std_wait, 40)
+        self.assertAlmostEqual(profile.dataloader_idle_correlation, 1)
+
+        self.assertEqual(steps_stats[0].h2d_copies, 1)
+        self.assertEqual(steps_stats[0].pageable_copies, 1)
+        self.assertEqual(steps_stats[0].blocking_copies, 1)
+        self.assertEqual(steps_stats[0].h2d_duration, 10)
+        self.assertEqual(steps_stats[0].blocking_duration, 31)
+        self.assertEqual(steps_stats[1].h2d_copies, 1)
+        self.assertEqual(steps_stats[1].pageable_copies, 0)
+        self.assertEqual(steps_stats[1].blocking_copies, 0)
+
+        for keyword in ["num_workers", "prefetch_factor", "pin_memory=True"]:
+            self.assertEqual(len([r for r in profile.recommendations if keyword in r]), 1)
+        self.assertEqual(len([r for r in profile.recommendations if "persistent_workers" in r]), 0)
+
+    # Test optimizer time and kernels per parameter, and recommending foreach optimizers.
+    def test_optimizer(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 400,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "torch::autograd::AccumulateGrad", "pid": 13721, "tid": "456",
+            "ts": 120, "dur": 10,
+            "args": {"Input dims": [], "External id": 2}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "torch::autograd::AccumulateGrad", "pid": 13721, "tid": "456",
+            "ts": 140, "dur": 10,
+            "args": {"Input dims": [], "External id": 3}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "Optimizer.step#SGD.step", "pid": 13721, "tid": "123",
+            "ts": 200, "dur": 200,
+            "args": {"Input dims": [], "External id": 4}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::add_", "pid": 13721, "tid": "123",
+            "ts": 210, "dur": 80,
+            "args": {"Input dims": [], "External id": 5}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 220, "dur": 20,
+            "args": {"correlation": 1, "external id": 5}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "void at::native::vectorized_elementwise_kernel<4, at::native::AddFunctor<float>>",
+            "pid": 0, "tid": "stream 7",
+            "ts": 250, "dur": 5,
+            "args": {"correlation": 1, "external id": 5}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::add_", "pid": 13721, "tid": "123",
+            "ts": 300, "dur": 80,
+            "args": {"Input dims": [], "External id": 6}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 310, "dur": 20,
+            "args": {"correlation": 2, "external id": 6}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "void at::native::vectorized_elementwise_kernel<4, at::native::AddFunctor<float>>",
+            "pid": 0, "tid": "stream 7",
+            "ts": 340, "dur": 5,
+            "args": {"correlation": 2, "external id": 6}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+        profile.analyze()
+
+        self.assertEqual(len(profile.optimizers), 1)
+        optimizer = profile.optimizers[0]
+        self.assertEqual(optimizer.name, "Optimizer.step#SGD.step")
+        self.assertEqual(optimizer.calls, 1)
+        self.assertEqual(optimizer.host_duration, 200)
+        self.assertEqual(optimizer.device_duration, 10)
+        self.assertEqual(optimizer.launches, 2)
+        self.assertEqual(optimizer.kernels, 2)
+        self.assertFalse(optimizer.is_foreach)
+
+        self.assertEqual(len(profile.optimizer_steps_stats), 1)
+        stats = profile.optimizer_steps_stats[0]
+        self.assertEqual(stats.host_duration, 200)
+        self.assertEqual(stats.parameters, 2)
+        self.assertEqual(stats.kernels_per_parameter, 1)
+        self.assertEqual(len([r for r in profile.recommendations if "foreach=True" in r]), 1)
+
+    # Test the AccumulateGrad wrapped in autograd::engine::evaluate_function is counted once.
+    def test_optimizer_wrapped_accumulate_grad(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 400,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "autograd::engine::evaluate_function: torch::autograd::AccumulateGrad",
+            "pid": 13721, "tid": "456",
+            "ts": 120, "dur": 10,
+            "args": {"Input dims": [], "External id": 2}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "torch::autograd::AccumulateGrad", "pid": 13721, "tid": "456",
+            "ts": 121, "dur": 8,
+            "args": {"Input dims": [], "External id": 7}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "autograd::engine::evaluate_function: torch::autograd::AccumulateGrad",
+            "pid": 13721, "tid": "456",
+            "ts": 140, "dur": 10,
+            "args": {"Input dims": [], "External id": 3}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "torch::autograd::AccumulateGrad", "pid": 13721, "tid": "456",
+            "ts": 141, "dur": 8,
+            "args": {"Input dims": [], "External id": 8}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "Optimizer.step#SGD.step", "pid": 13721, "tid": "123",
+            "ts": 200, "dur": 200,
+            "args": {"Input dims": [], "External id": 4}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::add_", "pid": 13721, "tid": "123",
+            "ts": 210, "dur": 80,
+            "args": {"Input dims": [], "External id": 5}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 220, "dur": 20,
+            "args": {"correlation": 1, "external id": 5}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "void at::native::vectorized_elementwise_kernel<4, at::native::AddFunctor<float>>",
+            "pid": 0, "tid": "stream 7",
+            "ts": 250, "dur": 5,
+            "args": {"correlation": 1, "external id": 5}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::add_", "pid": 13721, "tid": "123",
+            "ts": 300, "dur": 80,
+            "args": {"Input dims": [], "External id": 6}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 310, "dur": 20,
+            "args": {"correlation": 2, "external id": 6}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "void at::native::vectorized_elementwise_kernel<4, at::native::AddFunctor<float>>",
+            "pid": 0, "tid": "stream 7",
+            "ts": 340, "dur": 5,
+            "args": {"correlation": 2, "external id": 6}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+        profile.analyze()
+
+        self.assertEqual(len(profile.optimizer_steps_stats), 1)
+        stats = profile.optimizer_steps_stats[0]
+        self.assertEqual(stats.host_duration, 200)
+        self.assertEqual(stats.parameters, 2)
+        self.assertEqual(stats.kernels_per_parameter, 1)
+        self.assertEqual(len([r for r in profile.recommendations if "foreach=True" in r]), 1)
+
+    # Test running rules in parallel, sorting their findings and isolating the failed rule.
+    def test_rule_engine(self):
+        class SlowStepRule(Rule):
+            def check(self, profile):
+                return [self.finding(SEVERITY_LOW, "low", 10),
+                        self.finding(SEVERITY_HIGH, "high", profile.avg_costs.step_total_cost)]
+
+        class FailedRule(Rule):
+            name = "Failed"
+
+            def check(self, profile):
+                raise ValueError("failed")
+
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 200,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 100,
+            "args": {"Input dims": [], "External id": 2}
+          }]
+        """
+        profile = parse_json_trace(json_content)
+        profile.process()
+
+        engine = RuleEngine([FailedRule(), SlowStepRule()], max_workers=2)
+        engine.run(profile)
+        self.assertEqual([(f.rule, f.severity, f.message, f.estimated_saving) for f in engine.findings],
+                         [("SlowStepRule", SEVERITY_HIGH, "high", 200), ("SlowStepRule", SEVERITY_LOW, "low", 10)])
+        self.assertEqual(set(engine.rule_durations.keys()), {"Failed", "SlowStepRule"})
+
+        self.assertTrue(any(rule.get_name() == "DataLoader" for rule in discover_rules()))
+        profile.analyze()
+        self.assertEqual(profile.recommendations, [])
+        self.assertTrue(len(profile.rule_durations) > 0)
+
+    # Test joining the operators and kernels of two runs and ranking the regressions.
+    def test_run_diff(self):
+        json_content_format = """
+          [{{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 300,
+            "args": {{"Input dims": [], "External id": 1}}
+          }},
+          {{
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": {},
+            "args": {{"Input dims": [[2, 3], [3, 4]], "External id": 2}}
+          }},
+          {{
+            "ph": "X", "cat": "Operator",
+            "name": "{}", "pid": 13721, "tid": "123",
+            "ts": 300, "dur": 20,
+            "args": {{"Input dims": [], "External id": 3}}
+          }}]
+        """
+        profiles = []
+        for mm_dur, other_op in [(50, "aten::add"), (150, "aten::relu")]:
+            profile_data = parse_json_trace(json_content_format.format(mm_dur, other_op))
+            profile_data.process()
+            profile_data.analyze()
+            profiles.append(RunGenerator(WORKER_NAME, profile_data).generate_run_profile())
+
+        data = generate_run_diff(profiles[0], profiles[1])
+        self.assertEqual(data["summary"]["delta_step_time"], 0)
+        rows = data["operators"]["data"]["rows"]
+        # The removed aten::add has negative contribution so it isn't a regression.
+        self.assertEqual([row[:2] for row in rows], [["aten::mm", "[[2, 3], [3, 4]]"], ["aten::relu", "[]"]])
+        columns = [column["name"] for column in data["operators"]["data"]["columns"]]
+        mm_row = dict(zip(columns, rows[0]))
+        self.assertEqual(mm_row["Base Self Host Duration (us)"], 50)
+        self.assertEqual(mm_row["Exp Self Host Duration (us)"], 150)
+        self.assertEqual(mm_row["Delta Calls"], 0)
+        self.assertEqual(mm_row["Step Time Contribution (us)"], 100)
+        relu_row = dict(zip(columns, rows[1]))
+        self.assertEqual(relu_row["Base Calls"], 0)
+        self.assertEqual(relu_row["Delta Calls"], 1)
+
+        # The route takes the top count less than 1 as invalid, instead of slicing from the end.
+        plugin = TorchProfilerPlugin.__new__(TorchProfilerPlugin)
+        plugin._runs_lock = threading.Lock()
+        plugin._runs = {}
+        for name, profile in zip(["base", "exp"], profiles):
+            plugin._runs[name] = Run(name, name)
+            plugin._runs[name].add_profile(profile)
+        client = Client(plugin.diff_route, Response)
+        for top, count in [("1", 1), ("-1", 2), ("0", 2), ("abc", 2)]:
+            response = client.get("/?run=base&exp_run=exp&top=" + top)
+            self.assertEqual(len(json.loads(response.get_data())["operators"]["data"]["rows"]), count)
+
+    # Test the percentiles, the outlier steps and their operators compared with the median step.
+    def test_step_stats(self):
+        events = []
+        ts = 100
+        for i, step_dur in enumerate([100, 110, 100, 90, 400]):
+            events.append({"ph": "X", "cat": "Operator", "name": "ProfilerStep#{}".format(i + 1), "pid": 13721,
+                           "tid": "123", "ts": ts, "dur": step_dur, "args": {"Input dims": [], "External id": 1}})
+            events.append({"ph": "X", "cat": "Operator", "name": "aten::mm", "pid": 13721, "tid": "123",
+                           "ts": ts + 10, "dur": 50, "args": {"Input dims": [], "External id": 2}})
+            if step_dur == 400:
+                events.append({"ph": "X", "cat": "Operator", "name": "aten::save", "pid": 13721, "tid": "123",
+                               "ts": ts + 70, "dur": 300, "args": {"Input dims": [], "External id": 3}})
+            ts += step_dur
+        profile_data = parse_json_trace(json.dumps(events))
+        profile_data.process()
+        profile_data.analyze()
+        self.assertEqual(profile_data.outlier_steps, [4])
+        self.assertEqual(profile_data.median_step, 0)
+        self.assertEqual(profile_data.avg_costs.step_total_cost, 160)
+        self.assertEqual(profile_data.avg_costs_without_outliers.step_total_cost, 100)
+        stats = profile_data.steps_costs_stats["step_total_cost"]
+        self.assertEqual((stats.p50, stats.min, stats.max), (100, 90, 400))
+        self.assertAlmostEqual(stats.p90, 284)
+
+        profile = RunGenerator(WORKER_NAME, profile_data).generate_run_profile()
+        self.assertEqual(profile.overview["performance"][0]["value"], 160)
+        self.assertEqual(profile.overview_without_outliers["performance"][0]["value"], 100)
+        self.assertEqual(profile.step_stats["outliers"]["data"]["rows"][0][:3], ["5", 400, 100])
+        self.assertEqual(profile.step_stats["median_step"], "1")
+        rows = profile.step_stats["outlier_ops"]["5"]["data"]["rows"]
+        self.assertEqual(rows, [["aten::save", 1, 0, 300, 0, 300, 0, 0, 0]])
+
+    # Test dropping the warm-up and tail steps automatically, and by the sidecar config.
+    def test_steady_state(self):
+        self.assertEqual(detect_warmup_steps([500, 300, 100, 105, 100, 98], [50, 52, 40, 40, 40, 40]), 2)
+        self.assertEqual(detect_warmup_steps([100, 100, 100, 100], [60, 40, 40, 40]), 1)
+        self.assertEqual(detect_warmup_steps([500, 100, 100], [40, 40, 40]), 0)
+        self.assertEqual(detect_tail_steps([40, 40, 10]), 1)
+        self.assertEqual(detect_tail_steps([40, 40, 0, 0]), 2)
+        self.assertEqual(detect_tail_steps([40, 40, 40]), 0)
+
+        events = []
+        ts = 100
+        for i, step_dur in enumerate([400, 300, 100, 110, 100, 90]):
+            events.append({"ph": "X", "cat": "Operator", "name": "ProfilerStep#{}".format(i + 1), "pid": 13721,
+                           "tid": "123", "ts": ts, "dur": step_dur, "args": {"Input dims": [], "External id": 1}})
+            ts += step_dur
+        json_content = json.dumps(events)
+
+        profile_data = parse_json_trace(json_content)
+        profile_data.process()
+        self.assertEqual(profile_data.warmup_steps_names, ["1", "2"])
+        self.assertEqual(profile_data.steps_names, ["3", "4", "5", "6"])
+        self.assertEqual(profile_data.avg_costs.step_total_cost, 100)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.assertEqual(StepsConfig.load(tmp_dir).key, (None, None))
+            with open(os.path.join(tmp_dir, consts.STEPS_CONFIG_FILE_NAME), "w") as f:
+                json.dump({"warmup_steps": 1, "tail_steps": "auto"}, f)
+            steps_config = StepsConfig.load(tmp_dir)
+            self.assertEqual(steps_config.key, (1, None))
+        profile_data = parse_json_trace(json_content)
+        profile_data.process(steps_config)
+        self.assertEqual(profile_data.steps_names, ["2", "3", "4", "5", "6"])
+
+        profile_data = parse_json_trace(json_content)
+        profile_data.process(steps_config.update({"warmup_steps": 0, "tail_steps": 2}))
+        self.assertEqual(profile_data.warmup_steps_names, [])
+        self.assertEqual(profile_data.tail_steps_names, ["5", "6"])
+        self.assertEqual(profile_data.steps_names, ["1", "2", "3", "4"])
+
+    # Test the operator and kernel tables of each step, including the autograd thread without ProfilerStep.
+    def test_step_tables(self):
+        events = [
+            {"ph": "X", "cat": "Operator", "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+             "ts": 100, "dur": 100, "args": {"Input dims": [], "External id": 1}},
+            {"ph": "X", "cat": "Operator", "name": "aten::mm", "pid": 13721, "tid": "123",
+             "ts": 110, "dur": 50, "args": {"Input dims": [], "External id": 2}},
+            {"ph": "X", "cat": "Runtime", "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+             "ts": 120, "dur": 5, "args": {"correlation": 1, "external id": 2}},
+            {"ph": "X", "cat": "Kernel", "name": "gemm", "pid": 0, "tid": "stream 7",
+             "ts": 130, "dur": 20, "args": {"correlation": 1, "external id": 2}},
+            {"ph": "X", "cat": "Operator", "name": "autograd::engine::evaluate_function: MmBackward0",
+             "pid": 13721, "tid": "456", "ts": 165, "dur": 20, "args": {"Input dims": [], "External id": 5}},
+            {"ph": "X", "cat": "Operator", "name": "aten::mm", "pid": 13721, "tid": "456",
+             "ts": 170, "dur": 10, "args": {"Input dims": [], "External id": 6}},
+            {"ph": "X", "cat": "Operator", "name": "ProfilerStep#2", "pid": 13721, "tid": "123",
+             "ts": 200, "dur": 100, "args": {"Input dims": [], "External id": 3}},
+            {"ph": "X", "cat": "Operator", "name": "aten::add", "pid": 13721, "tid": "123",
+             "ts": 210, "dur": 30, "args": {"Input dims": [], "External id": 4}}]
+        profile_data = parse_json_trace(json.dumps(events))
+        profile_data.process()
+        profile_data.analyze()
+        profile = RunGenerator(WORKER_NAME, profile_data).generate_run_profile()
+
+        self.assertEqual(sorted(profile.operation_table_by_step.keys()), ["1", "2"])
+        table = profile.operation_table_by_step["1"]["data"]
+        columns = [column["name"] for column in table["columns"]]
+        rows = {row[0]: dict(zip(columns, row)) for row in table["rows"]}
+        self.assertEqual(sorted(rows.keys()), ["aten::mm", "autograd::engine::evaluate_function: MmBackward0"])
+        self.assertEqual(rows["aten::mm"]["Calls"], 2)
+        self.assertEqual(rows["aten::mm"]["Device Self Duration (us)"], 20)
+        self.assertEqual(rows["aten::mm"]["Host Total Duration (us)"], 60)
+        self.assertEqual([row[0] for row in profile.operation_table_by_step["2"]["data"]["rows"]], ["aten::add"])
+
+        self.assertEqual(list(profile.kernel_op_table_by_step.keys()), ["1"])
+        self.assertEqual(profile.kernel_op_table_by_step["1"]["data"]["rows"],
+                         [["gemm", "aten::mm", 1, 20, 20, 20, 20]])
+
+    # Test grouping the templated kernels by family.
+    def test_kernel_family(self):
+        normalizer = KernelNameNormalizer()
+        name = "void at::native::vectorized_elementwise_kernel<4, at::native::AddFunctor<float>, " \
+               "at::detail::Array<char*, 3> >(int, at::native::AddFunctor<float>, at::detail::Array<char*, 3>)"
+        self.assertEqual(normalizer.get_family(name), "void at::native::vectorized_elementwise_kernel<...>")
+        self.assertIs(normalizer.get_family(name), normalizer.get_family(name))
+        self.assertEqual(KernelNameNormalizer(template_depth=1).get_family(name),
+                         "void at::native::vectorized_elementwise_kernel<4, at::native::AddFunctor<...>, "
+                         "at::detail::Array<...> >")
+        self.assertEqual(normalizer.get_family("void (anonymous namespace)::softmax<float, 8>(float*, int)"),
+                         "void (anonymous namespace)::softmax<...>")
+        self.assertEqual(normalizer.get_family("volta_sgemm_128x64_nn"), "volta_sgemm_*_nn")
+        self.assertEqual(KernelNameNormalizer(rules=[]).get_family("volta_sgemm_128x64_nn"), "volta_sgemm_128x64_nn")
+
+        events = [{"ph": "X", "cat": "Operator", "name": "aten::add", "pid": 13721, "tid": "123",
+                   "ts": 100, "dur": 100, "args": {"Input dims": [], "External id": 1}}]
+        for i, kernel_name in enumerate(["add_kernel<float>(float*)", "add_kernel<half>(half*)", "gemm"]):
+            events.append({"ph": "X", "cat": "Runtime", "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+                           "ts": 110 + i * 10, "dur": 5, "args": {"correlation": i, "external id": 1}})
+            events.append({"ph": "X", "cat": "Kernel", "name": kernel_name, "pid": 0, "tid": "stream 7",
+                           "ts": 200 + i * 100, "dur": 10 * (i + 2), "args": {"correlation": i, "external id": 1}})
+        profile_data = parse_json_trace(json.dumps(events))
+        profile_data.process()
+        profile_data.analyze()
+        profile = RunGenerator(WORKER_NAME, profile_data).generate_run_profile()
+        self.assertEqual(profile.kernel_family_table["data"]["rows"],
+                         [["add_kernel<...>", 2, 2, 50, 25, 30, 20], ["gemm", 1, 1, 40, 40, 40, 40]])
+        self.assertEqual(sorted(row[:3] for row in profile.kernel_family_op_table["data"]["rows"]),
+                         [["add_kernel<...>", "aten::add", 2], ["gemm", "aten::add", 1]])
+
+    # Test the names, categories and input shapes are shared among the events.
+    def test_intern_events(self):
+        events = []
+        for i in range(3):
+            events.append({"ph": "X", "cat": "Operator", "name": "aten::mm", "pid": 13721, "tid": "123",
+                           "ts": 100 + i * 100, "dur": 50 + i * 10,
+                           "args": {"Input dims": [[2, 3], [3, 4]], "External id": i + 1}})
+        events.append({"ph": "X", "cat": "Operator", "name": "aten::mm", "pid": 13721, "tid": "123",
+                       "ts": 500, "dur": 40, "args": {"Input dims": [[2, 3], []], "External id": 4}})
+        profile_data = parse_json_trace(json.dumps(events))
+        first, second = profile_data.events[0], profile_data.events[1]
+        self.assertIs(first.name, second.name)
+        self.assertIs(first.category, second.category)
+        self.assertIs(first.args["Input dims"], second.args["Input dims"])
+        self.assertIs(first.args["Input dims"][0], profile_data.events[3].args["Input dims"][0])
+        self.assertEqual(str(first.args["Input dims"]), "[[2, 3], [3, 4]]")
+
+        profile_data.process()
+        op_aggs = sorted(profile_data.op_list_groupby_name_input, key=lambda agg: agg.calls)
+        self.assertEqual([(agg.input_shape, agg.calls, agg.host_duration) for agg in op_aggs],
+                         [("[[2, 3], []]", 1, 40), ("[[2, 3], [3, 4]]", 3, 180)])
+
+    # Test the trend of the run summaries and their cache.
+    def test_trend(self):
+        json_content_format = """
+          [{{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": {},
+            "args": {{"Input dims": [], "External id": 1}}
+          }},
+          {{
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": {},
+            "args": {{"Input dims": [[2, 3], [3, 4]], "External id": 2}}
+          }}]
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            summaries = []
+            for name, mm_dur in [("run1", 50), ("run2", 150)]:
+                profile_data = parse_json_trace(json_content_format.format(mm_dur + 100, mm_dur))
+                profile_data.process()
+                summary = RunSummary(name, tmp_dir)
+                summary.summarize({WORKER_NAME: profile_data})
+                summaries.append(summary)
+
+            data = generate_trend(summaries, top=1)
+            steps = data["steps"]["data"]
+            self.assertEqual([column["name"] for column in steps["columns"]][:3], ["Run", "Time", "Step Time (us)"])
+            self.assertEqual([row[2] for row in steps["rows"]], [150, 250])
+            self.assertEqual(data["operators"]["metric"], "Self Host Duration Per Step (us)")
+            self.assertEqual([column["name"] for column in data["operators"]["data"]["columns"]], ["Run", "aten::mm"])
+            self.assertEqual(data["operators"]["data"]["rows"], [["run1", 50], ["run2", 150]])
+
+            # The route takes the top count less than 1 as invalid, instead of slicing from the end.
+            plugin = TorchProfilerPlugin.__new__(TorchProfilerPlugin)
+            plugin._runs_lock = threading.Lock()
+            plugin._summaries = {summary.name: summary for summary in summaries}
+            response = Client(plugin.trend_route, Response).get("/?top=-1")
+            columns = json.loads(response.get_data())["operators"]["data"]["columns"]
+            self.assertEqual([column["name"] for column in columns], ["Run", "aten::mm"])
+
+            cache = SummaryCache(os.path.join(tmp_dir, "cache"))
+            cache.put(summaries[1])
+            cached = cache.get(tmp_dir)
+            self.assertEqual(cached.to_dict(), summaries[1].to_dict())
+            # A new trace file invalidates the cached summary.
+            with open(os.path.join(tmp_dir, WORKER_NAME + ".pt.trace.json"), "w") as f:
+                f.write("[]")
+            self.assertIsNone(cache.get(tmp_dir))
+
+    # Test the typed results and DataFrames of the public API.
+    def test_api(self):
+        json_content = """
+          [{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": 200,
+            "args": {"Input dims": [], "External id": 1}
+          },
+          {
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 110, "dur": 100,
+            "args": {"Input dims": [[2, 3], [3, 4]], "External id": 2}
+          },
+          {
+            "ph": "X", "cat": "Runtime",
+            "name": "cudaLaunchKernel", "pid": 13721, "tid": "123",
+            "ts": 120, "dur": 10,
+            "args": {"correlation": 1, "external id": 2}
+          },
+          {
+            "ph": "X", "cat": "Kernel",
+            "name": "volta_sgemm_128x64_nn", "pid": 0, "tid": "stream 7",
+            "ts": 150, "dur": 40,
+            "args": {"correlation": 1, "external id": 2}
+          }]
+        """
+        data = parse_json_trace(json_content)
+        data.process()
+        profile = api.Profile(data)
+
+        self.assertEqual(profile.step_costs, [api.StepCost("1", 200, 40, 0, 0, 0, 0, 0, 10, 0, 50, 100)])
+        self.assertEqual(profile.ops(), [api.OpAgg("aten::mm", None, 1, 100, 90, 40, 40, True, 0)])
+        self.assertEqual(profile.ops("input_shape")[0].group, "[[2, 3], [3, 4]]")
+        with self.assertRaises(ValueError):
+            profile.ops("stream")
+        self.assertEqual(profile.kernels,
+                         [api.KernelAgg("volta_sgemm_128x64_nn", "aten::mm", 1, 40, 40, 40, 40)])
+
+        call_tree = profile.call_tree
+        self.assertEqual([(node.name, node.depth) for node in call_tree],
+                         [("CallTreeRoot", 0), ("Thread 123", 1), ("ProfilerStep#*", 2), ("aten::mm", 3),
+                          ("cudaLaunchKernel", 4)])
+        self.assertEqual(call_tree[3].parent_id, call_tree[2].id)
+
+        df = profile.ops_df("input_shape")
+        self.assertEqual(list(df.columns), list(api.OpAgg._fields))
+        self.assertEqual(df["self_device_duration"].tolist(), [40])
+        parent_ids = profile.call_tree_df()["parent_id"]
+        self.assertTrue(parent_ids.isna()[0])
+        self.assertEqual(parent_ids[1], 0)
+
+    # Test aligning steps across workers and finding the straggler.
+    def test_step_skew(self):
+        json_content_format = """
+          [{{
+            "ph": "X", "cat": "Operator",
+            "name": "ProfilerStep#1", "pid": 13721, "tid": "123",
+            "ts": 100, "dur": {},
+            "args": {{"Input dims": [], "External id": 1}}
+          }},
+          {{
+            "ph": "X", "cat": "Operator",
+            "name": "aten::mm", "pid": 13721, "tid": "123",
+            "ts": 120, "dur": {},
+            "args": {{"Input dims": [], "External id": 2}}
+          }}]
+        """
+        profiles = {}
+        for worker, step_dur, op_dur in [("worker0", 200, 10), ("worker1", 300, 110), ("worker2", 200, 10)]:
+            profile = parse_json_trace(json_content_format.format(step_dur, op_dur))
+            profile.worker = worker
+            profile.process()
+            profiles[worker] = profile
+
+        parser = StepSkewParser()
+        parser.parse_profiles(profiles)
+        self.assertEqual(len(parser.step_skews), 1)
+        step_skew = parser.step_skews[0]
+        self.assertEqual(step_skew.step_name, "1")
+        self.assertEqual(step_skew.max_cost, 300)
+        self.assertEqual(step_skew.median_cost, 200)
+        self.assertEqual(step_skew.skew, 100)
+        self.assertEqual(step_skew.slowest_worker, "worker1")
+        self.assertEqual(step_skew.dominant_category, "CPU Exec")
+        self.assertEqual(step_skew.dominant_category_cost, 100)
+
+        for profile in profiles.values():
+            profile.step_skews = parser.step_skews
+            profile.analyze()
+        self.assertEqual(len(profiles["worker0"].recommendations), 0)
+        self.assertEqual(len(profiles["worker1"].recommendations), 1)
+
+        # The tie of dominant categories goes to the earliest straggler step.
+        for categories in [["Kernel", "CPU Exec"], ["CPU Exec", "Kernel"]]:
+            profile = profiles["worker1"]
+            profile.step_skews = []
+            for category in categories:
+                profile.step_skews.append(copy.copy(step_skew))
+                profile.step_skews[-1].dominant_category = category
+            findings = StragglerRule().check(profile)
+            self.assertIn("spent in {}.".format(categories[0]), findings[0].message)
+
 
 if __name__ == '__main__':
     unittest.main()
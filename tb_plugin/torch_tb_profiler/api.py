@@ -0,0 +1,133 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+"""Public API to analyze the profiler traces from Python, such as in notebooks.
+
+The results are plain namedtuples and pandas DataFrames, without the payload built for the TensorBoard UI.
+The fields of the namedtuples are kept stable across versions, new fields are only appended.
+
+    from torch_tb_profiler import api
+    profile = api.load_profile("./samples/resnet50_num_workers_0", "worker0")
+    profile.step_costs_df()
+    profile.ops_df(group_by="input_shape").sort_values("self_device_duration", ascending=False)
+"""
+
+from collections import namedtuple
+
+import pandas as pd
+
+from .profiler.data import RunProfileData
+from .profiler.loader import get_workers
+from .profiler.steady_state import StepsConfig
+
+# Time of each category in a step, in us. The categories don't overlap and sum up to total.
+StepCost = namedtuple("StepCost", ["step", "total", "kernel", "exposed_communication", "communication", "memcpy",
+                                   "memset", "sync", "runtime", "dataloader", "cpu_exec", "other"])
+# Operator aggregated by name, and input shape, module or phase if grouped by them. Durations are in us.
+OpAgg = namedtuple("OpAgg", ["name", "group", "calls", "host_duration", "self_host_duration", "device_duration",
+                             "self_device_duration", "tc_eligible", "tc_self_ratio"])
+# Kernel aggregated by name and the operator launching it. Durations are in us.
+KernelAgg = namedtuple("KernelAgg", ["name", "op_name", "calls", "total_duration", "avg_duration", "min_duration",
+                                     "max_duration"])
+# Node of the call tree merging the same call paths of all threads. The root has id 0 and parent_id None.
+CallTreeNode = namedtuple("CallTreeNode", ["id", "parent_id", "depth", "name", "calls", "host_duration",
+                                           "self_host_duration", "device_duration", "self_device_duration"])
+
+OP_GROUP_BY = [None, "input_shape", "module", "phase"]
+
+
+def _to_dataframe(items, item_type):
+    return pd.DataFrame(items, columns=list(item_type._fields))
+
+
+class Profile:
+    """Analysis result of one worker."""
+
+    def __init__(self, data):
+        self._data = data  # The processed RunProfileData.
+        self.worker = data.worker
+
+    @property
+    def step_costs(self):
+        """List of StepCost, one for each step."""
+        result = []
+        for step_name, costs in zip(self._data.steps_names, self._data.steps_costs):
+            result.append(StepCost(step_name, costs.step_total_cost, costs.kernel_cost,
+                                   costs.exposed_communication_cost, costs.communication_cost, costs.memcpy_cost,
+                                   costs.memset_cost, costs.sync_cost, costs.runtime_cost, costs.dataloader_cost,
+                                   costs.cpuop_cost, costs.other_cost))
+        return result
+
+    def ops(self, group_by=None):
+        """List of OpAgg. group_by: None, "input_shape", "module" or "phase"."""
+        if group_by not in OP_GROUP_BY:
+            raise ValueError("group_by must be one of {}".format(OP_GROUP_BY))
+        op_list = self._data.op_list_groupby_name if group_by is None \
+            else getattr(self._data, "op_list_groupby_name_" + ("input" if group_by == "input_shape" else group_by))
+        return [OpAgg(op.name, getattr(op, group_by) if group_by is not None else None, op.calls, op.host_duration,
+                      op.self_host_duration, op.device_duration, op.self_device_duration, op.tc_eligible,
+                      op.tc_self_ratio)
+                for op in op_list]
+
+    @property
+    def kernels(self):
+        """List of KernelAgg, empty if there is no kernel."""
+        if self._data.kernel_list_groupby_name_op is None:
+            return []
+        return [KernelAgg(k.name, k.op_name, k.calls, k.total_duration, k.avg_duration, k.min_duration,
+                          k.max_duration)
+                for k in self._data.kernel_list_groupby_name_op]
+
+    @property
+    def call_tree(self):
+        """List of CallTreeNode in depth-first order, the first one is the root."""
+        nodes = self._data.call_tree_nodes
+        result = []
+        if not nodes:
+            return result
+        node_stack = [(nodes[0], None, 0)]
+        while len(node_stack) > 0:
+            agg, parent_id, depth = node_stack.pop()
+            result.append(CallTreeNode(agg.id, parent_id, depth, agg.name, agg.calls, agg.host_duration,
+                                       agg.self_host_duration, agg.device_duration, agg.self_device_duration))
+            for child in reversed(list(agg.children.values())):
+                node_stack.append((child, agg.id, depth + 1))
+        return result
+
+    def step_costs_df(self):
+        return _to_dataframe(self.step_costs, StepCost)
+
+    def ops_df(self, group_by=None):
+        return _to_dataframe(self.ops(group_by), OpAgg)
+
+    def kernels_df(self):
+        return _to_dataframe(self.kernels, KernelAgg)
+
+    def kernel_stats_df(self):
+        """Kernels aggregated by name with the launch configuration statistics, empty if there is no kernel."""
+        if self._data.kernel_stat is None:
+            return pd.DataFrame(columns=["name", "count", "sum", "mean", "max", "min"])
+        return self._data.kernel_stat.reset_index()
+
+    def call_tree_df(self):
+        df = _to_dataframe(self.call_tree, CallTreeNode)
+        df["parent_id"] = df["parent_id"].astype("Int64")  # Keep the ids integer with the root's None.
+        return df
+
+
+def load_profile(run_dir, worker, steps_config=None):
+    """Parse and process the trace of the worker under run_dir, return a Profile.
+    steps_config: StepsConfig of the warm-up and tail steps to drop, default to the sidecar config of the run."""
+    data = RunProfileData.parse(run_dir, worker)
+    data.process(steps_config if steps_config is not None else StepsConfig.load(run_dir))
+    # The raw events are not needed after processing, release them for loading many profiles.
+    data.events = None
+    return Profile(data)
+
+
+def load_run(run_dir, steps_config=None):
+    """Return a dict of worker -> Profile for all the traces under run_dir, sorted by worker."""
+    profiles = {}
+    for worker in get_workers(run_dir):
+        profiles[worker] = load_profile(run_dir, worker, steps_config)
+    return profiles
@@ -0,0 +1,223 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+"""Command line tool analyzing the profiler traces without TensorBoard, for batch analysis in CI.
+
+    torch-tb-profiler RUN_DIR -o OUTPUT_DIR [--format json|csv|parquet] [--workers N]
+        [--compare BASELINE_DIR] [--step-time-threshold PCT] [--op-threshold US]
+        [--export EXPORT_DIR [--export-format parquet|csv] [--job JOB]]
+
+For each run and worker, the overview steps, operator and kernel tables are written to
+OUTPUT_DIR/<run>/<worker>/{overview,operators,kernels}.<format>. With --compare, the runs are compared
+with the ones of the same name under BASELINE_DIR, and the exit code is 1 if any of them regresses.
+The exit code is 2 if any run fails to load, or if nothing is compared.
+With --export, the aggregated statistics are appended to the partitioned dataset under EXPORT_DIR,
+see exporter.py.
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from . import utils
+from .exporter import EXPORT_FORMATS, Exporter
+from .profiler import RunLoader, generate_run_diff
+
+logger = utils.get_logger()
+
+OUTPUT_FORMATS = ["json", "csv", "parquet"]
+EXIT_REGRESSION = 1
+EXIT_ERROR = 2
+
+
+def table_to_dataframe(table):
+    """Convert a table of {"columns": [...], "rows": [...]} to DataFrame, dropping the tooltip columns."""
+    indices = [i for i, column in enumerate(table["columns"]) if column.get("role") != "tooltip"]
+    columns = [table["columns"][i]["name"] for i in indices]
+    rows = [[row[i] for i in indices] for row in table["rows"]]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def get_profile_tables(profile):
+    """Return (name, DataFrame) of the overview steps, operator and kernel tables of a RunProfile."""
+    tables = [("overview", table_to_dataframe(profile.overview["steps"])),
+              ("operators", table_to_dataframe(profile.operation_table_by_name["data"]))]
+    if profile.kernel_table is not None:
+        tables.append(("kernels", table_to_dataframe(profile.kernel_table["data"])))
+    return tables
+
+
+def write_dataframe(df, path, output_format):
+    if output_format == "json":
+        df.to_json(path, orient="records", indent=2)
+    elif output_format == "csv":
+        df.to_csv(path, index=False)
+    else:
+        # Requires pyarrow or fastparquet.
+        df.to_parquet(path, index=False)
+
+
+def load_run(name, run_dir):
+    return RunLoader(name, run_dir).load()
+
+
+def load_runs(run_dirs, workers):
+    """Load the runs of [(name, run_dir)], in at most workers processes. Return name -> Run."""
+    if workers <= 1 or len(run_dirs) <= 1:
+        runs = [load_run(name, run_dir) for name, run_dir in run_dirs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            runs = list(executor.map(load_run, *zip(*run_dirs)))
+    return {name: run for (name, _), run in zip(run_dirs, runs) if run is not None}
+
+
+def compare_runs(base_runs, runs, step_time_threshold, op_threshold):
+    """Compare the runs with the baseline runs of the same name, or the only ones if both have a single run.
+    Return (diffs, regressions): diffs is list of (run name, worker, diff data),
+    regressions is list of messages."""
+    if len(base_runs) == 1 and len(runs) == 1:
+        pairs = [(next(iter(base_runs.values())), next(iter(runs.values())))]
+    else:
+        pairs = [(base_runs[name], run) for name, run in runs.items() if name in base_runs]
+
+    diffs = []
+    regressions = []
+    for base_run, run in pairs:
+        for worker, profile in run.profiles.items():
+            base_profile = base_run.get_profile(worker)
+            if base_profile is None:
+                logger.warning("Worker %s of run %s is not in the baseline.", worker, run.name)
+                continue
+            diff = generate_run_diff(base_profile, profile)
+            diffs.append((run.name, worker, diff))
+
+            summary = diff["summary"]
+            if summary["base_step_time"] > 0:
+                ratio = summary["delta_step_time"] / summary["base_step_time"] * 100
+                if ratio > step_time_threshold:
+                    regressions.append("{}/{}: step time regresses by {}% ({}us -> {}us)".format(
+                        run.name, worker, round(ratio, 2), summary["base_step_time"], summary["exp_step_time"]))
+            for kind in ["operators", "kernels"]:
+                table = diff[kind]["data"]
+                for row in table["rows"]:
+                    # The last column is the step time contribution, and the rows are sorted by it.
+                    if row[-1] <= op_threshold:
+                        break
+                    regressions.append("{}/{}: {} \"{}\" adds {}us per step".format(
+                        run.name, worker, kind[:-1], row[0], row[-1]))
+    return diffs, regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="torch-tb-profiler",
+                                     description="Analyze PyTorch profiler traces without TensorBoard.")
+    parser.add_argument("run_dir", help="Directory of a run, or a log directory containing multiple runs.")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Directory to write the tables to. Nothing is written if not set.")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="json", help="Format of the tables.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes loading the runs.")
+    parser.add_argument("--compare", metavar="BASELINE_DIR", default=None,
+                        help="Compare with the runs under the baseline directory and fail on regression.")
+    parser.add_argument("--step-time-threshold", type=float, default=5,
+                        help="Allowed increase of the average step time in percentage. Default: 5.")
+    parser.add_argument("--op-threshold", type=float, default=float("inf"),
+                        help="Allowed increase of the step time by one operator or kernel in us. "
+                             "Not checked by default.")
+    parser.add_argument("--export", metavar="EXPORT_DIR", default=None,
+                        help="Append the aggregated statistics to the partitioned dataset under the directory. "
+                             "The traces exported before are skipped.")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS, default="parquet",
+                        help="Format of the exported files.")
+    parser.add_argument("--job", default=None,
+                        help="Job name of the exported rows. Default: base name of RUN_DIR.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        return analyze(args)
+    except Exception as ex:
+        # An uncaught exception exits with 1, which couldn't be told apart from EXIT_REGRESSION.
+        logger.error("Failed to analyze %s. Exception=%s", args.run_dir, ex, exc_info=True)
+        print("Failed to analyze {}: {}".format(args.run_dir, ex), file=sys.stderr)
+        return EXIT_ERROR
+
+
+def analyze(args):
+    run_dirs = list(utils.get_run_dirs(args.run_dir))
+    if len(run_dirs) == 0:
+        print("No run found under {}".format(args.run_dir), file=sys.stderr)
+        return EXIT_ERROR
+    base_run_dirs = []
+    if args.compare is not None:
+        base_run_dirs = list(utils.get_run_dirs(args.compare))
+        if len(base_run_dirs) == 0:
+            print("No run found under {}".format(args.compare), file=sys.stderr)
+            return EXIT_ERROR
+
+    if args.export is not None:
+        exporter = Exporter(args.export, args.export_format, args.workers)
+        try:
+            exported = exporter.export(args.run_dir, args.job)
+        except ImportError as ex:
+            print("Failed to export: {}".format(ex), file=sys.stderr)
+            return EXIT_ERROR
+        print("Exported {} traces, skipped {} unchanged traces.".format(len(exported), len(exporter.skipped)))
+        if args.output is None and args.compare is None:
+            return 0
+
+    # Load the baseline runs together so that they share the processes.
+    all_runs = load_runs(run_dirs + [("baseline:" + name, run_dir) for name, run_dir in base_run_dirs], args.workers)
+    runs = {name: all_runs[name] for name, _ in run_dirs if name in all_runs}
+    base_runs = {name: all_runs["baseline:" + name] for name, _ in base_run_dirs if "baseline:" + name in all_runs}
+    failed_dirs = [run_dir for name, run_dir in run_dirs if name not in runs] + \
+                  [run_dir for name, run_dir in base_run_dirs if name not in base_runs]
+    if len(failed_dirs) > 0:
+        print("Failed to load the runs under {}".format(", ".join(failed_dirs)), file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.output is not None:
+        try:
+            for run in runs.values():
+                for worker, profile in run.profiles.items():
+                    worker_dir = os.path.join(args.output, run.name, worker)
+                    os.makedirs(worker_dir, exist_ok=True)
+                    for table_name, df in get_profile_tables(profile):
+                        write_dataframe(df, os.path.join(worker_dir, "{}.{}".format(table_name, args.format)),
+                                        args.format)
+        except ImportError as ex:
+            print("Failed to write {}: {}".format(args.format, ex), file=sys.stderr)
+            return EXIT_ERROR
+
+    if args.compare is None:
+        return 0
+
+    diffs, regressions = compare_runs(base_runs, runs, args.step_time_threshold, args.op_threshold)
+    if len(diffs) == 0:
+        # Passing without comparing anything would hide the regressions from CI.
+        print("No run or worker of {} matches the baseline {}".format(args.run_dir, args.compare), file=sys.stderr)
+        return EXIT_ERROR
+    if args.output is not None:
+        for run_name, worker, diff in diffs:
+            worker_dir = os.path.join(args.output, run_name, worker)
+            os.makedirs(worker_dir, exist_ok=True)
+            with open(os.path.join(worker_dir, "diff.json"), "w") as f:
+                json.dump(diff, f, indent=2)
+    for run_name, worker, diff in diffs:
+        print("{}/{}: average step time {}us -> {}us".format(
+            run_name, worker, diff["summary"]["base_step_time"], diff["summary"]["exp_step_time"]))
+    if len(regressions) > 0:
+        print("Regressions found:", file=sys.stderr)
+        for regression in regressions:
+            print("  " + regression, file=sys.stderr)
+        return EXIT_REGRESSION
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
+import tempfile
 from collections import namedtuple
 
 PLUGIN_NAME = "pytorch_profiler"
@@ -15,8 +17,22 @@ TRACE_GZIP_FILE_SUFFIX = ".pt.trace.json.gz"
 
 MONITOR_RUN_REFRESH_INTERNAL_IN_SECONDS = 10
 
+MEMORY_CURVE_MAX_POINTS = 1000
+
+# Sidecar file in a run directory overriding the warm-up and tail steps to drop.
+STEPS_CONFIG_FILE_NAME = "tb_profiler_steps.json"
+# Count of the runs loaded with the steps overridden by URL parameters, kept in memory.
+STEPS_OVERRIDE_RUNS_CACHE_SIZE = 4
+
+OUTLIER_OPS_TOP = 20
+
+TREND_SUMMARY_MAX_OPS = 50
+TREND_SUMMARY_CACHE_DIR = os.path.join(tempfile.gettempdir(), "torch_tb_profiler", "summaries")
+
 View = namedtuple("View", "id, name, display_name")
 OVERALL_VIEW = View(1, "overall", "Overview")
 OP_VIEW = View(2, "operator", "Operator")
 KERNEL_VIEW = View(3, "kernel", "Kernel")
 TRACE_VIEW = View(4, "trace", "Trace")
+MEMORY_VIEW = View(5, "memory", "Memory")
+LAUNCH_VIEW = View(6, "launch", "Launch")
@@ -0,0 +1,160 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+"""Export the aggregated statistics of many runs to a partitioned dataset for fleet-wide analytics.
+
+Each table is written as one file per trace, partitioned in the hive style:
+
+    OUTPUT_DIR/<table>/job=<job>/run=<run>/worker=<worker>/part-<fingerprint>.parquet
+
+The tables are "ops" (operators grouped by name and input shape), "kernels" (grouped by name and operator),
+"kernel_stats" (grouped by name with the launch configurations) and "steps" (per-step costs).
+Every row has the job, run, worker and fingerprint columns. OUTPUT_DIR/_manifest.json records the
+fingerprints of the exported traces, so exporting again only processes the new or changed traces.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+from . import api, consts, utils
+from .profiler.loader import get_workers
+
+logger = utils.get_logger()
+
+EXPORT_TABLES = ["ops", "kernels", "kernel_stats", "steps"]
+EXPORT_FORMATS = ["parquet", "csv"]
+MANIFEST_FILE_NAME = "_manifest.json"
+
+
+def get_trace_path(run_dir, worker):
+    trace_path = os.path.join(run_dir, worker + consts.TRACE_FILE_SUFFIX)
+    if not os.path.isfile(trace_path):
+        trace_path = os.path.join(run_dir, worker + consts.TRACE_GZIP_FILE_SUFFIX)
+    return trace_path
+
+
+def get_fingerprint(path):
+    """Return the sha1 of the file content."""
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def check_parquet_engine():
+    """Raise ImportError if neither pyarrow nor fastparquet is installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        try:
+            import fastparquet  # noqa: F401
+        except ImportError:
+            raise ImportError("Exporting parquet requires pyarrow or fastparquet. "
+                              "Please install it by 'pip install pyarrow'.")
+
+
+def get_partition_dir(output_dir, table, job, run, worker):
+    # Partition values are uri encoded, which is the default segment encoding of pyarrow's hive partitioning.
+    return os.path.join(output_dir, table, "job=" + quote(job, safe=""), "run=" + quote(run, safe=""),
+                        "worker=" + quote(worker, safe=""))
+
+
+def export_trace(task):
+    """Export the tables of one trace, task is (output_dir, output_format, job, run, run_dir, worker, fingerprint).
+    Return the manifest entry, or None if it fails."""
+    output_dir, output_format, job, run, run_dir, worker, fingerprint = task
+    try:
+        profile = api.load_profile(run_dir, worker)
+        ops_df = profile.ops_df("input_shape").rename(columns={"group": "input_shape"})
+        ops_df["input_shape"] = ops_df["input_shape"].astype(str)
+        tables = {"ops": ops_df,
+                  "kernels": profile.kernels_df(),
+                  "kernel_stats": profile.kernel_stats_df(),
+                  "steps": profile.step_costs_df()}
+        for table in EXPORT_TABLES:
+            df = tables[table]
+            df.insert(0, "job", job)
+            df.insert(1, "run", run)
+            df.insert(2, "worker", worker)
+            df.insert(3, "fingerprint", fingerprint)
+
+            partition_dir = get_partition_dir(output_dir, table, job, run, worker)
+            os.makedirs(partition_dir, exist_ok=True)
+            # A changed trace replaces the file of its previous version.
+            for name in os.listdir(partition_dir):
+                if name.startswith("part-"):
+                    os.remove(os.path.join(partition_dir, name))
+            path = os.path.join(partition_dir, "part-{}.{}".format(fingerprint, output_format))
+            if output_format == "parquet":
+                df.to_parquet(path, index=False)
+            else:
+                df.to_csv(path, index=False)
+    except Exception as ex:
+        logger.warning("Failed to export worker %s of run %s. Exception=%s", worker, run, ex, exc_info=True)
+        return None
+    return {"job": job, "run": run, "worker": worker, "fingerprint": fingerprint}
+
+
+class Exporter:
+    """Export the runs under log directories to output_dir, skipping the traces exported before."""
+
+    def __init__(self, output_dir, output_format="parquet", workers=1):
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.workers = workers
+        self.manifest = {}  # "job/run/worker" -> manifest entry of the exported trace.
+        self.exported = []  # Manifest entries exported by the last export() call.
+        self.skipped = []  # (job, run, worker) skipped since the trace is not changed.
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.output_dir, MANIFEST_FILE_NAME)
+
+    def _load_manifest(self):
+        self.manifest = {}
+        if os.path.isfile(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                self.manifest = json.load(f)
+
+    def _save_manifest(self):
+        # Write to a temp file and rename, so that an interrupted export doesn't corrupt the manifest.
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def export(self, logdir, job=None):
+        """Export all the runs under logdir. job defaults to the base name of logdir."""
+        if self.output_format == "parquet":
+            check_parquet_engine()
+        if job is None:
+            job = os.path.basename(os.path.abspath(logdir))
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._load_manifest()
+
+        tasks = []
+        self.skipped = []
+        for run, run_dir in utils.get_run_dirs(logdir):
+            for worker in get_workers(run_dir):
+                fingerprint = get_fingerprint(get_trace_path(run_dir, worker))
+                entry = self.manifest.get("/".join([job, run, worker]))
+                if entry is not None and entry["fingerprint"] == fingerprint:
+                    self.skipped.append((job, run, worker))
+                    continue
+                tasks.append((self.output_dir, self.output_format, job, run, run_dir, worker, fingerprint))
+
+        if self.workers <= 1 or len(tasks) <= 1:
+            entries = [export_trace(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                entries = list(executor.map(export_trace, tasks))
+
+        self.exported = [entry for entry in entries if entry is not None]
+        for entry in self.exported:
+            self.manifest["/".join([entry["job"], entry["run"], entry["worker"]])] = entry
+        self._save_manifest()
+        return self.exported
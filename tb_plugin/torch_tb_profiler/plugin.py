@@ -15,11 +15,11 @@ from collections import OrderedDict
 
 import werkzeug
 from tensorboard.plugins import base_plugin
-from werkzeug import wrappers
+from werkzeug import exceptions, wrappers
 
 from . import consts
 from . import utils
-from .profiler import RunLoader
+from .profiler import RunLoader, StepsConfig, SummaryCache, generate_run_diff, generate_trend
 from .run import Run
 
 logger = utils.get_logger()
@@ -43,14 +43,32 @@ class TorchProfilerPlugin(base_plugin.TBPlugin):
 
         self._runs = OrderedDict()
         self._runs_lock = threading.Lock()
+        # Lightweight summaries of the runs for the trend, guarded by _runs_lock.
+        # They are also cached on disk, so the trend is available before the runs are loaded again.
+        self._summaries = OrderedDict()
+        self._summary_cache = SummaryCache(consts.TREND_SUMMARY_CACHE_DIR)
+        # Runs loaded again with the steps config overridden by URL parameters: (name, *config key) -> Run,
+        # or None if the loading failed. They are loaded in background, the keys being loaded are in
+        # _loading_overridden_runs. Both are guarded by _overridden_runs_lock.
+        self._overridden_runs = OrderedDict()
+        self._loading_overridden_runs = set()
+        self._overridden_runs_lock = threading.Lock()
+        # Sidecar steps configs of the runs: run_dir -> (mtime of the file or None if missing, StepsConfig),
+        # guarded by _overridden_runs_lock. They are read again only when the file changes.
+        self._steps_configs = {}
 
         self._queue = multiprocessing.Queue()
+        self._overridden_queue = multiprocessing.Queue()
         monitor_runs = threading.Thread(target=self.monitor_runs, name="monitor_runs", daemon=True)
         monitor_runs.start()
 
         receive_runs = threading.Thread(target=self.receive_runs, name="receive_runs", daemon=True)
         receive_runs.start()
 
+        receive_overridden_runs = threading.Thread(target=self.receive_overridden_runs,
+                                                   name="receive_overridden_runs", daemon=True)
+        receive_overridden_runs.start()
+
     def is_active(self):
         """Returns whether there is relevant data for the plugin to process.
         """
@@ -73,8 +91,23 @@ class TorchProfilerPlugin(base_plugin.TBPlugin):
             "/overview": self.overview_route,
             "/operation": self.operation_pie_route,
             "/operation/table": self.operation_table_route,
+            "/call_tree": self.call_tree_route,
+            "/call_tree/flamegraph": self.flamegraph_route,
             "/kernel": self.kernel_pie_route,
             "/kernel/table": self.kernel_table_route,
+            "/skew": self.step_skew_route,
+            "/step_stats": self.step_stats_route,
+            "/diff": self.diff_route,
+            "/trend": self.trend_route,
+            "/gpu_metrics": self.gpu_metrics_route,
+            "/launch": self.launch_route,
+            "/sync": self.sync_route,
+            "/dataloader": self.dataloader_route,
+            "/findings": self.findings_route,
+            "/optimizer": self.optimizer_route,
+            "/critical_path": self.critical_path_route,
+            "/memory": self.memory_route,
+            "/memory/table": self.memory_table_route,
             "/trace": self.trace_route
         }
 
@@ -99,6 +132,10 @@ class TorchProfilerPlugin(base_plugin.TBPlugin):
                     if name not in touched:
                         logger.info("Find run %s under %s", name, run_dir)
                         touched.add(name)
+                        summary = self._summary_cache.get(run_dir)
+                        if summary is not None:
+                            summary.name = name
+                            self._add_summary(summary)
                         # Use multiprocessing to avoid UI stall and reduce data parsing time
                         process = multiprocessing.Process(target=_load_run, args=(self._queue, name, run_dir))
                         process.daemon = True
@@ -125,30 +162,111 @@ class TorchProfilerPlugin(base_plugin.TBPlugin):
                 if not self._is_active:
                     self._is_active = True
 
+            if run.summary is not None:
+                self._add_summary(run.summary)
+                self._summary_cache.put(run.summary)
+
+    def receive_overridden_runs(self):
+        while True:
+            key, run = self._overridden_queue.get()
+            logger.info("Add run %s with warmup_steps=%s, tail_steps=%s", *key)
+            with self._overridden_runs_lock:
+                self._loading_overridden_runs.discard(key)
+                self._overridden_runs[key] = run
+                while len(self._overridden_runs) > consts.STEPS_OVERRIDE_RUNS_CACHE_SIZE:
+                    self._overridden_runs.popitem(last=False)
+
+    def _add_summary(self, summary):
+        with self._runs_lock:
+            self._summaries[summary.name] = summary
+            self._summaries = OrderedDict(sorted(self._summaries.items()))
+
     def _get_run_dirs(self):
-        """Scan logdir, find PyTorch Profiler run directories.
-        A directory is considered to be a run if it contains 1 or more *.pt.trace.json[.gz].
-        E.g. there are 2 runs: run1, run2
-            /run1
-                /[worker1].pt.trace.json.gz
-                /[worker2].pt.trace.json.gz
-            /run2
-                /[worker1].pt.trace.json
-        """
-        for root, _, files in os.walk(self.logdir):
-            for file in files:
-                if utils.is_chrome_trace_file(file):
-                    run_dir = os.path.abspath(root)
-                    if run_dir == self.logdir:
-                        name = os.path.basename(run_dir)
-                    else:
-                        name = os.path.relpath(run_dir, self.logdir)
-                    yield name, run_dir
-                    break
-
-    def get_run(self, name) -> Run:
+        return utils.get_run_dirs(self.logdir)
+
+    def get_run(self, name, steps_overrides=None) -> Run:
+        """steps_overrides: dict of StepsConfig's field -> value overriding the run's config. If given,
+        the run is loaded again in background with the overridden config. Until the loading finishes,
+        the request is answered with 202 and {"status": "loading"} instead of the run with its own config."""
         with self._runs_lock:
-            return self._runs.get(name, None)
+            run = self._runs.get(name, None)
+        if run is None or not steps_overrides:
+            return run
+        return self._get_overridden_run(run, steps_overrides)
+
+    def _get_steps_config(self, run_dir):
+        path = os.path.join(run_dir, consts.STEPS_CONFIG_FILE_NAME)
+        mtime = os.path.getmtime(path) if os.path.isfile(path) else None
+        with self._overridden_runs_lock:
+            cached = self._steps_configs.get(run_dir)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        steps_config = StepsConfig.load(run_dir)
+        with self._overridden_runs_lock:
+            self._steps_configs[run_dir] = (mtime, steps_config)
+        return steps_config
+
+    def _get_overridden_run(self, run, steps_overrides):
+        run_steps_config = self._get_steps_config(run.run_dir)
+        steps_config = run_steps_config.update(steps_overrides)
+        if steps_config.key == run_steps_config.key:
+            return run
+        key = (run.name,) + steps_config.key
+        with self._overridden_runs_lock:
+            if key in self._overridden_runs:
+                self._overridden_runs.move_to_end(key)
+                overridden_run = self._overridden_runs[key]
+                if overridden_run is None:
+                    self._abort_overridden_run(key, "failed", 500)
+                return overridden_run
+            # The concurrent requests of the same config don't load it repeatedly.
+            is_loading = key in self._loading_overridden_runs
+            self._loading_overridden_runs.add(key)
+
+        if not is_loading:
+            logger.info("Load run %s with warmup_steps=%s, tail_steps=%s", *key)
+            # Use multiprocessing as monitor_runs does, so that the requests aren't blocked by the parsing.
+            process = multiprocessing.Process(target=_load_overridden_run,
+                                              args=(self._overridden_queue, key, run.run_dir, steps_config))
+            process.daemon = True
+            process.start()
+        self._abort_overridden_run(key, "loading", 202)
+
+    def _abort_overridden_run(self, key, status, code):
+        """Answer the request with the status of the run loaded with overridden steps config, so that
+        the client doesn't take the run with its own config as the requested one."""
+        content = json.dumps({"status": status, "run": key[0], "warmup_steps": key[1], "tail_steps": key[2]})
+        raise exceptions.HTTPException(
+            response=werkzeug.Response(content, status=code, content_type="application/json"))
+
+    @staticmethod
+    def _get_steps_overrides(request):
+        """Return the steps config overridden by the URL parameters warmup_steps and tail_steps,
+        whose value is the number of steps or "auto"."""
+        overrides = {}
+        for field in ["warmup_steps", "tail_steps"]:
+            if field in request.args:
+                try:
+                    overrides[field] = StepsConfig.parse_steps(request.args.get(field))
+                except ValueError:
+                    logger.warning("Ignore invalid %s: %s", field, request.args.get(field))
+        return overrides
+
+    @staticmethod
+    def _get_int_arg(request, name, default, min_value=None):
+        """Return the integer URL parameter, or the default if it is missing, invalid or less than min_value."""
+        value = request.args.get(name)
+        if value is None:
+            return default
+        try:
+            result = int(value)
+        except ValueError:
+            logger.warning("Ignore invalid %s: %s", name, value)
+            return default
+        if min_value is not None and result < min_value:
+            logger.warning("Ignore invalid %s: %s", name, value)
+            return default
+        return result
 
     @wrappers.Request.application
     def runs_route(self, request):
@@ -159,7 +277,7 @@ class TorchProfilerPlugin(base_plugin.TBPlugin):
     @wrappers.Request.application
     def views_route(self, request):
         name = request.args.get("run")
-        run = self.get_run(name)
+        run = self.get_run(name, self._get_steps_overrides(request))
         views = sorted(run.views, key=lambda x: x.id)
         views_list = []
         for view in views:
@@ -169,16 +287,19 @@ class TorchProfilerPlugin(base_plugin.TBPlugin):
     @wrappers.Request.application
     def workers_route(self, request):
         name = request.args.get("run")
-        run = self.get_run(name)
+        run = self.get_run(name, self._get_steps_overrides(request))
         return self.respond_as_json(run.workers)
 
     @wrappers.Request.application
     def overview_route(self, request):
         name = request.args.get("run")
         worker = request.args.get("worker")
-        run = self.get_run(name)
+        exclude_outliers = request.args.get("exclude_outliers", "false").lower() in ("1", "true")
+        run = self.get_run(name, self._get_steps_overrides(request))
         profile = run.get_profile(worker)
         data = profile.overview
+        if exclude_outliers and profile.overview_without_outliers is not None:
+            data = profile.overview_without_outliers
         is_gpu_used = profile.has_runtime or profile.has_kernel or profile.has_memcpy_or_memset
         data["environments"] = [{"title": "Number of Worker(s)", "value": str(len(run.workers))},
                                 {"title": "Device Type", "value": "GPU" if is_gpu_used else "CPU"}]
@@ -189,10 +310,14 @@ class TorchProfilerPlugin(base_plugin.TBPlugin):
         name = request.args.get("run")
         worker = request.args.get("worker")
         group_by = request.args.get("group_by")
-        run = self.get_run(name)
+        run = self.get_run(name, self._get_steps_overrides(request))
         profile = run.get_profile(worker)
         if group_by == "OperationAndInputShape":
             return self.respond_as_json(profile.operation_pie_by_name_input)
+        elif group_by == "OperationAndModule":
+            return self.respond_as_json(profile.operation_pie_by_name_module)
+        elif group_by == "OperationAndPhase":
+            return self.respond_as_json(profile.operation_pie_by_name_phase)
         else:
             return self.respond_as_json(profile.operation_pie_by_name)
 
@@ -201,18 +326,49 @@ class TorchProfilerPlugin(base_plugin.TBPlugin):
         name = request.args.get("run")
         worker = request.args.get("worker")
         group_by = request.args.get("group_by")
-        run = self.get_run(name)
+        step = request.args.get("step")
+        run = self.get_run(name, self._get_steps_overrides(request))
         profile = run.get_profile(worker)
+        if step:
+            # The operators of a single step are only grouped by name.
+            if step not in profile.operation_table_by_step:
+                return werkzeug.Response('404 Not Found', status=404, content_type='text/plain')
+            return self.respond_as_json(profile.operation_table_by_step[step])
         if group_by == "OperationAndInputShape":
             return self.respond_as_json(profile.operation_table_by_name_input)
+        elif group_by == "OperationAndModule":
+            return self.respond_as_json(profile.operation_table_by_name_module)
+        elif group_by == "OperationAndPhase":
+            return self.respond_as_json(profile.operation_table_by_name_phase)
         else:
             return self.respond_as_json(profile.operation_table_by_name)
 
+    @wrappers.Request.application
+    def call_tree_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        node_id = self._get_int_arg(request, "node_id", 0)
+        depth = self._get_int_arg(request, "depth", 1)
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        return self.respond_as_json(profile.get_call_subtree(node_id, depth))
+
+    @wrappers.Request.application
+    def flamegraph_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        metric = request.args.get("metric", "host")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        if metric not in profile.flamegraph:
+            return werkzeug.Response('404 Not Found', status=404, content_type='text/plain')
+        return werkzeug.Response(profile.flamegraph[metric], content_type="text/plain")
+
     @wrappers.Request.application
     def kernel_pie_route(self, request):
         name = request.args.get("run")
         worker = request.args.get("worker")
-        run = self.get_run(name)
+        run = self.get_run(name, self._get_steps_overrides(request))
         profile = run.get_profile(worker)
         return self.respond_as_json(profile.kernel_pie)
 
@@ -221,19 +377,162 @@ class TorchProfilerPlugin(base_plugin.TBPlugin):
         name = request.args.get("run")
         worker = request.args.get("worker")
         group_by = request.args.get("group_by")
-        run = self.get_run(name)
+        step = request.args.get("step")
+        run = self.get_run(name, self._get_steps_overrides(request))
         profile = run.get_profile(worker)
+        if step:
+            # The kernels of a single step are only grouped by name and operator.
+            if profile.kernel_op_table_by_step is None or step not in profile.kernel_op_table_by_step:
+                return werkzeug.Response('404 Not Found', status=404, content_type='text/plain')
+            return self.respond_as_json(profile.kernel_op_table_by_step[step])
         if group_by == "Kernel":
             return self.respond_as_json(profile.kernel_table)
+        elif group_by == "KernelFamily":
+            return self.respond_as_json(profile.kernel_family_table)
+        elif group_by == "KernelFamilyAndOp":
+            return self.respond_as_json(profile.kernel_family_op_table)
+        elif group_by == "KernelAndModule":
+            return self.respond_as_json(profile.kernel_module_table)
+        elif group_by == "KernelAndPhase":
+            return self.respond_as_json(profile.kernel_phase_table)
         else:
             return self.respond_as_json(profile.kernel_op_table)
 
+    @wrappers.Request.application
+    def gpu_metrics_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        return self.respond_as_json(profile.gpu_metrics)
+
+    @wrappers.Request.application
+    def launch_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        return self.respond_as_json(profile.launch)
+
+    @wrappers.Request.application
+    def sync_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        return self.respond_as_json(profile.sync)
+
+    @wrappers.Request.application
+    def findings_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        return self.respond_as_json(profile.findings)
+
+    @wrappers.Request.application
+    def dataloader_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        return self.respond_as_json(profile.dataloader)
+
+    @wrappers.Request.application
+    def optimizer_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        return self.respond_as_json(profile.optimizer)
+
+    @wrappers.Request.application
+    def critical_path_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        return self.respond_as_json(profile.critical_path)
+
+    @wrappers.Request.application
+    def memory_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        device = request.args.get("device")
+        max_points = self._get_int_arg(request, "max_points", consts.MEMORY_CURVE_MAX_POINTS)
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        if not device and len(profile.memory_devices) > 0:
+            device = profile.memory_devices[0]
+        if device not in profile.memory_devices:
+            return werkzeug.Response('404 Not Found', status=404, content_type='text/plain')
+        curve = utils.downsample_curve(profile.memory_curves[device], max_points)
+        data = {"devices": profile.memory_devices,
+                "peak": profile.memory_peaks[device],
+                "curve": {"columns": [{"type": "number", "name": "Time (ms)"},
+                                      {"type": "number", "name": "Allocated (MB)"}],
+                          "rows": curve}}
+        return self.respond_as_json(data)
+
+    @wrappers.Request.application
+    def memory_table_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        device = request.args.get("device")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        if not device and len(profile.memory_devices) > 0:
+            device = profile.memory_devices[0]
+        if device not in profile.memory_devices:
+            return werkzeug.Response('404 Not Found', status=404, content_type='text/plain')
+        return self.respond_as_json(profile.memory_op_table[device])
+
+    @wrappers.Request.application
+    def step_stats_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        profile = run.get_profile(worker)
+        return self.respond_as_json(profile.step_stats)
+
+    @wrappers.Request.application
+    def step_skew_route(self, request):
+        name = request.args.get("run")
+        run = self.get_run(name, self._get_steps_overrides(request))
+        return self.respond_as_json(run.step_skew)
+
+    @wrappers.Request.application
+    def diff_route(self, request):
+        name = request.args.get("run")
+        worker = request.args.get("worker")
+        exp_name = request.args.get("exp_run", name)
+        exp_worker = request.args.get("exp_worker", worker)
+        top = self._get_int_arg(request, "top", 20, min_value=1)
+        steps_overrides = self._get_steps_overrides(request)
+        base_run = self.get_run(name, steps_overrides)
+        exp_run = self.get_run(exp_name, steps_overrides)
+        if base_run is None or exp_run is None:
+            return werkzeug.Response('404 Not Found', status=404, content_type='text/plain')
+        base_profile = base_run.get_profile(worker)
+        exp_profile = exp_run.get_profile(exp_worker)
+        if base_profile is None or exp_profile is None:
+            return werkzeug.Response('404 Not Found', status=404, content_type='text/plain')
+        return self.respond_as_json(generate_run_diff(base_profile, exp_profile, top))
+
+    @wrappers.Request.application
+    def trend_route(self, request):
+        top = self._get_int_arg(request, "top", 10, min_value=1)
+        order_by = request.args.get("order_by", "name")
+        with self._runs_lock:
+            summaries = list(self._summaries.values())
+        return self.respond_as_json(generate_trend(summaries, top, order_by))
+
     @wrappers.Request.application
     def trace_route(self, request):
         name = request.args.get("run")
         worker = request.args.get("worker")
 
-        run = self.get_run(name)
+        run = self.get_run(name, self._get_steps_overrides(request))
         profile = run.get_profile(worker)
         fopen = open
         with fopen(profile.trace_file_path, 'rb') as f:
@@ -286,3 +585,17 @@ def _load_run(queue, name, run_dir):
         queue.put(run)
     except Exception as ex:
         logger.warning("Failed to load run %s. Exception=%s", ex, name, exc_info=True)
+
+
+def _load_overridden_run(queue, key, run_dir, steps_config):
+    import absl.logging
+    absl.logging.use_absl_handler()
+
+    run = None
+    try:
+        run = RunLoader(key[0], run_dir, steps_config).load()
+    except Exception as ex:
+        logger.warning("Failed to load run %s with warmup_steps=%s, tail_steps=%s. Exception=%s",
+                       *key, ex, exc_info=True)
+    # Always put it, so that the plugin stops waiting for the key. None means the loading failed.
+    queue.put((key, run))
@@ -3,5 +3,8 @@
 # --------------------------------------------------------------------------
 
 from .loader import RunLoader
+from .run_generator import generate_run_diff, generate_trend
+from .steady_state import StepsConfig
+from .trend import RunSummary, SummaryCache
 
-__all__ = ["RunLoader"]
+__all__ = ["RunLoader", "RunSummary", "StepsConfig", "SummaryCache", "generate_run_diff", "generate_trend"]
@@ -0,0 +1,77 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+from .module_parser import ProfilerStepNode
+from .. import utils
+
+logger = utils.get_logger()
+
+# ProfilerStep#N are renamed to it, so that the same call paths of different steps are merged.
+PROFILER_STEP_NAME = "ProfilerStep#*"
+
+
+class CallTreeNodeAgg:
+    def __init__(self, node_id, name):
+        self.id = node_id
+        self.name = name
+        self.calls = 0
+        self.host_duration = 0  # Inclusive.
+        self.self_host_duration = 0  # Exclusive.
+        self.device_duration = 0  # Inclusive.
+        self.self_device_duration = 0  # Exclusive.
+        self.children = {}  # name -> CallTreeNodeAgg
+
+
+class CallTreeParser:
+    """Aggregate the call trees of all threads into one tree, merging the nodes with the same call path.
+    The top level nodes are threads, and runtime calls are kept as leaves.
+    """
+
+    def __init__(self):
+        self.nodes = []  # CallTreeNodeAgg indexed by id, nodes[0] is the root.
+
+    def _get_child(self, parent, name):
+        if name not in parent.children:
+            agg = CallTreeNodeAgg(len(self.nodes), name)
+            self.nodes.append(agg)
+            parent.children[name] = agg
+        return parent.children[name]
+
+    def parse(self, tid2tree):
+        self.nodes = []
+        root_agg = CallTreeNodeAgg(0, "CallTreeRoot")
+        self.nodes.append(root_agg)
+        for tid in sorted(tid2tree.keys(), key=str):
+            root = tid2tree[tid]
+            thread_agg = self._get_child(root_agg, "Thread {}".format(tid))
+            thread_agg.calls += 1
+            thread_agg.device_duration += root.device_duration
+
+            node_stack = [(root, thread_agg)]
+            while len(node_stack) > 0:
+                node, agg = node_stack.pop()
+                for rt in node.runtimes:
+                    rt_agg = self._get_child(agg, rt.name)
+                    rt_agg.calls += 1
+                    rt_agg.host_duration += rt.end_time - rt.start_time
+                    rt_agg.self_host_duration += rt.end_time - rt.start_time
+                    rt_agg.device_duration += rt.device_duration
+                    rt_agg.self_device_duration += rt.device_duration
+                for child in node.children:
+                    name = PROFILER_STEP_NAME if type(child) is ProfilerStepNode else child.name
+                    child_agg = self._get_child(agg, name)
+                    child_agg.calls += 1
+                    child_agg.host_duration += child.end_time - child.start_time
+                    child_agg.self_host_duration += child.self_host_duration
+                    child_agg.device_duration += child.device_duration
+                    child_agg.self_device_duration += child.self_device_duration
+                    node_stack.append((child, child_agg))
+
+            # The thread's time is its top level calls' time.
+            thread_agg.host_duration = sum(agg.host_duration for agg in thread_agg.children.values())
+
+        root_agg.calls = 1
+        for thread_agg in root_agg.children.values():
+            root_agg.host_duration += thread_agg.host_duration
+            root_agg.device_duration += thread_agg.device_duration
@@ -0,0 +1,213 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import bisect
+
+from .module_parser import ProfilerStepNode, find_innermost_op
+from .overall_parser import is_sync_runtime
+from .trace import EventTypes
+from .. import utils
+
+logger = utils.get_logger()
+
+# Kinds of the vertices in the dependency graph.
+VERTEX_CPU = "CPU"  # Host time between two runtime calls on a thread.
+VERTEX_RUNTIME = "Runtime"
+VERTEX_KERNEL = "Kernel"
+VERTEX_MEMCPY = "Memcpy"
+VERTEX_MEMSET = "Memset"
+DEVICE_VERTEX_KINDS = {EventTypes.KERNEL: VERTEX_KERNEL, EventTypes.MEMCPY: VERTEX_MEMCPY,
+                       EventTypes.MEMSET: VERTEX_MEMSET}
+
+WHAT_IF_TOP_OPS = 10  # Number of operators on the critical path to estimate the speedup for.
+WHAT_IF_SPEEDUPS = [2, 10]  # Operator speedup factors used in the what-if estimation.
+
+
+class DependencyGraph:
+    """A DAG whose vertices are weighted by duration, stored as parallel lists."""
+
+    def __init__(self):
+        self.weights = []
+        self.kinds = []
+        self.names = []
+        self.op_names = []  # Operator the vertex is attributed to, None if not inside any operator.
+        self.successors = []
+
+    def add_vertex(self, weight, kind, name, op_name):
+        self.weights.append(weight)
+        self.kinds.append(kind)
+        self.names.append(name)
+        self.op_names.append(op_name)
+        self.successors.append([])
+        return len(self.weights) - 1
+
+    def add_edge(self, u, v):
+        if u is not None and v is not None and u != v:
+            self.successors[u].append(v)
+
+    def longest_path(self, weights=None):
+        """Return (length, vertex list) of the longest path, visiting vertices in topological order (Kahn)."""
+        if weights is None:
+            weights = self.weights
+        count = len(weights)
+        in_degree = [0] * count
+        for succs in self.successors:
+            for v in succs:
+                in_degree[v] += 1
+        dist = [0] * count
+        prev = [None] * count
+        ready = [v for v in range(count) if in_degree[v] == 0]
+        for v in ready:
+            dist[v] = weights[v]
+        while len(ready) > 0:
+            u = ready.pop()
+            for v in self.successors[u]:
+                if prev[v] is None or dist[u] + weights[v] > dist[v]:
+                    dist[v] = dist[u] + weights[v]
+                    prev[v] = u
+                in_degree[v] -= 1
+                if in_degree[v] == 0:
+                    ready.append(v)
+
+        if count == 0:
+            return 0, []
+        end = max(range(count), key=lambda x: dist[x])
+        path = []
+        v = end
+        while v is not None:
+            path.append(v)
+            v = prev[v]
+        path.reverse()
+        return dist[end], path
+
+
+class CriticalPath:
+    def __init__(self):
+        self.length = 0  # Sum of the vertices' durations on the path.
+        self.vertices = []  # List of (kind, name, op_name, duration) from the start of the step to the end.
+        self.op_costs = {}  # op_name -> {kind: duration on the path}.
+        self.kind_costs = {}  # kind -> duration on the path.
+        self.what_if = []  # List of (op_name, speedup, saved time) estimated by shrinking the operator's vertices.
+
+
+def _owner_name(node):
+    if node is None or type(node) is ProfilerStepNode or node.name == "CallTreeRoot":
+        return None
+    return node.name
+
+
+class CriticalPathParser:
+    """Build a dependency graph for each step from the host call trees, runtime to device correlations
+    and the ordering on each GPU stream, then find the chain of CPU ops, launches and kernels
+    which determines the step time.
+    """
+
+    def __init__(self):
+        self.steps_critical_paths = []  # List of CriticalPath, one for each step.
+        self._children_start_times = {}  # id(node) -> start times of its children, for binary search.
+
+    def parse(self, tid2tree, steps):
+        """steps: host side spans of the steps, list of (start_time, end_time)."""
+        steps_start_time = [step[0] for step in steps]
+        steps_threads = [{} for _ in steps]  # tid -> list of (runtime, owner op name) inside the step.
+        steps_threads_span = [{} for _ in steps]  # tid -> (start, end) of top level operators inside the step.
+        for tid, root in tid2tree.items():
+            for node in root.children:
+                i_step = bisect.bisect_right(steps_start_time, node.start_time) - 1
+                if i_step < 0 or node.start_time >= steps[i_step][1]:
+                    continue
+                end_time = min(node.end_time, steps[i_step][1])
+                span = steps_threads_span[i_step].get(tid, (node.start_time, end_time))
+                steps_threads_span[i_step][tid] = (min(span[0], node.start_time), max(span[1], end_time))
+
+            node_stack = [root]
+            while len(node_stack) > 0:
+                node = node_stack.pop()
+                for rt in node.runtimes:
+                    i_step = bisect.bisect_right(steps_start_time, rt.start_time) - 1
+                    if i_step < 0 or rt.start_time >= steps[i_step][1]:
+                        continue
+                    steps_threads[i_step].setdefault(tid, []).append((rt, _owner_name(node)))
+                node_stack.extend(node.children)
+
+        self.steps_critical_paths = []
+        for i_step in range(len(steps)):
+            graph = self._build_graph(tid2tree, steps_threads[i_step], steps_threads_span[i_step])
+            self.steps_critical_paths.append(self._analyze_graph(graph))
+
+    def _build_graph(self, tid2tree, threads, threads_span):
+        def cpu_op_name(tid, ts):
+            # Host time is attributed to the operator running at its beginning.
+            return _owner_name(find_innermost_op(tid2tree[tid], ts, self._children_start_times))
+
+        graph = DependencyGraph()
+        stream_last_vertex = {}  # (device, stream) -> last device vertex on the stream.
+        device_vertices = []  # List of (start_time, vertex, device node).
+        sync_vertices = []  # List of (runtime, vertex) of the synchronization calls.
+        for tid in sorted(set(threads.keys()) | set(threads_span.keys()), key=str):
+            runtimes = sorted(threads.get(tid, []), key=lambda x: x[0].start_time)
+            span = threads_span.get(tid)
+            prev_end = span[0] if span is not None else runtimes[0][0].start_time
+            prev_vertex = None
+            for rt, op_name in runtimes:
+                cpu_name = cpu_op_name(tid, prev_end)
+                cpu_vertex = graph.add_vertex(max(rt.start_time - prev_end, 0), VERTEX_CPU, cpu_name, cpu_name)
+                graph.add_edge(prev_vertex, cpu_vertex)
+                rt_vertex = graph.add_vertex(rt.end_time - rt.start_time, VERTEX_RUNTIME, rt.name, op_name)
+                graph.add_edge(cpu_vertex, rt_vertex)
+                if rt.device_nodes is not None:
+                    for device_node in rt.device_nodes:
+                        kind = DEVICE_VERTEX_KINDS.get(device_node.type, VERTEX_KERNEL)
+                        device_vertex = graph.add_vertex(device_node.end_time - device_node.start_time, kind,
+                                                         device_node.name, _owner_name(device_node.op_node))
+                        graph.add_edge(rt_vertex, device_vertex)
+                        device_vertices.append((device_node.start_time, device_vertex, device_node))
+                if is_sync_runtime(rt.name):
+                    sync_vertices.append((rt, rt_vertex))
+                prev_vertex = rt_vertex
+                prev_end = max(prev_end, rt.end_time)
+            if span is not None and span[1] > prev_end:
+                cpu_name = cpu_op_name(tid, prev_end)
+                tail_vertex = graph.add_vertex(span[1] - prev_end, VERTEX_CPU, cpu_name, cpu_name)
+                graph.add_edge(prev_vertex, tail_vertex)
+
+        # Device activities on the same stream run in order.
+        device_vertices.sort(key=lambda x: x[0])
+        for _, vertex, device_node in device_vertices:
+            key = (device_node.device_id, device_node.stream_id)
+            graph.add_edge(stream_last_vertex.get(key), vertex)
+            stream_last_vertex[key] = vertex
+
+        # A synchronization call returns after the device activities finishing during it,
+        # so only the part after the last of them is its own cost.
+        for rt, rt_vertex in sync_vertices:
+            last_end = rt.start_time
+            for start_time, vertex, device_node in device_vertices:
+                if start_time > rt.end_time:
+                    break
+                if rt.start_time <= device_node.end_time <= rt.end_time:
+                    graph.add_edge(vertex, rt_vertex)
+                    last_end = max(last_end, device_node.end_time)
+            graph.weights[rt_vertex] = rt.end_time - last_end
+        return graph
+
+    @staticmethod
+    def _analyze_graph(graph):
+        critical_path = CriticalPath()
+        critical_path.length, path = graph.longest_path()
+        for v in path:
+            kind, op_name, weight = graph.kinds[v], graph.op_names[v], graph.weights[v]
+            critical_path.vertices.append((kind, graph.names[v], op_name, weight))
+            critical_path.kind_costs[kind] = critical_path.kind_costs.get(kind, 0) + weight
+            if op_name is not None:
+                op_costs = critical_path.op_costs.setdefault(op_name, {})
+                op_costs[kind] = op_costs.get(kind, 0) + weight
+
+        top_ops = sorted(critical_path.op_costs.items(), key=lambda x: sum(x[1].values()), reverse=True)
+        for op_name, _ in top_ops[:WHAT_IF_TOP_OPS]:
+            for speedup in WHAT_IF_SPEEDUPS:
+                weights = [w / speedup if graph.op_names[v] == op_name else w for v, w in enumerate(graph.weights)]
+                length, _ = graph.longest_path(weights)
+                critical_path.what_if.append((op_name, speedup, critical_path.length - length))
+        return critical_path
@@ -15,9 +15,21 @@ import tempfile
 from collections import OrderedDict
 
 from . import trace
+from .call_tree_parser import CallTreeParser
+from .critical_path_parser import CriticalPathParser
+from .dataloader_parser import DataLoaderParser
+from .gpu_metrics_parser import GPUMetricsParser
 from .kernel_parser import KernelParser
+from .launch_parser import LaunchParser
+from .memory_parser import MemoryParser
 from .module_parser import ModuleParser
+from .optimizer_parser import OptimizerParser
 from .overall_parser import OverallParser
+from .phase_parser import PhaseParser
+from .rules import RuleEngine
+from .step_stats_parser import StepStatsParser
+from .sync_parser import SyncParser
+from .tensor_cores_parser import TensorCoresParser
 from .. import consts, utils
 
 logger = utils.get_logger()
@@ -28,6 +40,7 @@ class RunData(object):
         self.name = name
         self.run_dir = run_dir
         self.profiles = OrderedDict()
+        self.step_skews = []
 
 
 class RunProfileData(object):
@@ -38,15 +51,64 @@ class RunProfileData(object):
         self.trace_file_path = None
         self.has_runtime = False
         self.has_kernel = False
+        self.has_communication = False
         self.has_memcpy_or_memset = False
+        self.has_memory = False
+        self.has_sync = False
         self.steps_costs = None
         self.steps_names = None
         self.avg_costs = None
+        self.warmup_steps_names = []  # Warm-up steps excluded from steps_costs.
+        self.tail_steps_names = []  # Truncated tail steps excluded from steps_costs.
+        self.steps_costs_stats = None  # Field of OverallParser.Costs -> CostStats across steps.
+        self.steps_z_scores = None  # Modified z-score of each step's step time.
+        self.outlier_steps = []  # Indices of the outlier steps.
+        self.median_step = None  # Index of the step closest to the median step time.
+        self.avg_costs_without_outliers = None
+        self.outlier_steps_ops = None  # Index of outlier or median step -> op name -> OpStepAgg.
+        self.steps_phase_host_costs = None
+        self.steps_phase_device_costs = None
+        self.dataloader_steps_stats = None
+        self.dataloader_mean_wait = 0
+        self.dataloader_median_wait = 0
+        self.dataloader_std_wait = 0
+        self.dataloader_idle_correlation = None
+        self.optimizers = None
+        self.optimizer_steps_stats = None
+        self.gpu_devices = []
+        self.gpu_device_stats = None
+        self.gpu_steps_device_stats = None
         self.op_list_groupby_name = None
         self.op_list_groupby_name_input = None
+        self.op_list_groupby_name_module = None
+        self.op_list_groupby_name_phase = None
+        self.op_list_groupby_name_step = None
         self.kernel_list_groupby_name_op = None
+        self.kernel_list_groupby_name_module = None
+        self.kernel_list_groupby_name_phase = None
+        self.kernel_list_groupby_name_op_step = None
+        self.kernel_list_groupby_family_op = None
+        self.call_tree_nodes = None
         self.kernel_stat = None
-        self.recommendations = []
+        self.kernel_family_stat = None
+        self.memory_devices = []
+        self.memory_curves = None
+        self.memory_peaks = None
+        self.memory_op_stats = None
+        self.sync_points = None
+        self.steps_sync_duration = None
+        self.critical_paths = None
+        self.launch_op_latency_stats = None
+        self.launch_steps_latency_stats = None
+        self.launch_idle_costs = None
+        self.launch_steps_idle_costs = None
+        self.tc_ratio = 0  # Ratio of kernel time using Tensor Cores.
+        self.tc_eligible_ratio = 0  # Ratio of Tensor Cores time in kernels launched by eligible operators.
+        self.step_skews = []  # Cross-worker step skew analysis of the run, shared by all workers.
+        self.tid2tree = None  # Call tree of each thread, for the rules.
+        self.findings = []  # List of Finding of the rules.
+        self.rule_durations = {}  # Rule name -> running time in seconds.
+        self.recommendations = []  # Messages of the findings.
 
     @staticmethod
     def parse(run_dir, worker):
@@ -103,40 +165,130 @@ class RunProfileData(object):
 
         return profile
 
-    def process(self):
+    def process(self, steps_config=None):
+        """steps_config: StepsConfig of the warm-up and tail steps to drop, default to detecting them."""
         logger.debug("ModuleParser")
         module_parser = ModuleParser()
         module_parser.parse_events(self.events)
+        self.tid2tree = module_parser.tid2tree
         self.op_list_groupby_name = module_parser.op_list_groupby_name
         self.op_list_groupby_name_input = module_parser.op_list_groupby_name_input
+        self.op_list_groupby_name_module = module_parser.op_list_groupby_name_module
+        self.op_list_groupby_name_phase = module_parser.op_list_groupby_name_phase
+        self.op_list_groupby_name_step = module_parser.op_list_groupby_name_step
         self.kernel_list_groupby_name_op = module_parser.kernel_list_groupby_name_op
+        self.kernel_list_groupby_name_module = module_parser.kernel_list_groupby_name_module
+        self.kernel_list_groupby_name_phase = module_parser.kernel_list_groupby_name_phase
+        self.kernel_list_groupby_name_op_step = module_parser.kernel_list_groupby_name_op_step
+        self.kernel_list_groupby_family_op = module_parser.kernel_list_groupby_family_op
+
+        logger.debug("CallTreeParser")
+        call_tree_parser = CallTreeParser()
+        call_tree_parser.parse(module_parser.tid2tree)
+        self.call_tree_nodes = call_tree_parser.nodes
+
+        logger.debug("MemoryParser")
+        memory_parser = MemoryParser()
+        memory_parser.parse_events(self.events, module_parser.tid2tree)
+        self.has_memory = len(memory_parser.devices) > 0
+        self.memory_devices = memory_parser.devices
+        self.memory_curves = memory_parser.device_curves
+        self.memory_peaks = memory_parser.device_peaks
+        self.memory_op_stats = memory_parser.device_op_stats
 
         logger.debug("OverallParser")
-        overall_parser = OverallParser()
+        overall_parser = OverallParser(steps_config)
         overall_parser.parse_events(self.events, module_parser.runtime_node_list, module_parser.device_node_list)
         self.has_runtime = overall_parser.has_runtime
         self.has_kernel = overall_parser.has_kernel
+        self.has_communication = overall_parser.has_communication
         self.has_memcpy_or_memset = overall_parser.has_memcpy_or_memset
         self.steps_costs = overall_parser.steps_costs
         self.steps_names = overall_parser.steps_names
         self.avg_costs = overall_parser.avg_costs
+        self.warmup_steps_names = overall_parser.warmup_steps_names
+        self.tail_steps_names = overall_parser.tail_steps_names
+
+        logger.debug("StepStatsParser")
+        step_stats_parser = StepStatsParser()
+        step_stats_parser.parse(overall_parser.steps_costs, overall_parser.steps_names,
+                                module_parser.op_list_groupby_name_step)
+        self.steps_costs_stats = step_stats_parser.costs_stats
+        self.steps_z_scores = step_stats_parser.z_scores
+        self.outlier_steps = step_stats_parser.outlier_steps
+        self.median_step = step_stats_parser.median_step
+        self.avg_costs_without_outliers = step_stats_parser.avg_costs_without_outliers
+        self.outlier_steps_ops = step_stats_parser.steps_ops
+
+        logger.debug("PhaseParser")
+        phase_parser = PhaseParser()
+        phase_parser.parse(module_parser.tid2tree, module_parser.device_node_list,
+                           overall_parser.host_steps, overall_parser.steps)
+        self.steps_phase_host_costs = phase_parser.steps_host_costs
+        self.steps_phase_device_costs = phase_parser.steps_device_costs
+
+        logger.debug("DataLoaderParser")
+        dataloader_parser = DataLoaderParser()
+        dataloader_parser.parse(module_parser.tid2tree, module_parser.device_node_list,
+                                overall_parser.dataloader_ranges, overall_parser.host_steps, overall_parser.steps)
+        self.dataloader_steps_stats = dataloader_parser.steps_stats
+        self.dataloader_mean_wait = dataloader_parser.mean_wait
+        self.dataloader_median_wait = dataloader_parser.median_wait
+        self.dataloader_std_wait = dataloader_parser.std_wait
+        self.dataloader_idle_correlation = dataloader_parser.idle_correlation
+
+        logger.debug("OptimizerParser")
+        optimizer_parser = OptimizerParser()
+        optimizer_parser.parse(module_parser.tid2tree, overall_parser.host_steps)
+        if len(optimizer_parser.optimizers) > 0:
+            self.optimizers = optimizer_parser.optimizers
+            self.optimizer_steps_stats = optimizer_parser.steps_stats
+
+        if overall_parser.has_sync:
+            logger.debug("SyncParser")
+            sync_parser = SyncParser()
+            sync_parser.parse(module_parser.tid2tree, overall_parser.host_steps)
+            self.has_sync = True
+            self.sync_points = sync_parser.sync_points
+            self.steps_sync_duration = sync_parser.steps_sync_duration
+
+        if self.has_runtime:
+            logger.debug("CriticalPathParser")
+            critical_path_parser = CriticalPathParser()
+            critical_path_parser.parse(module_parser.tid2tree, overall_parser.host_steps)
+            self.critical_paths = critical_path_parser.steps_critical_paths
 
         if self.has_kernel:
             logger.debug("KernelParser")
             kernel_parser = KernelParser()
             kernel_parser.parse_events(self.events)
             self.kernel_stat = kernel_parser.kernel_stat
+            self.kernel_family_stat = kernel_parser.kernel_family_stat
+
+            logger.debug("GPUMetricsParser")
+            gpu_metrics_parser = GPUMetricsParser()
+            gpu_metrics_parser.parse_events(self.events, overall_parser.steps)
+            self.gpu_devices = gpu_metrics_parser.devices
+            self.gpu_device_stats = gpu_metrics_parser.device_stats
+            self.gpu_steps_device_stats = gpu_metrics_parser.steps_device_stats
+
+            logger.debug("TensorCoresParser")
+            tc_parser = TensorCoresParser()
+            tc_parser.parse_kernels(module_parser.kernel_list)
+            self.tc_ratio = tc_parser.tc_ratio
+            self.tc_eligible_ratio = tc_parser.tc_eligible_ratio
+
+            logger.debug("LaunchParser")
+            launch_parser = LaunchParser()
+            launch_parser.parse(module_parser.runtime_node_list, module_parser.device_node_list, overall_parser)
+            self.launch_op_latency_stats = launch_parser.op_latency_stats
+            self.launch_steps_latency_stats = launch_parser.steps_latency_stats
+            self.launch_idle_costs = launch_parser.idle_costs
+            self.launch_steps_idle_costs = launch_parser.steps_idle_costs
 
     def analyze(self):
-        self.recommendations = []
-        dataloader_ratio = self.avg_costs.dataloader_cost / self.avg_costs.step_total_cost
-        if dataloader_ratio > 0.05:
-            text = "This run has high time cost on input data loading. " \
-                   "{}% of the step time is in DataLoader. You could " \
-                   "try to set num_workers on DataLoader's construction " \
-                   "and enable multi-processes on data loading. " \
-                   "Reference: <a href =\"{}\" target=\"_blank\">Single- and Multi-process Data Loading</a>".format(
-                       round(dataloader_ratio * 100, 1),
-                       "https://pytorch.org/docs/stable/data.html#single-and-multi-process-data-loading"
-                   )
-            self.recommendations.append(text)
+        rule_engine = RuleEngine()
+        rule_engine.run(self)
+        self.findings = rule_engine.findings
+        self.rule_durations = rule_engine.rule_durations
+        self.recommendations = [finding.message for finding in self.findings]
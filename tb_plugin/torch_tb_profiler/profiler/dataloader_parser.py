@@ -0,0 +1,105 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import bisect
+
+from .gpu_metrics_parser import get_idle_gaps
+from .overall_parser import is_sync_runtime, merge_ranges, intersection_ranges_lists, get_ranges_sum
+from .trace import EventTypes
+from .. import utils
+
+logger = utils.get_logger()
+
+# Name of the device side memcpy is like "Memcpy HtoD (Pageable -> Device)" or "Memcpy HtoD (Pinned -> Device)".
+H2D_MEMCPY_KEYWORD = "HtoD"
+PAGEABLE_MEMCPY_KEYWORD = "Pageable"
+
+
+class DataLoaderStepStats:
+    def __init__(self):
+        self.wait_duration = 0  # Host time in DataLoader's __next__.
+        self.exposed_wait_duration = 0  # Part of wait_duration while the GPU is idle.
+        self.gpu_idle_duration = 0
+        self.h2d_copies = 0  # Host to device memcpy.
+        self.pageable_copies = 0  # Host to device memcpy from pageable memory, which is not pinned.
+        self.blocking_copies = 0  # Host to device memcpy blocking the host, pageable or not non_blocking.
+        self.h2d_duration = 0  # Device time of host to device memcpy.
+        self.blocking_duration = 0  # Host time blocked in the memcpy runtime and its following synchronization.
+
+
+class DataLoaderParser:
+    """Analyze the time waiting for input data in each step, how it correlates with the GPU idle time,
+    and the host to device copies of the batches.
+    """
+
+    def __init__(self):
+        self.steps_stats = []  # List of DataLoaderStepStats, one for each step.
+        self.mean_wait = 0
+        self.median_wait = 0
+        self.std_wait = 0
+        self.idle_correlation = None  # Pearson correlation of steps' wait time and GPU idle time.
+
+    def parse(self, tid2tree, device_node_list, dataloader_ranges, host_steps, steps):
+        """dataloader_ranges: merged ranges of DataLoader's __next__. host_steps: host side spans of the steps.
+        steps: the steps considering device side."""
+        self.steps_stats = [DataLoaderStepStats() for _ in host_steps]
+        busy_ranges = merge_ranges([(n.start_time, n.end_time) for n in device_node_list])
+        for host_step, step, stats in zip(host_steps, steps, self.steps_stats):
+            stats.wait_duration = get_ranges_sum(intersection_ranges_lists([host_step], dataloader_ranges))
+            if len(busy_ranges) > 0:
+                idle_gaps = get_idle_gaps(busy_ranges, step)
+                stats.gpu_idle_duration = get_ranges_sum(idle_gaps)
+                exposed_ranges = intersection_ranges_lists(idle_gaps, dataloader_ranges)
+                stats.exposed_wait_duration = get_ranges_sum(exposed_ranges)
+        self._parse_h2d_copies(tid2tree, host_steps)
+
+        waits = sorted(stats.wait_duration for stats in self.steps_stats)
+        if len(waits) > 0:
+            self.mean_wait = sum(waits) / len(waits)
+            self.median_wait = utils.percentile(waits, 50)
+            self.std_wait = (sum((w - self.mean_wait) ** 2 for w in waits) / len(waits)) ** 0.5
+        if len(busy_ranges) > 0:
+            self.idle_correlation = utils.pearson_correlation(
+                [stats.wait_duration for stats in self.steps_stats],
+                [stats.gpu_idle_duration for stats in self.steps_stats])
+
+    def _parse_h2d_copies(self, tid2tree, steps):
+        steps_start_time = [step[0] for step in steps]
+        for root in tid2tree.values():
+            node_stack = [root]
+            while len(node_stack) > 0:
+                node = node_stack.pop()
+                node_stack.extend(node.children)
+                runtimes = sorted(node.runtimes, key=lambda x: x.start_time)
+                for i, rt in enumerate(runtimes):
+                    copies = [n for n in rt.device_nodes or [] if n.type == EventTypes.MEMCPY
+                              and H2D_MEMCPY_KEYWORD in n.name]
+                    if len(copies) == 0:
+                        continue
+                    i_step = bisect.bisect_right(steps_start_time, rt.start_time) - 1
+                    if i_step < 0 or rt.start_time >= steps[i_step][1]:
+                        continue
+                    stats = self.steps_stats[i_step]
+                    # A blocking copy is either a synchronous memcpy,
+                    # or an asynchronous one followed by a synchronization in the same operator.
+                    blocking_duration = None
+                    if is_sync_runtime(rt.name):
+                        blocking_duration = rt.end_time - rt.start_time
+                    else:
+                        for next_rt in runtimes[i + 1:]:
+                            if is_sync_runtime(next_rt.name):
+                                blocking_duration = next_rt.end_time - rt.start_time
+                                break
+                    # The copy from pageable memory is staged by the host, so it blocks the runtime call.
+                    if blocking_duration is None and any(PAGEABLE_MEMCPY_KEYWORD in n.name for n in copies):
+                        blocking_duration = rt.end_time - rt.start_time
+                    for copy in copies:
+                        stats.h2d_copies += 1
+                        stats.h2d_duration += copy.end_time - copy.start_time
+                        if PAGEABLE_MEMCPY_KEYWORD in copy.name:
+                            stats.pageable_copies += 1
+                        if blocking_duration is not None:
+                            stats.blocking_copies += 1
+                    if blocking_duration is not None:
+                        stats.blocking_duration += blocking_duration
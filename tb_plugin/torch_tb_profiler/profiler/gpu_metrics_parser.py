@@ -0,0 +1,111 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+from .overall_parser import merge_ranges, intersection_ranges_lists, get_ranges_sum
+from .trace import EventTypes
+from .. import utils
+
+logger = utils.get_logger()
+
+# Upper bounds (us) of the idle gap histogram bins. The last bin has no upper bound.
+IDLE_GAP_BINS = [10, 100, 1000, 10000]
+IDLE_GAP_BIN_NAMES = ["<10us", "10us-100us", "100us-1ms", "1ms-10ms", ">=10ms"]
+
+
+def get_idle_gaps(busy_ranges, span):
+    """Return the ranges inside span which are not covered by busy_ranges. busy_ranges must be merged."""
+    gaps = []
+    prev_end = span[0]
+    for busy_range in intersection_ranges_lists([span], busy_ranges):
+        if busy_range[0] > prev_end:
+            gaps.append((prev_end, busy_range[0]))
+        prev_end = busy_range[1]
+    if span[1] > prev_end:
+        gaps.append((prev_end, span[1]))
+    return gaps
+
+
+class DeviceStats:
+    def __init__(self):
+        self.total_time = 0  # Time span considered, sum of steps.
+        self.busy_time = 0  # Time when at least one kernel is running on this device.
+        self.streams_busy_time = {}  # stream -> time when at least one kernel is running on this stream.
+        self.idle_gaps_histogram = [0] * len(IDLE_GAP_BIN_NAMES)  # Count of idle gaps in each bin.
+        self.idle_gaps_time = [0] * len(IDLE_GAP_BIN_NAMES)  # Total time of idle gaps in each bin.
+
+    @property
+    def utilization(self):
+        return self.busy_time / self.total_time if self.total_time > 0 else 0
+
+    @property
+    def concurrency(self):
+        """Average number of streams running kernels when the device is busy."""
+        return sum(self.streams_busy_time.values()) / self.busy_time if self.busy_time > 0 else 0
+
+    def add(self, other):
+        self.total_time += other.total_time
+        self.busy_time += other.busy_time
+        for stream, busy_time in other.streams_busy_time.items():
+            self.streams_busy_time[stream] = self.streams_busy_time.get(stream, 0) + busy_time
+        for i in range(len(IDLE_GAP_BIN_NAMES)):
+            self.idle_gaps_histogram[i] += other.idle_gaps_histogram[i]
+            self.idle_gaps_time[i] += other.idle_gaps_time[i]
+
+    def add_idle_gaps(self, gaps):
+        for gap in gaps:
+            dur = gap[1] - gap[0]
+            i_bin = 0
+            while i_bin < len(IDLE_GAP_BINS) and dur >= IDLE_GAP_BINS[i_bin]:
+                i_bin += 1
+            self.idle_gaps_histogram[i_bin] += 1
+            self.idle_gaps_time[i_bin] += dur
+
+
+class GPUMetricsParser:
+    """Build busy timelines of each GPU device and stream from kernel events,
+    and calculate utilization, concurrency and idle gaps of each step.
+    """
+
+    def __init__(self):
+        self.devices = []  # Sorted device ids.
+        self.device_busy_ranges = {}  # device -> merged kernel ranges.
+        self.stream_busy_ranges = {}  # (device, stream) -> merged kernel ranges.
+        self.steps_device_stats = []  # List of dict: device -> DeviceStats, one for each step.
+        self.device_stats = {}  # device -> DeviceStats over all steps.
+
+    def parse_events(self, events, steps):
+        """steps: list of (start_time, end_time) calculated by OverallParser."""
+        device_ranges = {}
+        stream_ranges = {}
+        for event in events:
+            if event.type != EventTypes.KERNEL:
+                continue
+            device = event.args.get("device", event.pid)
+            stream = event.args.get("stream", event.tid)
+            kernel_range = (event.ts, event.ts + event.duration)
+            device_ranges.setdefault(device, []).append(kernel_range)
+            stream_ranges.setdefault((device, stream), []).append(kernel_range)
+
+        self.devices = sorted(device_ranges.keys(), key=str)
+        for device, ranges in device_ranges.items():
+            self.device_busy_ranges[device] = merge_ranges(ranges)
+        for key, ranges in stream_ranges.items():
+            self.stream_busy_ranges[key] = merge_ranges(ranges)
+
+        self.steps_device_stats = []
+        self.device_stats = {device: DeviceStats() for device in self.devices}
+        for step in steps:
+            step_device_stats = {}
+            for device in self.devices:
+                stats = DeviceStats()
+                stats.total_time = step[1] - step[0]
+                busy_ranges = self.device_busy_ranges[device]
+                stats.busy_time = get_ranges_sum(intersection_ranges_lists([step], busy_ranges))
+                for (stream_device, stream), ranges in self.stream_busy_ranges.items():
+                    if stream_device == device:
+                        stats.streams_busy_time[stream] = get_ranges_sum(intersection_ranges_lists([step], ranges))
+                stats.add_idle_gaps(get_idle_gaps(busy_ranges, step))
+                step_device_stats[device] = stats
+                self.device_stats[device].add(stats)
+            self.steps_device_stats.append(step_device_stats)
@@ -0,0 +1,95 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import re
+import sys
+
+# Rules applied to the kernel names after collapsing the template arguments: list of (pattern, replacement).
+# The default one collapses the tile shapes of cutlass and cuBLAS kernels, such as "128x128_32x3" or
+# "tilesize96x128x32", which are encoded in the name instead of the template arguments.
+DEFAULT_FAMILY_RULES = [(r"\d+(?:x\d+)+", "*")]
+
+
+class KernelNameNormalizer:
+    """Map the kernel names to family keys, so that the variants of a templated kernel are grouped together.
+    The template arguments nested deeper than template_depth are collapsed to "<...>", the trailing parameter list
+    is dropped, then the rules are applied. Each distinct name is normalized only once, and the family keys are
+    interned so that the kernels of the same family share one string.
+    """
+
+    def __init__(self, template_depth=0, rules=None):
+        self.template_depth = template_depth
+        self.rules = [(re.compile(pattern), replacement)
+                      for pattern, replacement in (rules if rules is not None else DEFAULT_FAMILY_RULES)]
+        self._families = {}  # Kernel name -> family key.
+
+    def get_family(self, name):
+        family = self._families.get(name)
+        if family is None:
+            family = sys.intern(self._normalize(name))
+            self._families[sys.intern(name)] = family
+        return family
+
+    def _normalize(self, name):
+        name = self._strip_parameters(name)
+        result = []
+        depth = 0
+        for c in name:
+            if c == "<":
+                depth += 1
+                if depth == self.template_depth + 1:
+                    result.append("<...>")
+                    continue
+            elif c == ">" and depth > 0:
+                depth -= 1
+                if depth == self.template_depth:
+                    continue
+            if depth <= self.template_depth:
+                result.append(c)
+        if depth != 0:
+            # The brackets are not balanced, such as an "operator<" in the name. Keep the name as is.
+            result = [name]
+        family = "".join(result)
+        for pattern, replacement in self.rules:
+            family = pattern.sub(replacement, family)
+        return family
+
+    @staticmethod
+    def _strip_parameters(name):
+        """Drop the trailing parameter list such as "(float*, int)", but keep "(anonymous namespace)"."""
+        if not name.endswith(")"):
+            return name
+        depth = 0
+        angle_depth = 0
+        for i in range(len(name) - 1, -1, -1):
+            c = name[i]
+            if c == ">":
+                angle_depth += 1
+            elif c == "<":
+                angle_depth -= 1
+            elif c == ")" and angle_depth == 0:
+                depth += 1
+            elif c == "(" and angle_depth == 0:
+                depth -= 1
+                if depth == 0:
+                    return name[:i].rstrip()
+        return name
+
+
+_default_normalizer = KernelNameNormalizer()
+
+
+def get_default_normalizer():
+    return _default_normalizer
+
+
+def set_default_normalizer(normalizer):
+    """Replace the normalizer used by the parsers, such as to keep the first level of the template arguments:
+    set_default_normalizer(KernelNameNormalizer(template_depth=1))."""
+    global _default_normalizer
+    _default_normalizer = normalizer
+
+
+def get_kernel_family(name):
+    return _default_normalizer.get_family(name)
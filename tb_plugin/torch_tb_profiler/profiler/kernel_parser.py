@@ -4,10 +4,32 @@
 
 import pandas as pd
 
+from .kernel_name import get_kernel_family
+
+# Numeric launch configuration reported in kernel event's args, and the column name in kernel_stat.
+# They are averaged weighted by kernel duration.
+KERNEL_LAUNCH_ARGS = [
+    ("registers per thread", "registers_per_thread"),
+    ("shared memory", "shared_memory"),
+    ("blocks per SM", "blocks_per_sm"),
+    ("warps per SM", "warps_per_sm"),
+    ("est. achieved occupancy %", "occupancy")
+]
+# Columns whose distribution over the launches is also kept in kernel_stat, as "<column>_p<percentile>".
+KERNEL_LAUNCH_DISTRIBUTION_COLUMNS = ["blocks_per_sm", "occupancy"]
+KERNEL_LAUNCH_PERCENTILES = [50, 90]
+# Launch dims reported in kernel event's args, the most common one is kept in kernel_stat.
+KERNEL_LAUNCH_DIMS = [
+    ("grid", "grid"),
+    ("block", "block")
+]
+
 
 class KernelParser:
     def __init__(self):
         self.kernel_stat = None
+        self.kernel_family_stat = None  # Kernels grouped by family, with the count of distinct names as variants.
+        self.launch_columns = []  # Columns of launch configuration which are available in kernel_stat.
 
     def parse_events(self, events):
         events_dict = []
@@ -19,3 +41,53 @@ class KernelParser:
         kernels = events[events["category"] == "Kernel"]
         self.kernel_stat = kernels.groupby("name")["duration"].agg(["count", "sum", "mean", "max", "min"]) \
             .sort_values("sum", ascending=False)
+        self._parse_families(kernels)
+        self._parse_launch_config(kernels)
+
+    def _parse_families(self, kernels):
+        # Normalize each distinct name only once.
+        names = kernels["name"].astype(object)
+        families = names.map({name: get_kernel_family(name) for name in names.unique()})
+        groups = pd.DataFrame({"family": families, "name": names, "duration": kernels["duration"]}).groupby("family")
+        self.kernel_family_stat = groups["duration"].agg(["count", "sum", "mean", "max", "min"])
+        self.kernel_family_stat["variants"] = groups["name"].nunique()
+        self.kernel_family_stat = self.kernel_family_stat.sort_values("sum", ascending=False)
+
+    def _parse_launch_config(self, kernels):
+        self.launch_columns = []
+        args = kernels["args"].map(lambda x: x if isinstance(x, dict) else {})
+        launch = pd.DataFrame({"name": kernels["name"], "duration": kernels["duration"]})
+        for arg_name, column in KERNEL_LAUNCH_ARGS:
+            values = pd.to_numeric(args.map(lambda x: x.get(arg_name)), errors="coerce")
+            if values.notna().any():
+                # Weighted mean = sum(value * duration) / sum(duration of kernels having this value).
+                launch[column + "_weighted"] = values * launch["duration"]
+                launch[column + "_duration"] = launch["duration"].where(values.notna())
+                launch[column] = values
+                self.launch_columns.append(column)
+        for arg_name, column in KERNEL_LAUNCH_DIMS:
+            values = args.map(lambda x: str(x[arg_name]) if arg_name in x else None)
+            if values.notna().any():
+                launch[column] = values
+                self.launch_columns.append(column)
+        if len(self.launch_columns) == 0:
+            return
+
+        groups = launch.groupby("name")
+        for arg_name, column in KERNEL_LAUNCH_ARGS:
+            if column not in self.launch_columns:
+                continue
+            weighted_sum = groups[column + "_weighted"].sum()
+            duration_sum = groups[column + "_duration"].sum()
+            self.kernel_stat[column] = (weighted_sum / duration_sum.where(duration_sum > 0))
+            if column == "occupancy":
+                self.kernel_stat["min_occupancy"] = groups[column].min()
+            if column in KERNEL_LAUNCH_DISTRIBUTION_COLUMNS:
+                for p in KERNEL_LAUNCH_PERCENTILES:
+                    self.kernel_stat["{}_p{}".format(column, p)] = groups[column].quantile(p / 100)
+        for arg_name, column in KERNEL_LAUNCH_DIMS:
+            if column not in self.launch_columns:
+                continue
+            self.kernel_stat[column] = groups[column].agg(
+                lambda x: x.mode().iloc[0] if x.notna().any() else None)
+            self.kernel_stat[column + "_count"] = groups[column].nunique()
@@ -0,0 +1,94 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import bisect
+
+from .gpu_metrics_parser import get_idle_gaps
+from .overall_parser import merge_ranges, subtract_ranges_lists, intersection_ranges_lists, get_ranges_sum
+from .. import utils
+
+logger = utils.get_logger()
+
+# Causes of GPU idle gaps, in the priority order of attribution.
+IDLE_CAUSE_SYNC = "Synchronization"
+IDLE_CAUSE_MEMCPY = "Memcpy"
+IDLE_CAUSE_DATALOADER = "DataLoader"
+IDLE_CAUSE_CPU_BOUND = "CPU-bound Launch"
+IDLE_CAUSE_OTHER = "Other"
+IDLE_CAUSES = [IDLE_CAUSE_SYNC, IDLE_CAUSE_MEMCPY, IDLE_CAUSE_DATALOADER, IDLE_CAUSE_CPU_BOUND, IDLE_CAUSE_OTHER]
+
+
+class LatencyStats:
+    def __init__(self, name, latencies):
+        latencies = sorted(latencies)
+        self.name = name
+        self.count = len(latencies)
+        self.total = sum(latencies)
+        self.mean = self.total / self.count if self.count > 0 else 0
+        self.p50 = utils.percentile(latencies, 50)
+        self.p90 = utils.percentile(latencies, 90)
+        self.max = latencies[-1] if self.count > 0 else 0
+
+
+class LaunchParser:
+    """Analyze the launch latency from runtime to device activity,
+    and attribute the GPU idle time of each step to its cause.
+    """
+
+    def __init__(self):
+        self.op_latency_stats = []  # List of LatencyStats grouped by operator name, sorted by total latency.
+        self.steps_latency_stats = []  # List of LatencyStats, one for each step.
+        self.steps_idle_costs = []  # List of dict: cause -> idle time, one for each step.
+        self.idle_costs = {cause: 0 for cause in IDLE_CAUSES}  # Summed over all steps.
+
+    def parse(self, runtime_node_list, device_node_list, overall_parser):
+        """overall_parser: OverallParser after parse_events, its steps and merged host side ranges are used.
+        Launches are grouped by the host side spans of steps, while idle gaps are found in the steps."""
+        self._parse_latency(runtime_node_list, overall_parser.host_steps)
+        self._parse_idle_gaps(runtime_node_list, device_node_list, overall_parser.steps, overall_parser)
+
+    def _parse_latency(self, runtime_node_list, steps):
+        steps_start_time = [step[0] for step in steps]
+        op_to_latencies = {}
+        steps_latencies = [[] for _ in steps]
+        for rt in runtime_node_list:
+            if rt.device_nodes is None:
+                continue
+            i_step = bisect.bisect_right(steps_start_time, rt.start_time) - 1
+            if i_step >= 0 and rt.start_time >= steps[i_step][1]:
+                i_step = -1
+            for device_node in rt.device_nodes:
+                latency = device_node.start_time - rt.start_time
+                op_name = "N/A" if device_node.op_node is None else device_node.op_node.name
+                op_to_latencies.setdefault(op_name, []).append(latency)
+                if i_step >= 0:
+                    steps_latencies[i_step].append(latency)
+
+        self.op_latency_stats = [LatencyStats(name, latencies) for name, latencies in op_to_latencies.items()]
+        self.op_latency_stats.sort(key=lambda x: x.total, reverse=True)
+        self.steps_latency_stats = [LatencyStats(None, latencies) for latencies in steps_latencies]
+
+    def _parse_idle_gaps(self, runtime_node_list, device_node_list, steps, overall_parser):
+        busy_ranges = merge_ranges([(n.start_time, n.end_time) for n in device_node_list])
+        memcpy_ranges = merge_ranges([(rt.start_time, rt.end_time) for rt in runtime_node_list
+                                      if rt.name.startswith("cudaMemcpy")])
+        host_busy_ranges = merge_ranges(list(overall_parser.cpuop_ranges) + list(overall_parser.runtime_ranges))
+        cause_ranges = [(IDLE_CAUSE_SYNC, overall_parser.sync_ranges),
+                        (IDLE_CAUSE_MEMCPY, memcpy_ranges),
+                        (IDLE_CAUSE_DATALOADER, overall_parser.dataloader_ranges),
+                        (IDLE_CAUSE_CPU_BOUND, host_busy_ranges)]
+
+        self.steps_idle_costs = []
+        self.idle_costs = {cause: 0 for cause in IDLE_CAUSES}
+        for step in steps:
+            idle_costs = {}
+            slots = get_idle_gaps(busy_ranges, step)
+            for cause, ranges in cause_ranges:
+                cause_slots = intersection_ranges_lists(slots, ranges)
+                idle_costs[cause] = get_ranges_sum(cause_slots)
+                slots = subtract_ranges_lists(slots, cause_slots)
+            idle_costs[IDLE_CAUSE_OTHER] = get_ranges_sum(slots)
+            for cause in IDLE_CAUSES:
+                self.idle_costs[cause] += idle_costs[cause]
+            self.steps_idle_costs.append(idle_costs)
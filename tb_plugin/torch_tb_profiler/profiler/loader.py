@@ -9,16 +9,35 @@ from __future__ import print_function
 import os
 
 from .data import RunData, RunProfileData
-from .run_generator import RunGenerator
+from .run_generator import RunGenerator, generate_step_skew_table
+from .steady_state import StepsConfig
+from .step_skew_parser import StepSkewParser
+from .trend import RunSummary
 from .. import consts, utils
 from ..run import Run
 
 logger = utils.get_logger()
 
 
+def get_workers(run_dir):
+    """Return the sorted names of the workers which have trace files under run_dir."""
+    workers = []
+    for path in os.listdir(run_dir):
+        if os.path.isdir(path):
+            continue
+        for pattern in [consts.TRACE_GZIP_FILE_SUFFIX, consts.TRACE_FILE_SUFFIX]:
+            if path.endswith(pattern):
+                worker = path[:-len(pattern)]
+                workers.append(worker)
+                break
+    return sorted(workers)
+
+
 class RunLoader(object):
-    def __init__(self, name, run_dir):
+    def __init__(self, name, run_dir, steps_config=None):
         self.run = RunData(name, run_dir)
+        # The sidecar config of the run is used if not given.
+        self.steps_config = steps_config if steps_config is not None else StepsConfig.load(run_dir)
 
     def load(self):
         self._parse()
@@ -34,17 +53,7 @@ class RunLoader(object):
         return run
 
     def _parse(self):
-        workers = []
-        for path in os.listdir(self.run.run_dir):
-            if os.path.isdir(path):
-                continue
-            for pattern in [consts.TRACE_GZIP_FILE_SUFFIX, consts.TRACE_FILE_SUFFIX]:
-                if path.endswith(pattern):
-                    worker = path[:-len(pattern)]
-                    workers.append(worker)
-                    break
-
-        for worker in sorted(workers):
+        for worker in get_workers(self.run.run_dir):
             try:
                 data = RunProfileData.parse(self.run.run_dir, worker)
                 self.run.profiles[worker] = data
@@ -55,11 +64,17 @@ class RunLoader(object):
     def _process(self):
         for data in self.run.profiles.values():
             logger.debug("Processing profile data")
-            data.process()
+            data.process(self.steps_config)
             logger.debug("Processing profile data finish")
 
     def _analyze(self):
+        logger.debug("Analyzing step skew across workers")
+        step_skew_parser = StepSkewParser()
+        step_skew_parser.parse_profiles(self.run.profiles)
+        self.run.step_skews = step_skew_parser.step_skews
+
         for data in self.run.profiles.values():
+            data.step_skews = self.run.step_skews
             logger.debug("Analyzing profile data")
             data.analyze()
             logger.debug("Analyzing profile data finish")
@@ -70,4 +85,8 @@ class RunLoader(object):
             generator = RunGenerator(worker, data)
             profile = generator.generate_run_profile()
             run.add_profile(profile)
+        if len(self.run.step_skews) > 0:
+            run.step_skew = generate_step_skew_table(self.run.step_skews)
+        run.summary = RunSummary(self.run.name, self.run.run_dir)
+        run.summary.summarize(self.run.profiles)
         return run
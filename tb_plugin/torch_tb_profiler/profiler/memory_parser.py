@@ -0,0 +1,90 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+from .module_parser import find_innermost_op
+from .trace import EventTypes
+from .. import utils
+
+logger = utils.get_logger()
+
+
+class MemoryOpStats:
+    def __init__(self, name):
+        self.name = name
+        self.allocation_count = 0
+        self.free_count = 0
+        self.allocated_bytes = 0
+        self.freed_bytes = 0
+        self.peak_bytes = 0  # Bytes allocated by this operator and still alive at the peak of device memory.
+
+    @property
+    def increase_bytes(self):
+        return self.allocated_bytes - self.freed_bytes
+
+
+class MemoryParser:
+    """Build allocated memory timeline of each device from memory events,
+    and attribute allocations to the operator running on the same thread.
+    """
+
+    def __init__(self):
+        self.devices = []  # Device names, such as "CPU" and "GPU0".
+        self.device_curves = {}  # device -> list of (ts, allocated_bytes).
+        self.device_peaks = {}  # device -> (ts, allocated_bytes) of the peak.
+        self.device_op_stats = {}  # device -> list of MemoryOpStats.
+        self._children_start_times = {}  # id(node) -> start times of its children, for binary search.
+
+    def parse_events(self, events, tid2tree):
+        device_to_events = {}
+        for event in events:
+            if event.type != EventTypes.MEMORY:
+                continue
+            root = tid2tree.get(event.tid, tid2tree.get(str(event.tid), None))
+            op_node = find_innermost_op(root, event.ts, self._children_start_times) if root is not None else None
+            op_name = op_node.name if op_node is not None else "N/A"
+            device_to_events.setdefault(event.device_name, []).append((event, op_name))
+
+        self.devices = sorted(device_to_events.keys())
+        for device in self.devices:
+            memory_events = device_to_events[device]
+            memory_events.sort(key=lambda x: x[0].ts)
+            self._parse_device(device, memory_events)
+
+    def _parse_device(self, device, memory_events):
+        curve = []
+        allocated = 0
+        peak_index = 0
+        op_stats = {}
+        for i, (event, op_name) in enumerate(memory_events):
+            if event.total_allocated is not None:
+                allocated = event.total_allocated
+            else:
+                allocated += event.bytes
+            curve.append((event.ts, allocated))
+            if allocated > curve[peak_index][1]:
+                peak_index = i
+
+            if op_name not in op_stats:
+                op_stats[op_name] = MemoryOpStats(op_name)
+            stats = op_stats[op_name]
+            if event.bytes > 0:
+                stats.allocation_count += 1
+                stats.allocated_bytes += event.bytes
+            elif event.bytes < 0:
+                stats.free_count += 1
+                stats.freed_bytes -= event.bytes
+
+        # Replay the events until the peak, the allocations still alive contribute to the peak.
+        live = {}  # addr -> (bytes, op_name)
+        for event, op_name in memory_events[:peak_index + 1]:
+            if event.bytes > 0:
+                live[event.addr] = (event.bytes, op_name)
+            elif event.bytes < 0:
+                live.pop(event.addr, None)
+        for alloc_bytes, op_name in live.values():
+            op_stats[op_name].peak_bytes += alloc_bytes
+
+        self.device_curves[device] = curve
+        self.device_peaks[device] = curve[peak_index]
+        self.device_op_stats[device] = sorted(op_stats.values(), key=lambda x: x.peak_bytes, reverse=True)
@@ -2,13 +2,42 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # --------------------------------------------------------------------------
 
+import bisect
+import re
 import sys
 
+from .kernel_name import get_kernel_family
+from .tensor_cores_parser import is_tc_eligible_op, is_tc_kernel
 from .trace import EventTypes
 from .. import utils
 
 logger = utils.get_logger()
 
+MODULE_NAME_PREFIX = "nn.Module: "
+
+PHASE_FORWARD = "Forward"
+PHASE_BACKWARD = "Backward"
+PHASE_OPTIMIZER = "Optimizer"
+PHASES = [PHASE_FORWARD, PHASE_BACKWARD, PHASE_OPTIMIZER]
+# Nodes run by the autograd engine, such as "autograd::engine::evaluate_function: AddmmBackward0",
+# "AddmmBackward" and "torch::autograd::AccumulateGrad".
+BACKWARD_NODE_PATTERN = re.compile(r"^autograd::engine::|Backward\d*$|AccumulateGrad$")
+
+
+def is_dataloader_node(name):
+    return name.startswith("enumerate(DataLoader)#") and name.endswith(".__next__")
+
+
+def get_phase(name, parent_phase):
+    """Return the phase of a node from its name, or inherit its parent's phase."""
+    if name.startswith("Optimizer."):
+        return PHASE_OPTIMIZER
+    if is_dataloader_node(name):
+        return None
+    if parent_phase != PHASE_OPTIMIZER and BACKWARD_NODE_PATTERN.search(name) is not None:
+        return PHASE_BACKWARD
+    return parent_phase
+
 
 class BaseNode:
     def __init__(self):
@@ -33,6 +62,13 @@ class OperatorNode(HostNode):
         self.input_shape = None
         self.self_host_duration = 0
         self.self_device_duration = 0
+        self.tc_eligible = False  # Whether this operator could run on Tensor Cores.
+        self.tc_self_device_duration = 0  # Part of self_device_duration using Tensor Cores.
+        # Path of the enclosing nn.Module frames such as "ResNet_0.Sequential_1.Conv2d_0",
+        # or the innermost enclosing Python function if not inside any nn.Module.
+        self.module = None
+        self.phase = None  # One of PHASES, None if not in any phase such as in DataLoader.
+        self.step = None  # Name of the step it runs in, such as "5". None if not in any step.
 
     def fill_stats(self):
         self.self_host_duration = self.end_time - self.start_time
@@ -45,6 +81,7 @@ class OperatorNode(HostNode):
             self.self_host_duration -= (rt.end_time - rt.start_time)
             self.device_duration += rt.device_duration
             self.self_device_duration += rt.device_duration
+            self.tc_self_device_duration += rt.tc_duration
 
 
 class ProfilerStepNode(OperatorNode):
@@ -57,42 +94,78 @@ class RuntimeNode(HostNode):
         super(RuntimeNode, self).__init__()
         # One runtime could trigger more than one kernel, such as cudaLaunchCooperativeKernelMultiDevice.
         self.device_nodes = None
+        self.tc_duration = 0  # Time of the launched kernels using Tensor Cores.
 
     def fill_stats(self):
         if self.device_nodes is None:
             return
         for device_node in self.device_nodes:
-            self.device_duration += device_node.end_time - device_node.start_time
+            dur = device_node.end_time - device_node.start_time
+            self.device_duration += dur
+            if device_node.tc_used:
+                self.tc_duration += dur
 
 
 class DeviceNode(BaseNode):
     def __init__(self):
         super(DeviceNode, self).__init__()
         self.op_node = None  # The cpu operator that launched it.
+        self.device_id = None
+        self.stream_id = None
+        self.tc_used = False  # Whether this kernel uses Tensor Cores.
+
+
+def find_innermost_op(root, ts, children_start_times):
+    """Find the innermost operator running at ts in the call tree, ProfilerStepNode is skipped.
+    children_start_times: dict of id(node) -> start times of its children, cached for binary search.
+    """
+    op_node = None
+    node = root
+    while True:
+        key = id(node)
+        if key not in children_start_times:
+            children_start_times[key] = [child.start_time for child in node.children]
+        i = bisect.bisect_right(children_start_times[key], ts) - 1
+        if i < 0 or node.children[i].end_time < ts:
+            return op_node
+        node = node.children[i]
+        if type(node) is not ProfilerStepNode:
+            op_node = node
 
 
 class OperatorAgg:
     def __init__(self):
         self.name = None
         self.input_shape = None  # Optional
+        self.module = None  # Optional
+        self.phase = None  # Optional
+        self.step = None  # Optional
         self.calls = 0
         self.host_duration = 0
         self.device_duration = 0
         self.self_host_duration = 0
         self.self_device_duration = 0
+        self.tc_eligible = False
+        self.tc_self_device_duration = 0
         # TODO: Think about adding these avgs to UI.
         self.avg_host_duration = 0
         self.avg_device_duration = 0
+        self.tc_self_ratio = 0  # Ratio of self device duration using Tensor Cores.
 
     def average(self):
         self.avg_host_duration = self.host_duration / self.calls
         self.avg_device_duration = self.device_duration / self.calls
+        if self.self_device_duration > 0:
+            self.tc_self_ratio = self.tc_self_device_duration / self.self_device_duration
 
 
 class KernelAggByNameOp:
     def __init__(self):
         self.name = None
         self.op_name = None
+        self.module = None
+        self.phase = None
+        self.step = None
         self.calls = 0
         self.total_duration = 0
         self.avg_duration = 0
@@ -110,7 +183,16 @@ class ModuleParser:
         self.kernel_list = []  # For Kernel-view.
         self.op_list_groupby_name = []  # For Operator-view.
         self.op_list_groupby_name_input = []  # For Operator-view.
+        self.op_list_groupby_name_module = []  # For Operator-view.
+        self.op_list_groupby_name_phase = []  # For Operator-view.
+        self.op_list_groupby_name_step = []  # For Operator-view of a single step.
         self.kernel_list_groupby_name_op = {}  # For Kernel-view.
+        self.kernel_list_groupby_name_module = []  # For Kernel-view.
+        self.kernel_list_groupby_name_phase = []  # For Kernel-view.
+        self.kernel_list_groupby_name_op_step = []  # For Kernel-view of a single step.
+        self.kernel_list_groupby_family_op = []  # For Kernel-view, name of the aggregates is the kernel family.
+        # Spans of the ProfilerSteps of all threads: sorted list of (start_time, end_time, step).
+        self.steps_spans = []
         self.runtime_node_list = []  # For Overall-view.
         self.device_node_list = []  # For Overall-view.
 
@@ -161,11 +243,36 @@ class ModuleParser:
             for child in node.children:
                 remove_dup_nodes(child)
 
+        def find_step(ts):
+            """Find the step whose span contains ts, for the threads without ProfilerStep such as autograd."""
+            i = bisect.bisect_right(steps_start_time, ts) - 1
+            if i >= 0 and ts < self.steps_spans[i][1]:
+                return self.steps_spans[i][2]
+            return None
+
         # TODO: Replace recursive by using a stack, in case of too deep callstack.
-        def fill_stats(node):
+        def fill_stats(node, module_path=None, python_func=None, phase=None, step=None):
             if node.type != EventTypes.RUNTIME:
+                node.module = module_path if module_path is not None else python_func
+                if node.type == EventTypes.PYTHON and node.name != "CallTreeRoot":
+                    if node.name.startswith(MODULE_NAME_PREFIX):
+                        module_name = node.name[len(MODULE_NAME_PREFIX):]
+                        module_path = module_name if module_path is None else module_path + "." + module_name
+                    else:
+                        python_func = node.name
+                # Root and ProfilerStep don't belong to any phase, but pass the thread's default phase down.
+                if node.name != "CallTreeRoot" and type(node) is not ProfilerStepNode:
+                    phase = get_phase(node.name, phase)
+                    node.phase = phase
+                # Each operator belongs to the step of its ProfilerStep ancestor.
+                if type(node) is ProfilerStepNode:
+                    step = node.step
+                elif node.name != "CallTreeRoot":
+                    if step is None and node.start_time is not None:
+                        step = find_step(node.start_time)
+                    node.step = step
                 for child in node.children:
-                    fill_stats(child)
+                    fill_stats(child, module_path, python_func, phase, step)
                 for rt in node.runtimes:
                     fill_stats(rt)
                     if rt.device_nodes is not None:
@@ -185,15 +292,19 @@ class ModuleParser:
 
             node.fill_stats()
             if type(node) is OperatorNode and node.type == EventTypes.OPERATOR \
-                    and not (node.name.startswith("enumerate(DataLoader)#") and node.name.endswith(".__next__")) \
+                    and not is_dataloader_node(node.name) \
                     and not node.name.startswith("Optimizer."):
                 self.cpp_op_list.append(node)
             if node.type == EventTypes.RUNTIME and node.device_nodes is not None:
                 self.kernel_list.extend([n for n in node.device_nodes if n.type == EventTypes.KERNEL])
 
+        steps_start_time = [span[0] for span in self.steps_spans]
         root_node = build_tree_relationship(host_node_list, zero_rt_list)
         remove_dup_nodes(root_node)
-        fill_stats(root_node)
+        # The autograd thread runs backward nodes at top level, and no ProfilerStep.
+        is_backward_thread = any(BACKWARD_NODE_PATTERN.search(child.name) is not None for child in root_node.children) \
+            and not any(type(child) is ProfilerStepNode for child in root_node.children)
+        fill_stats(root_node, phase=PHASE_BACKWARD if is_backward_thread else PHASE_FORWARD)
         return root_node
 
     def parse_events(self, events):
@@ -216,6 +327,10 @@ class ModuleParser:
             if event.type in [EventTypes.KERNEL, EventTypes.MEMCPY, EventTypes.MEMSET]:
                 device_node = DeviceNode()
                 build_node(device_node, event)
+                device_node.device_id = event.args.get("device", event.pid)
+                device_node.stream_id = event.args.get("stream", event.tid)
+                if event.type == EventTypes.KERNEL:
+                    device_node.tc_used = is_tc_kernel(event.name)
                 if corrid in corrid_to_runtime:
                     rt_node = corrid_to_runtime[corrid]  # Don't pop it because it may be used by next kernel.
                     if rt_node.device_nodes is None:
@@ -259,65 +374,109 @@ class ModuleParser:
             elif event.type in [EventTypes.PYTHON, EventTypes.OPERATOR, EventTypes.PROFILER_STEP]:
                 if event.type == EventTypes.PROFILER_STEP:
                     op_node = ProfilerStepNode()
+                    op_node.step = str(event.step)
                 else:
                     op_node = OperatorNode()
                 build_node(op_node, event)
                 op_node.input_shape = input_shape
+                op_node.tc_eligible = is_tc_eligible_op(op_node.name)
                 if tid not in tid2list:
                     tid2list[tid] = []
                 tid2list[tid].append(op_node)
 
         def parse_ops(cpp_op_list):
+            # The keys are tuples of the names, input shapes, modules and steps, which are shared objects
+            # interned by EventParser, so they are hashed and compared cheaply.
             def aggregate(key_to_agg, key, op):
-                if key not in key_to_agg:
-                    key_to_agg[key] = OperatorAgg()
-                agg = key_to_agg[key]
-                agg.name = op.name
-                agg.input_shape = str(op.input_shape)
+                agg = key_to_agg.get(key)
+                if agg is None:
+                    agg = OperatorAgg()
+                    agg.name = op.name
+                    agg.input_shape = str(op.input_shape)
+                    agg.module = str(op.module) if op.module is not None else "N/A"
+                    agg.phase = op.phase if op.phase is not None else "N/A"
+                    agg.tc_eligible = op.tc_eligible
+                    key_to_agg[key] = agg
                 agg.calls += 1
                 agg.host_duration += op.end_time - op.start_time
                 agg.device_duration += op.device_duration
                 agg.self_host_duration += op.self_host_duration
                 agg.self_device_duration += op.self_device_duration
+                agg.tc_self_device_duration += op.tc_self_device_duration
                 return agg
 
             name_to_agg = {}
-            for op in cpp_op_list:
-                agg = aggregate(name_to_agg, op.name, op)
-            for _, agg in name_to_agg.items():
-                agg.average()
-            op_list_groupby_name = list(name_to_agg.values())
-
             name_input_to_agg = {}
+            name_module_to_agg = {}
+            name_phase_to_agg = {}
+            name_step_to_agg = {}
             for op in cpp_op_list:
-                name_input = op.name + "###" + str(op.input_shape)
-                agg = aggregate(name_input_to_agg, name_input, op)
-            for _, agg in name_input_to_agg.items():
-                agg.average()
+                aggregate(name_to_agg, op.name, op)
+                aggregate(name_input_to_agg, (op.name, op.input_shape), op)
+                aggregate(name_module_to_agg, (op.name, op.module), op)
+                aggregate(name_phase_to_agg, (op.name, op.phase), op)
+                if op.step is not None:
+                    aggregate(name_step_to_agg, (op.name, op.step), op).step = op.step
+            for key_to_agg in [name_to_agg, name_input_to_agg, name_module_to_agg, name_phase_to_agg,
+                               name_step_to_agg]:
+                for _, agg in key_to_agg.items():
+                    agg.average()
+            op_list_groupby_name = list(name_to_agg.values())
             op_list_groupby_name_input = list(name_input_to_agg.values())
+            op_list_groupby_name_module = list(name_module_to_agg.values())
+            op_list_groupby_name_phase = list(name_phase_to_agg.values())
+            op_list_groupby_name_step = list(name_step_to_agg.values())
 
-            return op_list_groupby_name, op_list_groupby_name_input
+            return op_list_groupby_name, op_list_groupby_name_input, op_list_groupby_name_module, \
+                op_list_groupby_name_phase, op_list_groupby_name_step
 
         def parse_kernels(kernel_list):
-            name_op_to_agg = {}
-            for kernel in kernel_list:
-                op_name = "N/A" if kernel.op_node is None else kernel.op_node.name
-                key = kernel.name + "###" + op_name
-                if key not in name_op_to_agg:
-                    name_op_to_agg[key] = KernelAggByNameOp()
-                agg = name_op_to_agg[key]
-                agg.name = kernel.name
-                agg.op_name = op_name
+            def aggregate(key_to_agg, key, kernel, op_name, module, phase):
+                agg = key_to_agg.get(key)
+                if agg is None:
+                    agg = KernelAggByNameOp()
+                    agg.name = kernel.name
+                    agg.op_name = op_name
+                    agg.module = module
+                    agg.phase = phase
+                    key_to_agg[key] = agg
                 agg.calls += 1
                 dur = kernel.end_time - kernel.start_time
                 agg.total_duration += dur
                 agg.min_duration = min(agg.min_duration, dur)
                 agg.max_duration = max(agg.max_duration, dur)
-            for _, agg in name_op_to_agg.items():
-                agg.average()
+                return agg
+
+            name_op_to_agg = {}
+            name_module_to_agg = {}
+            name_phase_to_agg = {}
+            name_op_step_to_agg = {}
+            family_op_to_agg = {}
+            for kernel in kernel_list:
+                op_name = "N/A" if kernel.op_node is None else kernel.op_node.name
+                module = "N/A" if kernel.op_node is None or kernel.op_node.module is None else kernel.op_node.module
+                phase = "N/A" if kernel.op_node is None or kernel.op_node.phase is None else kernel.op_node.phase
+                aggregate(name_op_to_agg, (kernel.name, op_name), kernel, op_name, module, phase)
+                aggregate(name_module_to_agg, (kernel.name, module), kernel, op_name, module, phase)
+                aggregate(name_phase_to_agg, (kernel.name, phase), kernel, op_name, module, phase)
+                family = get_kernel_family(kernel.name)
+                aggregate(family_op_to_agg, (family, op_name), kernel, op_name, module, phase).name = family
+                step = None if kernel.op_node is None else kernel.op_node.step
+                if step is not None:
+                    agg = aggregate(name_op_step_to_agg, (kernel.name, op_name, step), kernel, op_name, module, phase)
+                    agg.step = step
+            for key_to_agg in [name_op_to_agg, name_module_to_agg, name_phase_to_agg, name_op_step_to_agg,
+                               family_op_to_agg]:
+                for _, agg in key_to_agg.items():
+                    agg.average()
             kernel_list_groupby_name_op = list(name_op_to_agg.values())
+            kernel_list_groupby_name_module = list(name_module_to_agg.values())
+            kernel_list_groupby_name_phase = list(name_phase_to_agg.values())
+            kernel_list_groupby_name_op_step = list(name_op_step_to_agg.values())
+            kernel_list_groupby_family_op = list(family_op_to_agg.values())
 
-            return kernel_list_groupby_name_op
+            return kernel_list_groupby_name_op, kernel_list_groupby_name_module, kernel_list_groupby_name_phase, \
+                kernel_list_groupby_name_op_step, kernel_list_groupby_family_op
 
         # For OperatorNode and ProfilerStepNode:
         #   Use time interval containing relationship to build father-child correlation,
@@ -347,11 +506,16 @@ class ModuleParser:
             if ext_id != 0:
                 logger.warning("{} Runtime with external id {} don't correlate to any operator!".format(
                     len(externalid_to_runtime[ext_id]), ext_id))
+        self.steps_spans = sorted((op.start_time, op.end_time, op.step) for op_list in tid2list.values()
+                                  for op in op_list if type(op) is ProfilerStepNode)
         for tid, op_list in tid2list.items():
             zero_rt_list = tid2zero_rt_list[tid] if tid in tid2zero_rt_list else []
             # Note that when 2 start_time are equal, the one with bigger end_time should be ahead of the other.
             op_list.sort(key=lambda x: (x.start_time, -x.end_time))
             root_node = self._build_tree(op_list, zero_rt_list)
             self.tid2tree[tid] = root_node
-        self.op_list_groupby_name, self.op_list_groupby_name_input = parse_ops(self.cpp_op_list)
-        self.kernel_list_groupby_name_op = parse_kernels(self.kernel_list)
+        self.op_list_groupby_name, self.op_list_groupby_name_input, self.op_list_groupby_name_module, \
+            self.op_list_groupby_name_phase, self.op_list_groupby_name_step = parse_ops(self.cpp_op_list)
+        self.kernel_list_groupby_name_op, self.kernel_list_groupby_name_module, \
+            self.kernel_list_groupby_name_phase, self.kernel_list_groupby_name_op_step, \
+            self.kernel_list_groupby_family_op = parse_kernels(self.kernel_list)
@@ -0,0 +1,129 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import bisect
+
+from .module_parser import ProfilerStepNode
+from .trace import EventTypes
+from .. import utils
+
+logger = utils.get_logger()
+
+OPTIMIZER_NODE_PREFIX = "Optimizer."  # Such as "Optimizer.step#SGD.step" and "Optimizer.zero_grad#SGD.zero_grad".
+# One for each parameter with gradient in backward. Recent PyTorch wraps it in a node named
+# "autograd::engine::evaluate_function: torch::autograd::AccumulateGrad", which has the same suffix.
+PARAMETER_NODE_SUFFIX = "AccumulateGrad"
+# Multi-tensor implementations which update all parameters with a few kernels.
+FOREACH_OP_PREFIXES = ("aten::_foreach_", "aten::_fused_")
+FOREACH_KERNEL_KEYWORDS = ("multi_tensor_apply", "fused_adam", "FusedAdam")
+
+
+def is_optimizer_node(name):
+    return name.startswith(OPTIMIZER_NODE_PREFIX)
+
+
+class OptimizerAgg:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.host_duration = 0
+        self.device_duration = 0
+        self.launches = 0  # Runtime calls launching device activities.
+        self.kernels = 0
+        self.is_foreach = False  # Whether it uses foreach or fused implementation.
+
+
+class OptimizerStepStats:
+    def __init__(self):
+        self.host_duration = 0
+        self.device_duration = 0
+        self.launches = 0
+        self.kernels = 0
+        self.parameters = 0  # Count of AccumulateGrad in the step, 0 if there is no backward.
+
+    @property
+    def kernels_per_parameter(self):
+        return self.kernels / self.parameters if self.parameters > 0 else None
+
+
+class OptimizerParser:
+    """Measure the host and device time of the optimizer in each step, and the kernels it launches
+    for each parameter, which shows whether the optimizer runs one small kernel per parameter.
+    """
+
+    def __init__(self):
+        self.optimizers = []  # List of OptimizerAgg grouped by node name, sorted by host duration.
+        self.steps_stats = []  # List of OptimizerStepStats, one for each step.
+
+    def parse(self, tid2tree, steps):
+        """steps: host side spans of the steps, list of (start_time, end_time)."""
+        steps_start_time = [step[0] for step in steps]
+
+        def find_step(ts):
+            i_step = bisect.bisect_right(steps_start_time, ts) - 1
+            if i_step >= 0 and ts < steps[i_step][1]:
+                return i_step
+            return None
+
+        self.steps_stats = [OptimizerStepStats() for _ in steps]
+        name_to_agg = {}
+        for root in tid2tree.values():
+            node_stack = [root]
+            while len(node_stack) > 0:
+                node = node_stack.pop()
+                if node.name.endswith(PARAMETER_NODE_SUFFIX) and type(node) is not ProfilerStepNode:
+                    i_step = find_step(node.start_time)
+                    if i_step is not None:
+                        self.steps_stats[i_step].parameters += 1
+                    # Only the outermost node is counted, so the wrapped AccumulateGrad isn't counted twice.
+                    continue
+                if is_optimizer_node(node.name):
+                    # Only the outermost optimizer node is counted, its kernels include the nested ones.
+                    agg = name_to_agg.get(node.name)
+                    if agg is None:
+                        agg = OptimizerAgg(node.name)
+                        name_to_agg[node.name] = agg
+                    launches, kernels, is_foreach = self._count_kernels(node)
+                    agg.calls += 1
+                    agg.host_duration += node.end_time - node.start_time
+                    agg.device_duration += node.device_duration
+                    agg.launches += launches
+                    agg.kernels += kernels
+                    agg.is_foreach = agg.is_foreach or is_foreach
+
+                    i_step = find_step(node.start_time)
+                    if i_step is not None:
+                        stats = self.steps_stats[i_step]
+                        stats.host_duration += node.end_time - node.start_time
+                        stats.device_duration += node.device_duration
+                        stats.launches += launches
+                        stats.kernels += kernels
+                    continue
+                node_stack.extend(node.children)
+
+        self.optimizers = sorted(name_to_agg.values(), key=lambda x: x.host_duration, reverse=True)
+
+    @staticmethod
+    def _count_kernels(optimizer_node):
+        """Return (launches, kernels, is_foreach) of the optimizer node's subtree."""
+        launches = 0
+        kernels = 0
+        is_foreach = False
+        node_stack = [optimizer_node]
+        while len(node_stack) > 0:
+            node = node_stack.pop()
+            if node.name.startswith(FOREACH_OP_PREFIXES):
+                is_foreach = True
+            for rt in node.runtimes:
+                if rt.device_nodes is None:
+                    continue
+                launches += 1
+                for device_node in rt.device_nodes:
+                    if device_node.type != EventTypes.KERNEL:
+                        continue
+                    kernels += 1
+                    if any(keyword in device_node.name for keyword in FOREACH_KERNEL_KEYWORDS):
+                        is_foreach = True
+            node_stack.extend(node.children)
+        return launches, kernels, is_foreach
@@ -2,13 +2,64 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # --------------------------------------------------------------------------
 
+import re
 import sys
 
+from .steady_state import StepsConfig, detect_tail_steps, detect_warmup_steps
 from .trace import EventTypes
 from .. import utils
 
 logger = utils.get_logger()
 
+# Attribute names of OverallParser.Costs which partition a step, with their display names.
+COST_CATEGORIES = [
+    ("kernel_cost", "Kernel"),
+    ("exposed_communication_cost", "Communication"),
+    ("memcpy_cost", "Memcpy"),
+    ("memset_cost", "Memset"),
+    ("sync_cost", "Synchronization"),
+    ("runtime_cost", "Runtime"),
+    ("dataloader_cost", "DataLoader"),
+    ("cpuop_cost", "CPU Exec"),
+    ("other_cost", "Other")
+]
+
+
+
+def _get_costs_display_names():
+    """Add the step time and the total communication to COST_CATEGORIES. The communication category is
+    named "Exposed Communication" there, to tell it apart from the total communication."""
+    display_names = [("step_total_cost", "Step Time")]
+    for field, name in COST_CATEGORIES:
+        if field == "exposed_communication_cost":
+            display_names.extend([(field, "Exposed Communication"), ("communication_cost", "Communication")])
+        else:
+            display_names.append((field, name))
+    return display_names
+
+
+# Fields of OverallParser.Costs and their display names.
+COSTS_DISPLAY_NAMES = _get_costs_display_names()
+
+
+# NCCL collective/p2p kernels, such as "ncclAllReduceRingLLKernel_sum_f32" or "ncclKernel_AllGather_RING_LL_Sum_int8_t".
+COMMUNICATION_KERNEL_PATTERN = re.compile(r"nccl", re.IGNORECASE)
+
+
+def is_communication_kernel(name):
+    return name is not None and COMMUNICATION_KERNEL_PATTERN.search(name) is not None
+
+
+# Runtime APIs which block the host until the device finishes the queued work,
+# including the synchronous memcpy such as "cudaMemcpy" but not "cudaMemcpyAsync".
+SYNC_RUNTIME_PATTERN = re.compile(
+    r"^cuda(DeviceSynchronize|StreamSynchronize|EventSynchronize|Memcpy|Memcpy2D|Memcpy3D|MemcpyPeer|"
+    r"MemcpyToSymbol|MemcpyFromSymbol)$")
+
+
+def is_sync_runtime(name):
+    return name is not None and SYNC_RUNTIME_PATTERN.match(name) is not None
+
 
 def merge_ranges(src_ranges, is_sorted=False):
     merged_ranges = []
@@ -121,8 +172,14 @@ class OverallParser(object):
         def __init__(self):
             self.step_total_cost = 0
             self.kernel_cost = 0
+            # Communication time that is not overlapped with computation kernels. It is a part of the step.
+            self.exposed_communication_cost = 0
+            # Total communication time, including the part overlapped with computation kernels.
+            self.communication_cost = 0
             self.memcpy_cost = 0
             self.memset_cost = 0
+            # Time the host is blocked in synchronization runtime calls, not overlapped with device activities.
+            self.sync_cost = 0
             self.runtime_cost = 0
             self.dataloader_cost = 0
             self.cpuop_cost = 0
@@ -131,18 +188,34 @@ class OverallParser(object):
         def calculate_costs(self, statistics, step):
             self.step_total_cost = step[1] - step[0]
             self.kernel_cost = get_ranges_sum(statistics.kernel_cost_ranges)
+            self.exposed_communication_cost = get_ranges_sum(statistics.exposed_communication_cost_ranges)
+            self.communication_cost = get_ranges_sum(statistics.communication_cost_ranges)
             self.memcpy_cost = get_ranges_sum(statistics.memcpy_cost_ranges)
             self.memset_cost = get_ranges_sum(statistics.memset_cost_ranges)
+            self.sync_cost = get_ranges_sum(statistics.sync_cost_ranges)
             self.runtime_cost = get_ranges_sum(statistics.runtime_cost_ranges)
             self.dataloader_cost = get_ranges_sum(statistics.dataloader_cost_ranges)
             self.cpuop_cost = get_ranges_sum(statistics.cpuop_cost_ranges)
             self.other_cost = get_ranges_sum(statistics.other_cost_ranges)
 
+        @staticmethod
+        def average(costs_list):
+            """Return the Costs whose each field is the mean of that field over costs_list."""
+            avg_costs = OverallParser.Costs()
+            if len(costs_list) == 0:
+                return avg_costs
+            for field in vars(avg_costs):
+                setattr(avg_costs, field, sum(getattr(costs, field) for costs in costs_list) / len(costs_list))
+            return avg_costs
+
     class Statistics:
         def __init__(self):
             self.kernel_cost_ranges = []
+            self.exposed_communication_cost_ranges = []
+            self.communication_cost_ranges = []
             self.memcpy_cost_ranges = []
             self.memset_cost_ranges = []
+            self.sync_cost_ranges = []
             self.runtime_cost_ranges = []
             self.dataloader_cost_ranges = []
             self.cpuop_cost_ranges = []
@@ -152,37 +225,50 @@ class OverallParser(object):
             result = OverallParser.Statistics()
             step = [step]
             result.kernel_cost_ranges = intersection_ranges_lists(step, self.kernel_cost_ranges)
+            result.exposed_communication_cost_ranges = intersection_ranges_lists(
+                step, self.exposed_communication_cost_ranges)
+            result.communication_cost_ranges = intersection_ranges_lists(step, self.communication_cost_ranges)
             result.memcpy_cost_ranges = intersection_ranges_lists(step, self.memcpy_cost_ranges)
             result.memset_cost_ranges = intersection_ranges_lists(step, self.memset_cost_ranges)
+            result.sync_cost_ranges = intersection_ranges_lists(step, self.sync_cost_ranges)
             result.runtime_cost_ranges = intersection_ranges_lists(step, self.runtime_cost_ranges)
             result.dataloader_cost_ranges = intersection_ranges_lists(step, self.dataloader_cost_ranges)
             result.cpuop_cost_ranges = intersection_ranges_lists(step, self.cpuop_cost_ranges)
             result.other_cost_ranges = intersection_ranges_lists(step, self.other_cost_ranges)
             return result
 
-    def __init__(self):
-        self.kernel_ranges = []
+    def __init__(self, steps_config=None):
+        self.steps_config = steps_config if steps_config is not None else StepsConfig()
+        self.kernel_ranges = []  # Computation kernels only.
+        self.communication_ranges = []  # Communication kernels, such as NCCL all-reduce.
         self.memcpy_ranges = []
         self.memset_ranges = []
-        self.runtime_ranges = []
+        self.sync_ranges = []  # Synchronization runtimes which block the host.
+        self.runtime_ranges = []  # Runtimes except synchronization.
         self.dataloader_ranges = []
         self.cpuop_ranges = []
         self.steps = []
         self.steps_names = []
+        self.host_steps = []  # Host side spans of the steps, before considering the device side.
+        self.warmup_steps_names = []  # Names of the warm-up steps removed from the steps.
+        self.tail_steps_names = []  # Names of the truncated tail steps removed from the steps.
         self.has_runtime = False
         self.has_kernel = False
+        self.has_communication = False
         self.has_memcpy_or_memset = False
+        self.has_sync = False
         self.min_ts = sys.maxsize
         self.max_ts = -sys.maxsize - 1
         self.steps_costs = []
         self.avg_costs = OverallParser.Costs()
 
     # Update self.steps considering device side events launched by each host side step.
-    # Update self.steps_names if some tail steps are removed.
+    # Remove the warm-up and tail steps according to self.steps_config.
     def update_steps_consider_device_side(self, runtime_node_list, device_node_list):
         runtime_node_list = sorted(runtime_node_list, key=lambda x: x.start_time)
         # Make sure self.steps is sorted by time.
         self.steps = sorted(self.steps, key=lambda x: x[0])
+        self.host_steps = list(self.steps)
         # Use similar code with two-way merge to get all runtimes inside each host-side step span,
         # then record each step's min kernel start time and max kernel end time:
         steps_device = [(sys.maxsize, -sys.maxsize - 1)] * len(self.steps)
@@ -252,25 +338,34 @@ class OverallParser(object):
                 self.steps[i_step] = (step_start_time, step_end_time)  # Update step time considering device side.
                 prev_step_end_time = step_end_time
 
-        is_remove_tail_steps = True  # TODO: Use tensorboard argument instead.
-        if is_use_gpu and len(self.steps) > 1 and is_remove_tail_steps:
-            i_step = len(self.steps) - 1
-            while i_step >= 0:
-                if steps_matched_device_nodes[i_step] > 0:
-                    break
-                i_step -= 1
-            if i_step >= 0:
-                keep_steps = i_step + 1
-                if i_step > 0 and steps_matched_device_nodes[i_step - 1] * 0.8 > steps_matched_device_nodes[i_step]:
-                    keep_steps = i_step
-                if keep_steps < len(self.steps):
-                    logger.warning(
-                        "Remove the last {} steps from overview. "
-                        "Because the profiler may fail to capture all the kernels launched by these steps.".format(
-                            len(self.steps) - keep_steps
-                        ))
-                    self.steps = self.steps[:keep_steps]
-                    self.steps_names = self.steps_names[:keep_steps]
+        # Drop the truncated tail steps first, then the warm-up steps of the rest.
+        tail_steps = self.steps_config.tail_steps
+        if tail_steps is None:
+            tail_steps = detect_tail_steps(steps_matched_device_nodes) if is_use_gpu and len(self.steps) > 1 else 0
+        tail_steps = min(tail_steps, len(self.steps) - 1)
+        if tail_steps > 0:
+            logger.warning(
+                "Remove the last {} steps from overview. "
+                "Because the profiler may fail to capture all the kernels launched by these steps.".format(
+                    tail_steps
+                ))
+            keep_steps = len(self.steps) - tail_steps
+            self.tail_steps_names = self.steps_names[keep_steps:]
+            self.steps = self.steps[:keep_steps]
+            self.steps_names = self.steps_names[:keep_steps]
+            self.host_steps = self.host_steps[:keep_steps]
+            steps_matched_device_nodes = steps_matched_device_nodes[:keep_steps]
+
+        warmup_steps = self.steps_config.warmup_steps
+        if warmup_steps is None:
+            warmup_steps = detect_warmup_steps([step[1] - step[0] for step in self.steps], steps_matched_device_nodes)
+        warmup_steps = min(warmup_steps, len(self.steps) - 1)
+        if warmup_steps > 0:
+            logger.info("Remove the first {} warm-up steps from overview.".format(warmup_steps))
+            self.warmup_steps_names = self.steps_names[:warmup_steps]
+            self.steps = self.steps[warmup_steps:]
+            self.steps_names = self.steps_names[warmup_steps:]
+            self.host_steps = self.host_steps[warmup_steps:]
 
 
     def parse_events(self, events, runtime_node_list, device_node_list):
@@ -286,8 +381,10 @@ class OverallParser(object):
         merged_steps = merge_ranges(merged_steps)
 
         self.kernel_ranges = merge_ranges(self.kernel_ranges)
+        self.communication_ranges = merge_ranges(self.communication_ranges)
         self.memcpy_ranges = merge_ranges(self.memcpy_ranges)
         self.memset_ranges = merge_ranges(self.memset_ranges)
+        self.sync_ranges = merge_ranges(self.sync_ranges)
         self.runtime_ranges = merge_ranges(self.runtime_ranges)
         self.dataloader_ranges = merge_ranges(self.dataloader_ranges)
         self.cpuop_ranges = merge_ranges(self.cpuop_ranges)
@@ -295,11 +392,16 @@ class OverallParser(object):
         logger.debug("Overall, statistics")
         global_stats = OverallParser.Statistics()
         global_stats.kernel_cost_ranges = self.kernel_ranges
+        global_stats.communication_cost_ranges = self.communication_ranges
         slots = subtract_ranges_lists(merged_steps, self.kernel_ranges)
+        global_stats.exposed_communication_cost_ranges = intersection_ranges_lists(slots, self.communication_ranges)
+        slots = subtract_ranges_lists(slots, global_stats.exposed_communication_cost_ranges)
         global_stats.memcpy_cost_ranges = intersection_ranges_lists(slots, self.memcpy_ranges)
         slots = subtract_ranges_lists(slots, global_stats.memcpy_cost_ranges)
         global_stats.memset_cost_ranges = intersection_ranges_lists(slots, self.memset_ranges)
         slots = subtract_ranges_lists(slots, global_stats.memset_cost_ranges)
+        global_stats.sync_cost_ranges = intersection_ranges_lists(slots, self.sync_ranges)
+        slots = subtract_ranges_lists(slots, global_stats.sync_cost_ranges)
         global_stats.runtime_cost_ranges = intersection_ranges_lists(slots, self.runtime_ranges)
         slots = subtract_ranges_lists(slots, global_stats.runtime_cost_ranges)
         global_stats.dataloader_cost_ranges = intersection_ranges_lists(slots, self.dataloader_ranges)
@@ -314,30 +416,19 @@ class OverallParser(object):
             steps_stat = global_stats.intersection_with_step(self.steps[i])
             self.steps_costs.append(OverallParser.Costs())
             self.steps_costs[i].calculate_costs(steps_stat, self.steps[i])
-            self.avg_costs.step_total_cost += self.steps_costs[i].step_total_cost
-            self.avg_costs.kernel_cost += self.steps_costs[i].kernel_cost
-            self.avg_costs.memcpy_cost += self.steps_costs[i].memcpy_cost
-            self.avg_costs.memset_cost += self.steps_costs[i].memset_cost
-            self.avg_costs.runtime_cost += self.steps_costs[i].runtime_cost
-            self.avg_costs.dataloader_cost += self.steps_costs[i].dataloader_cost
-            self.avg_costs.cpuop_cost += self.steps_costs[i].cpuop_cost
-            self.avg_costs.other_cost += self.steps_costs[i].other_cost
-
-        self.avg_costs.step_total_cost /= valid_steps
-        self.avg_costs.kernel_cost /= valid_steps
-        self.avg_costs.memcpy_cost /= valid_steps
-        self.avg_costs.memset_cost /= valid_steps
-        self.avg_costs.runtime_cost /= valid_steps
-        self.avg_costs.dataloader_cost /= valid_steps
-        self.avg_costs.cpuop_cost /= valid_steps
-        self.avg_costs.other_cost /= valid_steps
+
+        self.avg_costs = OverallParser.Costs.average(self.steps_costs)
 
     def parse_event(self, event):
         ts = event.ts
         dur = event.duration
         evt_type = event.type
         if evt_type == EventTypes.KERNEL:
-            self.kernel_ranges.append((ts, ts + dur))
+            if is_communication_kernel(event.name):
+                self.communication_ranges.append((ts, ts + dur))
+                self.has_communication = True
+            else:
+                self.kernel_ranges.append((ts, ts + dur))
             self.has_kernel = True
         elif evt_type == EventTypes.MEMCPY:
             self.memcpy_ranges.append((ts, ts + dur))
@@ -346,7 +437,11 @@ class OverallParser(object):
             self.memset_ranges.append((ts, ts + dur))
             self.has_memcpy_or_memset = True
         elif evt_type == EventTypes.RUNTIME:
-            self.runtime_ranges.append((ts, ts + dur))
+            if is_sync_runtime(event.name):
+                self.sync_ranges.append((ts, ts + dur))
+                self.has_sync = True
+            else:
+                self.runtime_ranges.append((ts, ts + dur))
             self.has_runtime = True
         elif evt_type == EventTypes.OPERATOR and event.name.startswith("enumerate(DataLoader)#") \
                 and event.name.endswith(".__next__"):
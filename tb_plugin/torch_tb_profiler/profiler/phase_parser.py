@@ -0,0 +1,47 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+from .module_parser import PHASES
+from .overall_parser import merge_ranges, intersection_ranges_lists, get_ranges_sum
+from .. import utils
+
+logger = utils.get_logger()
+
+
+class PhaseParser:
+    """Calculate the host and device time of forward, backward and optimizer phases in each step."""
+
+    def __init__(self):
+        self.steps_host_costs = []  # List of dict: phase -> host time, one for each step.
+        self.steps_device_costs = []  # List of dict: phase -> device time, one for each step.
+
+    def parse(self, tid2tree, device_node_list, host_steps, steps):
+        """host_steps: host side spans of the steps. steps: the steps considering device side."""
+        host_ranges = {phase: [] for phase in PHASES}
+        for root in tid2tree.values():
+            # Only the outermost node of each phase is needed.
+            node_stack = [(child, None) for child in root.children]
+            while len(node_stack) > 0:
+                node, parent_phase = node_stack.pop()
+                if node.phase is not None and node.phase != parent_phase:
+                    host_ranges[node.phase].append((node.start_time, node.end_time))
+                for child in node.children:
+                    node_stack.append((child, node.phase))
+
+        device_ranges = {phase: [] for phase in PHASES}
+        for device_node in device_node_list:
+            if device_node.op_node is not None and device_node.op_node.phase is not None:
+                device_ranges[device_node.op_node.phase].append((device_node.start_time, device_node.end_time))
+
+        for phase in PHASES:
+            host_ranges[phase] = merge_ranges(host_ranges[phase])
+            device_ranges[phase] = merge_ranges(device_ranges[phase])
+
+        self.steps_host_costs = []
+        self.steps_device_costs = []
+        for host_step, step in zip(host_steps, steps):
+            self.steps_host_costs.append(
+                {phase: get_ranges_sum(intersection_ranges_lists([host_step], host_ranges[phase])) for phase in PHASES})
+            self.steps_device_costs.append(
+                {phase: get_ranges_sum(intersection_ranges_lists([step], device_ranges[phase])) for phase in PHASES})
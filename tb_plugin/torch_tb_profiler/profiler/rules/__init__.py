@@ -0,0 +1,9 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+from .base import Rule, Finding, SEVERITY_HIGH, SEVERITY_MEDIUM, SEVERITY_LOW, SEVERITIES
+from .engine import RuleEngine, discover_rules, RULES_ENTRY_POINT_GROUP
+
+__all__ = ["Rule", "Finding", "SEVERITY_HIGH", "SEVERITY_MEDIUM", "SEVERITY_LOW", "SEVERITIES",
+           "RuleEngine", "discover_rules", "RULES_ENTRY_POINT_GROUP"]
@@ -0,0 +1,45 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+# Severities of findings, from the most severe.
+SEVERITY_HIGH = "High"
+SEVERITY_MEDIUM = "Medium"
+SEVERITY_LOW = "Low"
+SEVERITIES = [SEVERITY_HIGH, SEVERITY_MEDIUM, SEVERITY_LOW]
+
+
+def get_severity(ratio):
+    """Return the severity of a problem costing the ratio (0~1) of the step time."""
+    if ratio >= 0.2:
+        return SEVERITY_HIGH
+    if ratio >= 0.1:
+        return SEVERITY_MEDIUM
+    return SEVERITY_LOW
+
+
+class Finding:
+    def __init__(self, rule, severity, message, estimated_saving=None):
+        self.rule = rule  # Name of the rule producing it.
+        self.severity = severity  # One of SEVERITIES.
+        self.message = message  # Recommendation shown to the user, may contain HTML links.
+        self.estimated_saving = estimated_saving  # Estimated saved time per step in us, None if unknown.
+
+
+class Rule:
+    """Base class of the rules checking a processed RunProfileData for performance problems.
+
+    Subclasses override check() to return a list of Finding. Rules of other packages are discovered
+    from the "torch_tb_profiler.rules" entry points, each of which refers to a Rule subclass.
+    A rule could run in parallel with others, so it must not modify the profile.
+    """
+    name = None  # Defaults to the class name.
+
+    def get_name(self):
+        return self.name if self.name is not None else type(self).__name__
+
+    def finding(self, severity, message, estimated_saving=None):
+        return Finding(self.get_name(), severity, message, estimated_saving)
+
+    def check(self, profile):
+        raise NotImplementedError
@@ -0,0 +1,262 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+from collections import Counter
+
+from .base import Rule, get_severity, SEVERITY_MEDIUM
+from ..launch_parser import IDLE_CAUSE_CPU_BOUND
+
+LOW_OCCUPANCY_THRESHOLD = 30  # Estimated achieved occupancy in percentage.
+
+
+class DataLoaderRule(Rule):
+    """Recommend DataLoader settings according to the wait time of the steps and the host to device copies."""
+    name = "DataLoader"
+
+    def check(self, profile):
+        findings = []
+        steps_stats = profile.dataloader_steps_stats
+        step_time = profile.avg_costs.step_total_cost
+        if step_time <= 0 or steps_stats is None or len(steps_stats) == 0:
+            return findings
+
+        dataloader_ratio = profile.avg_costs.dataloader_cost / step_time
+        if dataloader_ratio > 0.05:
+            exposed_wait = sum(s.exposed_wait_duration for s in steps_stats) / len(steps_stats)
+            text = "This run has high time cost on input data loading. " \
+                   "{}% of the step time is in DataLoader. You could " \
+                   "try to set num_workers on DataLoader's construction " \
+                   "and enable multi-processes on data loading. " \
+                   "The estimated saving is up to {}us per step, in which the GPU is idle waiting for data. " \
+                   "Reference: <a href =\"{}\" target=\"_blank\">Single- and Multi-process Data Loading</a>".format(
+                       round(dataloader_ratio * 100, 1), round(exposed_wait),
+                       "https://pytorch.org/docs/stable/data.html#single-and-multi-process-data-loading"
+                   )
+            findings.append(self.finding(get_severity(dataloader_ratio), text, exposed_wait))
+
+        # Steps waiting much longer than usual, such as the first step of each epoch starting the workers.
+        median_wait = profile.dataloader_median_wait
+        min_wait = min(s.wait_duration for s in steps_stats)
+        spike_threshold = max(4 * median_wait, 0.05 * step_time)
+        spike_excesses = [s.wait_duration - median_wait for s in steps_stats
+                          if s.wait_duration - median_wait > spike_threshold]
+        if len(steps_stats) >= 2 and 0 < len(spike_excesses) <= len(steps_stats) / 2:
+            saving = sum(spike_excesses) / len(steps_stats)
+            text = "{} of {} steps wait for data more than {}us longer than the median. " \
+                   "If they start new epochs, the DataLoader workers are re-created each epoch. " \
+                   "You could try to set persistent_workers=True on DataLoader's construction " \
+                   "to keep the workers alive. The estimated saving is {}us per step.".format(
+                       len(spike_excesses), len(steps_stats), round(spike_threshold), round(saving))
+            findings.append(self.finding(get_severity(saving / step_time), text, saving))
+        elif profile.dataloader_mean_wait / step_time > 0.05 \
+                and profile.dataloader_std_wait > 0.5 * profile.dataloader_mean_wait:
+            saving = profile.dataloader_mean_wait - min_wait
+            text = "The DataLoader wait time varies a lot between steps, from {}us to {}us. " \
+                   "The workers sometimes fall behind. You could try to increase prefetch_factor " \
+                   "on DataLoader's construction to buffer more batches ahead. " \
+                   "The estimated saving is up to {}us per step.".format(
+                       round(min_wait), round(max(s.wait_duration for s in steps_stats)), round(saving))
+            findings.append(self.finding(get_severity(saving / step_time), text, saving))
+
+        h2d_copies = sum(s.h2d_copies for s in steps_stats)
+        pageable_copies = sum(s.pageable_copies for s in steps_stats)
+        blocking_copies = sum(s.blocking_copies for s in steps_stats)
+        blocking_duration = sum(s.blocking_duration for s in steps_stats) / len(steps_stats)
+        if blocking_copies > 0 and blocking_duration / step_time > 0.01:
+            text = "{} of {} host to device copies are from pageable memory, " \
+                   "and {} block the host. You could try to set pin_memory=True " \
+                   "on DataLoader's construction and copy the batches by tensor.to(device, non_blocking=True). " \
+                   "The estimated saving is {}us per step. " \
+                   "Reference: <a href =\"{}\" target=\"_blank\">Memory Pinning</a>".format(
+                       pageable_copies, h2d_copies, blocking_copies, round(blocking_duration),
+                       "https://pytorch.org/docs/stable/data.html#memory-pinning")
+            findings.append(self.finding(get_severity(blocking_duration / step_time), text, blocking_duration))
+        return findings
+
+
+class LowOccupancyRule(Rule):
+    """Find kernels which take more than 5% of kernel time but have low occupancy."""
+    name = "LowOccupancy"
+
+    def check(self, profile):
+        if profile.kernel_stat is None:
+            return []
+        kernels = []
+        total_duration = profile.kernel_stat["sum"].sum()
+        if total_duration <= 0:
+            return []
+        for name, row in profile.kernel_stat.iterrows():
+            if row["sum"] / total_duration < 0.05:
+                continue
+            if "occupancy" in row and row["occupancy"] < LOW_OCCUPANCY_THRESHOLD:
+                kernels.append(name)
+            elif "blocks_per_sm" in row and row["blocks_per_sm"] < 1:
+                kernels.append(name)
+        if len(kernels) == 0:
+            return []
+        text = "Kernel(s) {} take a large part of GPU time, but have low occupancy " \
+               "(estimated achieved occupancy below {}% or less than one block per SM). " \
+               "The GPU is under-utilized when they run. You could try to increase the batch size, " \
+               "or fuse small operators to launch bigger kernels.".format(
+                   ", ".join("\"{}\"".format(name) for name in kernels[:3]), LOW_OCCUPANCY_THRESHOLD)
+        return [self.finding(SEVERITY_MEDIUM, text)]
+
+
+class TensorCoresRule(Rule):
+    """Find Tensor Cores eligible operators which take more than 5% of self device time
+    but spend less than 10% of it on Tensor Cores kernels."""
+    name = "TensorCores"
+
+    def check(self, profile):
+        if not profile.has_kernel:
+            return []
+        ops = []
+        total_duration = sum(op.self_device_duration for op in profile.op_list_groupby_name)
+        if total_duration <= 0:
+            return []
+        for op in profile.op_list_groupby_name:
+            if op.tc_eligible and op.self_device_duration / total_duration >= 0.05 and op.tc_self_ratio < 0.1:
+                ops.append(op)
+        if len(ops) == 0:
+            return []
+        ops.sort(key=lambda x: x.self_device_duration, reverse=True)
+        text = "Operator(s) {} could run on Tensor Cores and take a large part of GPU time, " \
+               "but most of their kernels don't use Tensor Cores. " \
+               "You could try to enable Automatic Mixed Precision, TF32 on Ampere GPUs, " \
+               "channels_last memory format for convolutions, and make the dimensions multiples of 8. " \
+               "Reference: <a href =\"{}\" target=\"_blank\">Automatic Mixed Precision</a>".format(
+                   ", ".join("\"{}\"".format(op.name) for op in ops[:3]),
+                   "https://pytorch.org/docs/stable/amp.html")
+        return [self.finding(SEVERITY_MEDIUM, text)]
+
+
+class SynchronizationRule(Rule):
+    name = "Synchronization"
+
+    def check(self, profile):
+        if not profile.has_sync or profile.avg_costs is None or profile.avg_costs.step_total_cost <= 0:
+            return []
+        sync_ratio = profile.avg_costs.sync_cost / profile.avg_costs.step_total_cost
+        if sync_ratio <= 0.05:
+            return []
+        # The sync runtimes may be unreachable from the operator trees, then no sync point is aggregated.
+        top_point_text = ""
+        if profile.sync_points is not None and len(profile.sync_points) > 0:
+            top_point = profile.sync_points[0]
+            top_point_text = "The most costly one is \"{}\" called by \"{}\". ".format(
+                top_point.name, " > ".join(top_point.stack) if len(top_point.stack) > 0 else "N/A")
+        text = "This run has high time cost on synchronization. " \
+               "{}% of the step time the host is blocked in synchronization calls " \
+               "while the GPU is idle. {}" \
+               "Implicit synchronization is often caused by tensor.item(), tensor.cpu(), printing " \
+               "or indexing with a CUDA tensor, and can be avoided by keeping the values on GPU " \
+               "or copying them with non_blocking=True.".format(round(sync_ratio * 100, 1), top_point_text)
+        return [self.finding(get_severity(sync_ratio), text, profile.avg_costs.sync_cost)]
+
+
+class LaunchBoundRule(Rule):
+    name = "LaunchBound"
+
+    def check(self, profile):
+        if profile.launch_idle_costs is None or len(profile.steps_costs) == 0:
+            return []
+        total_step_time = sum(s.step_total_cost for s in profile.steps_costs)
+        if total_step_time <= 0:
+            return []
+        launch_bound_ratio = profile.launch_idle_costs[IDLE_CAUSE_CPU_BOUND] / total_step_time
+        if launch_bound_ratio <= 0.1:
+            return []
+        text = "This run is launch-bound. {}% of the step time the GPU is idle " \
+               "while the CPU is busy running operators and launching kernels. " \
+               "You could try to increase the batch size, fuse small operators, " \
+               "or capture the step with CUDA Graphs to reduce the launch overhead. " \
+               "Reference: <a href =\"{}\" target=\"_blank\">CUDA Graphs</a>".format(
+                   round(launch_bound_ratio * 100, 1),
+                   "https://pytorch.org/docs/stable/notes/cuda.html#cuda-graphs")
+        saving = profile.launch_idle_costs[IDLE_CAUSE_CPU_BOUND] / len(profile.steps_costs)
+        return [self.finding(get_severity(launch_bound_ratio), text, saving)]
+
+
+class OptimizerRule(Rule):
+    """Recommend multi-tensor optimizers when the optimizer takes more than 5% of the step time,
+    launches at least one kernel per parameter, and its host time exceeds its device time."""
+    name = "Optimizer"
+
+    def check(self, profile):
+        if profile.optimizers is None or not profile.has_kernel:
+            return []
+        if any(agg.is_foreach for agg in profile.optimizers):
+            return []
+        steps_stats = profile.optimizer_steps_stats
+        total_step_time = sum(s.step_total_cost for s in profile.steps_costs)
+        host_duration = sum(s.host_duration for s in steps_stats)
+        device_duration = sum(s.device_duration for s in steps_stats)
+        kernels = sum(s.kernels for s in steps_stats)
+        parameters = sum(s.parameters for s in steps_stats)
+        if total_step_time <= 0 or parameters <= 0:
+            return []
+        optimizer_ratio = host_duration / total_step_time
+        kernels_per_parameter = kernels / parameters
+        if optimizer_ratio <= 0.05 or kernels_per_parameter < 1 or host_duration <= device_duration:
+            return []
+        text = "This run has high time cost on optimizer. " \
+               "{}% of the step time is in the optimizer, which launches {} kernels per parameter " \
+               "and spends {}us on host for {}us of GPU time. The optimizer is bound by kernel launches. " \
+               "You could try the multi-tensor implementation by setting foreach=True, or fused=True " \
+               "on the optimizers supporting it such as Adam and AdamW. " \
+               "Reference: <a href =\"{}\" target=\"_blank\">Optimizer Algorithms</a>".format(
+                   round(optimizer_ratio * 100, 1), round(kernels_per_parameter, 1),
+                   round(host_duration), round(device_duration),
+                   "https://pytorch.org/docs/stable/optim.html#algorithms")
+        # The host time above the device time is mostly launch overhead.
+        saving = (host_duration - device_duration) / len(steps_stats)
+        return [self.finding(get_severity(optimizer_ratio), text, saving)]
+
+
+class CommunicationRule(Rule):
+    name = "Communication"
+
+    def check(self, profile):
+        avg_costs = profile.avg_costs
+        if not profile.has_communication or avg_costs is None or avg_costs.step_total_cost <= 0:
+            return []
+        exposed_ratio = avg_costs.exposed_communication_cost / avg_costs.step_total_cost
+        if exposed_ratio <= 0.1:
+            return []
+        overlap_ratio = 0
+        if avg_costs.communication_cost > 0:
+            overlap_ratio = 1 - avg_costs.exposed_communication_cost / avg_costs.communication_cost
+        text = "This run has high time cost on communication. " \
+               "{}% of the step time is in communication which is not overlapped with computation, " \
+               "only {}% of the communication time is overlapped. You could try to overlap " \
+               "communication with backward computation by tuning bucket_cap_mb of " \
+               "DistributedDataParallel, or reduce the communication volume by gradient " \
+               "accumulation or compression.".format(round(exposed_ratio * 100, 1), round(overlap_ratio * 100, 1))
+        return [self.finding(get_severity(exposed_ratio), text)]
+
+
+class StragglerRule(Rule):
+    name = "Straggler"
+
+    def check(self, profile):
+        step_skews = profile.step_skews
+        straggler_steps = [s for s in step_skews if s.slowest_worker == profile.worker and s.skew_ratio > 0.1]
+        if len(step_skews) == 0 or len(straggler_steps) < len(step_skews) / 2:
+            return []
+        avg_skew = sum(s.skew for s in straggler_steps) / len(straggler_steps)
+        avg_skew_ratio = sum(s.skew_ratio for s in straggler_steps) / len(straggler_steps)
+        categories = [s.dominant_category for s in straggler_steps if s.dominant_category is not None]
+        text = "This worker is the slowest one in {} of {} steps. " \
+               "Its step time is on average {}us ({}%) longer than the median of all workers, " \
+               "which stalls the other workers in synchronous distributed training.".format(
+                   len(straggler_steps), len(step_skews), round(avg_skew), round(avg_skew_ratio * 100, 1))
+        if len(categories) > 0:
+            # Ties go to the category of the earliest straggler step.
+            dominant_category = Counter(categories).most_common(1)[0][0]
+            text += " Most of the extra time is spent in {}.".format(dominant_category)
+        return [self.finding(get_severity(avg_skew_ratio), text, avg_skew)]
+
+
+BUILTIN_RULES = [DataLoaderRule, LowOccupancyRule, TensorCoresRule, SynchronizationRule, LaunchBoundRule,
+                 OptimizerRule, CommunicationRule, StragglerRule]
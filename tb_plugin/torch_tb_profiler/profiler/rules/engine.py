@@ -0,0 +1,77 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .base import Rule, SEVERITIES
+from .builtin import BUILTIN_RULES
+from ... import utils
+
+logger = utils.get_logger()
+
+RULES_ENTRY_POINT_GROUP = "torch_tb_profiler.rules"
+
+
+def _iter_entry_points(group):
+    try:
+        from importlib import metadata
+    except ImportError:
+        import pkg_resources
+        return pkg_resources.iter_entry_points(group)
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        return entry_points.select(group=group)
+    return entry_points.get(group, [])
+
+
+def discover_rules():
+    """Return instances of the builtin rules followed by the rules registered as entry points."""
+    rules = [rule_class() for rule_class in BUILTIN_RULES]
+    for entry_point in _iter_entry_points(RULES_ENTRY_POINT_GROUP):
+        try:
+            rule_class = entry_point.load()
+            if not (isinstance(rule_class, type) and issubclass(rule_class, Rule)):
+                logger.warning("Entry point %s of %s is not a Rule subclass.", entry_point.name,
+                               RULES_ENTRY_POINT_GROUP)
+                continue
+            rules.append(rule_class())
+        except Exception as ex:
+            logger.warning("Failed to load rule %s. Exception=%s", entry_point.name, ex, exc_info=True)
+    return rules
+
+
+class RuleEngine:
+    """Run the rules on a processed profile in parallel, and collect their findings and running time."""
+
+    def __init__(self, rules=None, max_workers=None):
+        self.rules = rules if rules is not None else discover_rules()
+        self.max_workers = max_workers
+        self.findings = []  # List of Finding, sorted by severity and then estimated saving.
+        self.rule_durations = {}  # Rule name -> running time in seconds.
+
+    def run(self, profile):
+        def run_rule(rule):
+            start = time.perf_counter()
+            try:
+                findings = rule.check(profile) or []
+            except Exception as ex:
+                logger.warning("Rule %s failed. Exception=%s", rule.get_name(), ex, exc_info=True)
+                findings = []
+            return findings, time.perf_counter() - start
+
+        self.findings = []
+        self.rule_durations = {}
+        if len(self.rules) == 0:
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # map keeps the order of rules, so the result doesn't depend on which rule finishes first.
+            for rule, (findings, duration) in zip(self.rules, executor.map(run_rule, self.rules)):
+                self.findings.extend(findings)
+                self.rule_durations[rule.get_name()] = duration
+                logger.debug("Rule %s took %.6f seconds", rule.get_name(), duration)
+
+        # Stable sort keeps the rules' order for the findings with the same severity and saving.
+        self.findings.sort(key=lambda f: (SEVERITIES.index(f.severity) if f.severity in SEVERITIES else len(SEVERITIES),
+                                          -(f.estimated_saving or 0)))
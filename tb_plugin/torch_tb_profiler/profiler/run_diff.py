@@ -0,0 +1,78 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+from .. import utils
+
+logger = utils.get_logger()
+
+OP_DIFF_FIELDS = ["calls", "host_duration", "self_host_duration", "device_duration", "self_device_duration"]
+KERNEL_DIFF_FIELDS = ["calls", "total_duration"]
+
+
+class AggDiff:
+    """Difference of one aggregate between the base and the experiment profile.
+    An aggregate only in one side is compared with zeros."""
+
+    def __init__(self, key, fields, base_agg, exp_agg, base_steps, exp_steps):
+        self.key = key  # Join key, such as (name, input_shape).
+        self.base = {f: getattr(base_agg, f) if base_agg is not None else 0 for f in fields}
+        self.exp = {f: getattr(exp_agg, f) if exp_agg is not None else 0 for f in fields}
+        self.delta = {f: self.exp[f] - self.base[f] for f in fields}
+        # Change of the time per step, the durations are divided by the steps count of each side.
+        self.delta_per_step = {f: self.exp[f] / exp_steps - self.base[f] / base_steps
+                               for f in fields if f != "calls"}
+
+    @property
+    def step_contribution(self):
+        """Estimated increase of the step time. The larger one of the exclusive host and device time is used,
+        since either of them could lengthen the step. Kernels only have device time."""
+        if "total_duration" in self.delta_per_step:
+            return self.delta_per_step["total_duration"]
+        return max(self.delta_per_step["self_host_duration"], self.delta_per_step["self_device_duration"])
+
+
+def _hash_join(base_aggs, exp_aggs, get_key):
+    """Full outer join of two aggregate lists by key, return list of (key, base_agg, exp_agg)."""
+    key_to_base = {get_key(agg): agg for agg in base_aggs}
+    result = []
+    for agg in exp_aggs:
+        key = get_key(agg)
+        result.append((key, key_to_base.pop(key, None), agg))
+    for key, agg in key_to_base.items():
+        result.append((key, agg, None))
+    return result
+
+
+class RunDiff:
+    """Compare the operator and kernel aggregates of two RunProfiles, such as the same worker of a
+    regressed run and a good run. Operators are joined by name and input shape, kernels by name and operator.
+    """
+
+    def __init__(self):
+        self.base_step_time = 0
+        self.exp_step_time = 0
+        self.op_diffs = []  # List of AggDiff, sorted by step contribution.
+        self.kernel_diffs = []  # List of AggDiff, sorted by step contribution.
+
+    def compare(self, base_profile, exp_profile):
+        self.base_step_time = base_profile.avg_step_time
+        self.exp_step_time = exp_profile.avg_step_time
+        base_steps = max(base_profile.steps_count, 1)
+        exp_steps = max(exp_profile.steps_count, 1)
+
+        self.op_diffs = []
+        for key, base_agg, exp_agg in _hash_join(base_profile.op_list_groupby_name_input,
+                                                 exp_profile.op_list_groupby_name_input,
+                                                 lambda agg: (agg.name, str(agg.input_shape))):
+            self.op_diffs.append(AggDiff(key, OP_DIFF_FIELDS, base_agg, exp_agg, base_steps, exp_steps))
+        self.op_diffs.sort(key=lambda x: x.step_contribution, reverse=True)
+
+        self.kernel_diffs = []
+        if base_profile.kernel_list_groupby_name_op is not None and \
+                exp_profile.kernel_list_groupby_name_op is not None:
+            for key, base_agg, exp_agg in _hash_join(base_profile.kernel_list_groupby_name_op,
+                                                     exp_profile.kernel_list_groupby_name_op,
+                                                     lambda agg: (agg.name, agg.op_name)):
+                self.kernel_diffs.append(AggDiff(key, KERNEL_DIFF_FIELDS, base_agg, exp_agg, base_steps, exp_steps))
+            self.kernel_diffs.sort(key=lambda x: x.step_contribution, reverse=True)
@@ -6,9 +6,43 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import time
+
+import pandas as pd
+
+from .critical_path_parser import VERTEX_CPU, VERTEX_RUNTIME, VERTEX_KERNEL, VERTEX_MEMCPY, VERTEX_MEMSET
+from .gpu_metrics_parser import IDLE_GAP_BIN_NAMES
+from .launch_parser import IDLE_CAUSES
+from .module_parser import PHASES
+from .overall_parser import COSTS_DISPLAY_NAMES
+from .run_diff import RunDiff
+from .trend import TREND_COST_FIELDS
 from .. import consts
 from ..run import RunProfile
 
+# Extra grouping attributes of the operator and kernel aggregations besides name: attribute -> display name.
+GROUP_BY_COLUMN_NAMES = {
+    "input_shape": "Input Shape",
+    "module": "Module",
+    "phase": "Phase"
+}
+
+# Launch configuration columns of kernel_stat shown in kernel table: (column, display name, type).
+KERNEL_LAUNCH_COLUMN_NAMES = [
+    ("blocks_per_sm", "Mean Blocks Per SM", "number"),
+    ("blocks_per_sm_p50", "P50 Blocks Per SM", "number"),
+    ("blocks_per_sm_p90", "P90 Blocks Per SM", "number"),
+    ("warps_per_sm", "Mean Warps Per SM", "number"),
+    ("occupancy", "Mean Est. Achieved Occupancy (%)", "number"),
+    ("min_occupancy", "Min Est. Achieved Occupancy (%)", "number"),
+    ("occupancy_p50", "P50 Est. Achieved Occupancy (%)", "number"),
+    ("occupancy_p90", "P90 Est. Achieved Occupancy (%)", "number"),
+    ("registers_per_thread", "Registers Per Thread", "number"),
+    ("shared_memory", "Shared Memory Per Block (bytes)", "number"),
+    ("grid", "Grid", "string"),
+    ("block", "Block", "string")
+]
+
 
 class RunGenerator(object):
     def __init__(self, worker, profile_data):
@@ -19,28 +53,77 @@ class RunGenerator(object):
         profile_run = RunProfile(self.worker)
         profile_run.has_runtime = self.profile_data.has_runtime
         profile_run.has_kernel = self.profile_data.has_kernel
+        profile_run.has_communication = self.profile_data.has_communication
         profile_run.has_memcpy_or_memset = self.profile_data.has_memcpy_or_memset
+        profile_run.has_sync = self.profile_data.has_sync
+        profile_run.steps_count = len(self.profile_data.steps_costs)
+        profile_run.avg_step_time = self.profile_data.avg_costs.step_total_cost
+        profile_run.op_list_groupby_name_input = self.profile_data.op_list_groupby_name_input
+        profile_run.kernel_list_groupby_name_op = self.profile_data.kernel_list_groupby_name_op
         profile_run.views.append(consts.OVERALL_VIEW)
         profile_run.overview = self._generate_overview()
+        if len(self.profile_data.outlier_steps) > 0:
+            profile_run.overview_without_outliers = self._generate_overview(exclude_outliers=True)
+        profile_run.step_stats = self._generate_step_stats()
 
         profile_run.views.append(consts.OP_VIEW)
         profile_run.operation_pie_by_name = self._generate_op_pie()
         profile_run.operation_table_by_name = self._generate_op_table()
-        profile_run.operation_pie_by_name_input = self._generate_op_pie(True)
-        profile_run.operation_table_by_name_input = self._generate_op_table(True)
+        profile_run.operation_pie_by_name_input = self._generate_op_pie("input_shape")
+        profile_run.operation_table_by_name_input = self._generate_op_table("input_shape")
+        profile_run.operation_pie_by_name_module = self._generate_op_pie("module")
+        profile_run.operation_table_by_name_module = self._generate_op_table("module")
+        profile_run.operation_pie_by_name_phase = self._generate_op_pie("phase")
+        profile_run.operation_table_by_name_phase = self._generate_op_table("phase")
+        profile_run.operation_table_by_step = self._generate_steps_tables(
+            self.profile_data.op_list_groupby_name_step, lambda op_list: self._generate_op_table(op_list=op_list))
+        profile_run.call_tree = self._generate_call_tree()
+        profile_run.flamegraph = self._generate_flamegraph()
 
         if self.profile_data.has_kernel:
             profile_run.views.append(consts.KERNEL_VIEW)
             profile_run.kernel_op_table = self._generate_kernel_op_table()
+            profile_run.kernel_op_table_by_step = self._generate_steps_tables(
+                self.profile_data.kernel_list_groupby_name_op_step,
+                lambda kernel_list: self._generate_kernel_op_table(kernel_list=kernel_list))
+            profile_run.kernel_module_table = self._generate_kernel_group_table("module")
+            profile_run.kernel_phase_table = self._generate_kernel_group_table("phase")
             profile_run.kernel_pie = self._generate_kernel_pie()
             profile_run.kernel_table = self._generate_kernel_table()
+            profile_run.kernel_family_table = self._generate_kernel_family_table()
+            profile_run.kernel_family_op_table = self._generate_kernel_op_table(
+                kernel_list=self.profile_data.kernel_list_groupby_family_op)
+            profile_run.gpu_metrics = self._generate_gpu_metrics()
+            profile_run.views.append(consts.LAUNCH_VIEW)
+            profile_run.launch = self._generate_launch()
+
+        if self.profile_data.has_sync:
+            profile_run.sync = self._generate_sync()
+
+        profile_run.dataloader = self._generate_dataloader()
+
+        if self.profile_data.optimizers is not None:
+            profile_run.optimizer = self._generate_optimizer()
+
+        if self.profile_data.critical_paths is not None:
+            profile_run.critical_path = self._generate_critical_path()
+
+        profile_run.findings = self._generate_findings()
 
         profile_run.views.append(consts.TRACE_VIEW)
         profile_run.trace_file_path = self.profile_data.trace_file_path
 
+        if self.profile_data.has_memory:
+            profile_run.views.append(consts.MEMORY_VIEW)
+            profile_run.has_memory = True
+            profile_run.memory_devices = self.profile_data.memory_devices
+            profile_run.memory_curves, profile_run.memory_peaks = self._generate_memory_curves()
+            profile_run.memory_op_table = self._generate_memory_op_table()
+
         return profile_run
 
-    def _generate_overview(self):
+    def _generate_overview(self, exclude_outliers=False):
+        """If exclude_outliers, the averages are computed without the outlier steps."""
         def build_part_time_str(part_cost, part_name):
             format_str = '<div class="visualization-tooltip" style="white-space: nowrap;">' \
                          'Step {}<br>' \
@@ -55,10 +138,14 @@ class RunGenerator(object):
             cost_dict = {"name": part_name,
                          "description": "",
                          "value": round(part_cost),
-                         "extra": round(100 * part_cost / self.profile_data.avg_costs.step_total_cost, 2)}
+                         "extra": round(100 * part_cost / step_avg_costs.step_total_cost, 2)}
             return cost_dict
 
+        step_avg_costs = self.profile_data.avg_costs_without_outliers if exclude_outliers \
+            else self.profile_data.avg_costs
         show_gpu = self.profile_data.has_runtime or self.profile_data.has_kernel or self.profile_data.has_memcpy_or_memset
+        show_communication = self.profile_data.has_communication
+        show_sync = self.profile_data.has_sync
 
         column_tootip = {"type": "string", "role": "tooltip", "p": {"html": "true"}}
         data = {}
@@ -66,12 +153,18 @@ class RunGenerator(object):
         data["steps"]["columns"] = [{"type": "string", "name": "Step"}]
         if show_gpu:
             data["steps"]["columns"].extend([{"type": "number", "name": "Kernel"},
-                                             column_tootip,
-                                             {"type": "number", "name": "Memcpy"},
+                                             column_tootip])
+            if show_communication:
+                data["steps"]["columns"].extend([{"type": "number", "name": "Communication"},
+                                                 column_tootip])
+            data["steps"]["columns"].extend([{"type": "number", "name": "Memcpy"},
                                              column_tootip,
                                              {"type": "number", "name": "Memset"},
-                                             column_tootip,
-                                             {"type": "number", "name": "Runtime"},
+                                             column_tootip])
+            if show_sync:
+                data["steps"]["columns"].extend([{"type": "number", "name": "Synchronization"},
+                                                 column_tootip])
+            data["steps"]["columns"].extend([{"type": "number", "name": "Runtime"},
                                              column_tootip])
         data["steps"]["columns"].extend([{"type": "number", "name": "DataLoader"},
                                          column_tootip,
@@ -87,12 +180,18 @@ class RunGenerator(object):
             row = [step_name]
             if show_gpu:
                 row.extend([costs.kernel_cost,
-                            build_part_time_str(costs.kernel_cost, "Kernel"),
-                            costs.memcpy_cost,
+                            build_part_time_str(costs.kernel_cost, "Kernel")])
+                if show_communication:
+                    row.extend([costs.exposed_communication_cost,
+                                build_part_time_str(costs.exposed_communication_cost, "Communication")])
+                row.extend([costs.memcpy_cost,
                             build_part_time_str(costs.memcpy_cost, "Memcpy"),
                             costs.memset_cost,
-                            build_part_time_str(costs.memset_cost, "Memset"),
-                            costs.runtime_cost,
+                            build_part_time_str(costs.memset_cost, "Memset")])
+                if show_sync:
+                    row.extend([costs.sync_cost,
+                                build_part_time_str(costs.sync_cost, "Synchronization")])
+                row.extend([costs.runtime_cost,
                             build_part_time_str(costs.runtime_cost, "Runtime")])
             row.extend([costs.dataloader_cost,
                         build_part_time_str(costs.dataloader_cost, "DataLoader"),
@@ -104,53 +203,501 @@ class RunGenerator(object):
 
         avg_costs = []
         if show_gpu:
+            avg_costs.append(build_avg_cost_dict("Kernel", step_avg_costs.kernel_cost))
+            if show_communication:
+                communication_dict = build_avg_cost_dict("Communication",
+                                                         step_avg_costs.exposed_communication_cost)
+                communication_dict["description"] = "Communication time not overlapped with computation kernels. " \
+                                                    "Total communication time: {}us.".format(
+                                                        round(step_avg_costs.communication_cost))
+                avg_costs.append(communication_dict)
             avg_costs.extend([
-                build_avg_cost_dict("Kernel", self.profile_data.avg_costs.kernel_cost),
-                build_avg_cost_dict("Memcpy", self.profile_data.avg_costs.memcpy_cost),
-                build_avg_cost_dict("Memset", self.profile_data.avg_costs.memset_cost),
-                build_avg_cost_dict("Runtime", self.profile_data.avg_costs.runtime_cost)
+                build_avg_cost_dict("Memcpy", step_avg_costs.memcpy_cost),
+                build_avg_cost_dict("Memset", step_avg_costs.memset_cost)
             ])
+            if show_sync:
+                sync_dict = build_avg_cost_dict("Synchronization", step_avg_costs.sync_cost)
+                sync_dict["description"] = "Time the host is blocked in synchronization calls " \
+                                           "while no device activity is running."
+                avg_costs.append(sync_dict)
+            avg_costs.append(build_avg_cost_dict("Runtime", step_avg_costs.runtime_cost))
         avg_costs.extend([
-            build_avg_cost_dict("DataLoader", self.profile_data.avg_costs.dataloader_cost),
-            build_avg_cost_dict("CPU Exec", self.profile_data.avg_costs.cpuop_cost),
-            build_avg_cost_dict("Other", self.profile_data.avg_costs.other_cost)
+            build_avg_cost_dict("DataLoader", step_avg_costs.dataloader_cost),
+            build_avg_cost_dict("CPU Exec", step_avg_costs.cpuop_cost),
+            build_avg_cost_dict("Other", step_avg_costs.other_cost)
         ])
 
-        data["performance"] = [{"name": "Average Step Time", "description": "",
-                                "value": round(self.profile_data.avg_costs.step_total_cost),
+        if self.profile_data.gpu_device_stats:
+            data["gpu_metrics"] = self._generate_gpu_metrics_summary()
+
+        data["phases"] = self._generate_phases(show_gpu)
+
+        data["excluded_steps"] = {"warmup": self.profile_data.warmup_steps_names,
+                                  "tail": self.profile_data.tail_steps_names}
+
+        description = ""
+        if exclude_outliers and len(self.profile_data.outlier_steps) > 0:
+            description = "Outlier steps excluded: {}.".format(
+                ", ".join(self.profile_data.steps_names[i] for i in self.profile_data.outlier_steps))
+        data["performance"] = [{"name": "Average Step Time", "description": description,
+                                "value": round(step_avg_costs.step_total_cost),
                                 "extra": 100, "children": avg_costs}]
 
-        if len(self.profile_data.recommendations) == 0:
+        if len(self.profile_data.findings) == 0:
             html = "<li>N/A</li>"
         else:
             html = ""
-            for recommendation in self.profile_data.recommendations:
-                html += "<li>{}</li>".format(recommendation)
+            for finding in self.profile_data.findings:
+                html += "<li>{}</li>".format(finding.message)
         data["recommendations"] = "<ul>{}</ul>".format(html)
 
         return data
 
-    def _generate_op_pie(self, group_by_input_shape=False):
+    def _generate_step_stats(self):
+        costs_table = {"columns": [{"type": "string", "name": "Category"},
+                                   {"type": "number", "name": "Mean (us)"},
+                                   {"type": "number", "name": "Std (us)"},
+                                   {"type": "number", "name": "P50 (us)"},
+                                   {"type": "number", "name": "P90 (us)"},
+                                   {"type": "number", "name": "P99 (us)"},
+                                   {"type": "number", "name": "Min (us)"},
+                                   {"type": "number", "name": "Max (us)"}],
+                       "rows": []}
+        for field, name in COSTS_DISPLAY_NAMES:
+            stats = self.profile_data.steps_costs_stats.get(field)
+            if stats is None or (stats.max == 0 and field != "step_total_cost"):
+                continue
+            costs_table["rows"].append([name] + [round(v, 2) for v in [stats.mean, stats.std, stats.p50, stats.p90,
+                                                                        stats.p99, stats.min, stats.max]])
+
+        steps_names = self.profile_data.steps_names
+        steps_costs = self.profile_data.steps_costs
+        median_step = self.profile_data.median_step
+        outliers_table = {"columns": [{"type": "string", "name": "Step"},
+                                      {"type": "number", "name": "Step Time (us)"},
+                                      {"type": "number", "name": "Median Step Time (us)"},
+                                      {"type": "number", "name": "Modified Z-Score"}],
+                          "rows": []}
+        outlier_ops = {}
+        for i in self.profile_data.outlier_steps:
+            outliers_table["rows"].append([steps_names[i], steps_costs[i].step_total_cost,
+                                           steps_costs[median_step].step_total_cost,
+                                           round(self.profile_data.steps_z_scores[i], 2)])
+            outlier_ops[steps_names[i]] = {"data": self._generate_outlier_op_diff_table(i)}
+
+        return {"costs": {"data": costs_table},
+                "outliers": {"data": outliers_table},
+                "median_step": steps_names[median_step] if median_step is not None else None,
+                "outlier_ops": outlier_ops}
+
+    def _generate_outlier_op_diff_table(self, outlier_step):
+        """Compare the operators of the outlier step with the median step, sorted by the increased time."""
+        steps_ops = self.profile_data.outlier_steps_ops
+        outlier_ops = steps_ops.get(outlier_step, {})
+        median_ops = steps_ops.get(self.profile_data.median_step, {})
+        table = {"columns": [{"type": "string", "name": "Name"},
+                             {"type": "number", "name": "Calls"},
+                             {"type": "number", "name": "Median Step Calls"},
+                             {"type": "number", "name": "Self Host Duration (us)"},
+                             {"type": "number", "name": "Median Step Self Host Duration (us)"},
+                             {"type": "number", "name": "Delta Self Host Duration (us)"},
+                             {"type": "number", "name": "Self Device Duration (us)"},
+                             {"type": "number", "name": "Median Step Self Device Duration (us)"},
+                             {"type": "number", "name": "Delta Self Device Duration (us)"}],
+                 "rows": []}
+        rows = []
+        for name in set(outlier_ops) | set(median_ops):
+            agg = outlier_ops.get(name)
+            median_agg = median_ops.get(name)
+            calls = agg.calls if agg is not None else 0
+            median_calls = median_agg.calls if median_agg is not None else 0
+            host = agg.self_host_duration if agg is not None else 0
+            median_host = median_agg.self_host_duration if median_agg is not None else 0
+            device = agg.self_device_duration if agg is not None else 0
+            median_device = median_agg.self_device_duration if median_agg is not None else 0
+            if calls == median_calls and host == median_host and device == median_device:
+                continue
+            rows.append([name, calls, median_calls, host, median_host, host - median_host,
+                         device, median_device, device - median_device])
+        rows.sort(key=lambda row: max(row[5], row[8]), reverse=True)
+        table["rows"] = rows[:consts.OUTLIER_OPS_TOP]
+        return table
+
+    def _generate_findings(self):
+        findings_table = {"columns": [{"type": "string", "name": "Rule"},
+                                      {"type": "string", "name": "Severity"},
+                                      {"type": "number", "name": "Estimated Saving per Step (us)"},
+                                      {"type": "string", "name": "Recommendation"}],
+                          "rows": []}
+        for finding in self.profile_data.findings:
+            saving = round(finding.estimated_saving) if finding.estimated_saving is not None else None
+            findings_table["rows"].append([finding.rule, finding.severity, saving, finding.message])
+
+        rules_table = {"columns": [{"type": "string", "name": "Rule"},
+                                   {"type": "number", "name": "Findings"},
+                                   {"type": "number", "name": "Duration (ms)"}],
+                       "rows": []}
+        for rule_name, duration in self.profile_data.rule_durations.items():
+            findings_count = len([f for f in self.profile_data.findings if f.rule == rule_name])
+            rules_table["rows"].append([rule_name, findings_count, round(duration * 1000, 3)])
+
+        data = {"findings": {"data": findings_table},
+                "rules": {"data": rules_table}}
+        return data
+
+    def _generate_phases(self, show_gpu):
+        columns = [{"type": "string", "name": "Step"}]
+        for phase in PHASES:
+            columns.append({"type": "number", "name": "{} Host (us)".format(phase)})
+        if show_gpu:
+            for phase in PHASES:
+                columns.append({"type": "number", "name": "{} Device (us)".format(phase)})
+        rows = []
+        for step_name, host_costs, device_costs in zip(self.profile_data.steps_names,
+                                                       self.profile_data.steps_phase_host_costs,
+                                                       self.profile_data.steps_phase_device_costs):
+            row = [step_name] + [host_costs[phase] for phase in PHASES]
+            if show_gpu:
+                row.extend(device_costs[phase] for phase in PHASES)
+            rows.append(row)
+        return {"columns": columns, "rows": rows}
+
+    def _generate_gpu_metrics_summary(self):
+        summary = []
+        for device in self.profile_data.gpu_devices:
+            stats = self.profile_data.gpu_device_stats[device]
+            summary.append({"title": "GPU {} Utilization".format(device),
+                            "value": "{} %".format(round(stats.utilization * 100, 2))})
+            summary.append({"title": "GPU {} Kernel Concurrency".format(device),
+                            "value": str(round(stats.concurrency, 2))})
+        summary.append({"title": "Kernel Time Using Tensor Cores",
+                        "value": "{} %".format(round(self.profile_data.tc_ratio * 100, 2))})
+        summary.append({"title": "Kernel Time Using Tensor Cores in Eligible Operators",
+                        "value": "{} %".format(round(self.profile_data.tc_eligible_ratio * 100, 2))})
+        return summary
+
+    def _generate_gpu_metrics(self):
+        devices = []
+        for device in self.profile_data.gpu_devices:
+            stats = self.profile_data.gpu_device_stats[device]
+
+            steps_table = {"columns": [{"type": "string", "name": "Step"},
+                                       {"type": "number", "name": "Utilization (%)"},
+                                       {"type": "number", "name": "Kernel Concurrency"},
+                                       {"type": "number", "name": "Busy Time (us)"},
+                                       {"type": "number", "name": "Idle Time (us)"}] +
+                                      # Idle gap histogram of the step, the count of gaps in each bin.
+                                      [{"type": "number", "name": "Idle Gaps " + bin_name}
+                                       for bin_name in IDLE_GAP_BIN_NAMES],
+                           "rows": []}
+            for step_name, step_device_stats in zip(self.profile_data.steps_names,
+                                                    self.profile_data.gpu_steps_device_stats):
+                step_stats = step_device_stats[device]
+                steps_table["rows"].append([step_name,
+                                            round(step_stats.utilization * 100, 2),
+                                            round(step_stats.concurrency, 2),
+                                            round(step_stats.busy_time),
+                                            round(step_stats.total_time - step_stats.busy_time)] +
+                                           step_stats.idle_gaps_histogram)
+
+            streams_table = {"columns": [{"type": "string", "name": "Stream"},
+                                         {"type": "number", "name": "Busy Time (us)"},
+                                         {"type": "number", "name": "Utilization (%)"}],
+                             "rows": []}
+            for stream, busy_time in sorted(stats.streams_busy_time.items(), key=lambda x: x[1], reverse=True):
+                utilization = busy_time / stats.total_time if stats.total_time > 0 else 0
+                streams_table["rows"].append([str(stream), round(busy_time), round(utilization * 100, 2)])
+
+            idle_gaps_table = {"columns": [{"type": "string", "name": "Idle Gap"},
+                                           {"type": "number", "name": "Count"},
+                                           {"type": "number", "name": "Total Time (us)"}],
+                               "rows": []}
+            for i, bin_name in enumerate(IDLE_GAP_BIN_NAMES):
+                idle_gaps_table["rows"].append([bin_name, stats.idle_gaps_histogram[i],
+                                                round(stats.idle_gaps_time[i])])
+
+            devices.append({"device": str(device),
+                            "utilization": round(stats.utilization * 100, 2),
+                            "concurrency": round(stats.concurrency, 2),
+                            "steps": steps_table,
+                            "streams": streams_table,
+                            "idle_gaps": idle_gaps_table})
+        data = {"devices": devices}
+        return data
+
+    def _generate_call_tree(self):
+        call_tree = []
+        for agg in self.profile_data.call_tree_nodes:
+            children = sorted(agg.children.values(), key=lambda x: x.host_duration, reverse=True)
+            call_tree.append({"id": agg.id,
+                              "name": agg.name,
+                              "calls": agg.calls,
+                              "host_duration": agg.host_duration,
+                              "self_host_duration": agg.self_host_duration,
+                              "device_duration": agg.device_duration,
+                              "self_device_duration": agg.self_device_duration,
+                              "children": [child.id for child in children]})
+        return call_tree
+
+    def _generate_flamegraph(self):
+        # Folded stacks format, one line for each call path: "frame1;frame2;frame3 self_time".
+        flamegraph = {"host": [], "device": []}
+        root = self.profile_data.call_tree_nodes[0]
+        node_stack = [(child, child.name.replace(";", ",")) for child in root.children.values()]
+        while len(node_stack) > 0:
+            agg, stack = node_stack.pop()
+            if agg.self_host_duration > 0:
+                flamegraph["host"].append("{} {}".format(stack, round(agg.self_host_duration)))
+            if agg.self_device_duration > 0:
+                flamegraph["device"].append("{} {}".format(stack, round(agg.self_device_duration)))
+            for child in agg.children.values():
+                node_stack.append((child, stack + ";" + child.name.replace(";", ",")))
+        return {metric: "\n".join(lines) for metric, lines in flamegraph.items()}
+
+    def _generate_sync(self):
+        points_table = {"columns": [{"type": "string", "name": "Name"},
+                                    {"type": "string", "name": "Call Stack"},
+                                    {"type": "number", "name": "Calls"},
+                                    {"type": "number", "name": "Total Duration (us)"},
+                                    {"type": "number", "name": "Mean Duration (us)"},
+                                    {"type": "number", "name": "Max Duration (us)"}],
+                        "rows": []}
+        for agg in self.profile_data.sync_points:
+            points_table["rows"].append([agg.name, " > ".join(agg.stack), agg.calls, agg.total_duration,
+                                         round(agg.avg_duration, 2), agg.max_duration])
+
+        steps_table = {"columns": [{"type": "string", "name": "Step"},
+                                   {"type": "number", "name": "Blocked Time (us)"},
+                                   {"type": "number", "name": "Exposed Blocked Time (us)"}],
+                       "rows": []}
+        for step_name, duration, costs in zip(self.profile_data.steps_names, self.profile_data.steps_sync_duration,
+                                              self.profile_data.steps_costs):
+            steps_table["rows"].append([step_name, duration, costs.sync_cost])
+
+        data = {"sync_points": {"data": points_table},
+                "steps": {"data": steps_table}}
+        return data
+
+    def _generate_dataloader(self):
+        steps_table = {"columns": [{"type": "string", "name": "Step"},
+                                   {"type": "number", "name": "Wait Time (us)"},
+                                   {"type": "number", "name": "Wait Time with GPU Idle (us)"},
+                                   {"type": "number", "name": "GPU Idle Time (us)"},
+                                   {"type": "number", "name": "H2D Copies"},
+                                   {"type": "number", "name": "Pageable Copies"},
+                                   {"type": "number", "name": "Blocking Copies"},
+                                   {"type": "number", "name": "H2D Copy Duration (us)"},
+                                   {"type": "number", "name": "Host Blocked Time (us)"}],
+                       "rows": []}
+        for step_name, stats in zip(self.profile_data.steps_names, self.profile_data.dataloader_steps_stats):
+            steps_table["rows"].append([step_name, stats.wait_duration, stats.exposed_wait_duration,
+                                        stats.gpu_idle_duration, stats.h2d_copies, stats.pageable_copies,
+                                        stats.blocking_copies, stats.h2d_duration, stats.blocking_duration])
+
+        correlation = self.profile_data.dataloader_idle_correlation
+        summary = {"mean_wait": round(self.profile_data.dataloader_mean_wait, 2),
+                   "median_wait": round(self.profile_data.dataloader_median_wait, 2),
+                   "std_wait": round(self.profile_data.dataloader_std_wait, 2),
+                   "idle_correlation": round(correlation, 4) if correlation is not None else None}
+
+        data = {"steps": {"data": steps_table},
+                "summary": summary}
+        return data
+
+    def _generate_optimizer(self):
+        optimizers_table = {"columns": [{"type": "string", "name": "Name"},
+                                        {"type": "number", "name": "Calls"},
+                                        {"type": "number", "name": "Host Duration (us)"},
+                                        {"type": "number", "name": "Device Duration (us)"},
+                                        {"type": "number", "name": "Launches"},
+                                        {"type": "number", "name": "Kernels"},
+                                        {"type": "string", "name": "Foreach/Fused"}],
+                            "rows": []}
+        for agg in self.profile_data.optimizers:
+            optimizers_table["rows"].append([agg.name, agg.calls, agg.host_duration, agg.device_duration,
+                                             agg.launches, agg.kernels, "Yes" if agg.is_foreach else "No"])
+
+        steps_table = {"columns": [{"type": "string", "name": "Step"},
+                                   {"type": "number", "name": "Host Duration (us)"},
+                                   {"type": "number", "name": "Device Duration (us)"},
+                                   {"type": "number", "name": "Launches"},
+                                   {"type": "number", "name": "Kernels"},
+                                   {"type": "number", "name": "Parameters"},
+                                   {"type": "number", "name": "Kernels per Parameter"}],
+                       "rows": []}
+        for step_name, stats in zip(self.profile_data.steps_names, self.profile_data.optimizer_steps_stats):
+            kernels_per_parameter = stats.kernels_per_parameter
+            steps_table["rows"].append([step_name, stats.host_duration, stats.device_duration, stats.launches,
+                                        stats.kernels, stats.parameters,
+                                        round(kernels_per_parameter, 2) if kernels_per_parameter is not None else None])
+
+        data = {"optimizers": {"data": optimizers_table},
+                "steps": {"data": steps_table}}
+        return data
+
+    def _generate_critical_path(self):
+        kinds = [VERTEX_CPU, VERTEX_RUNTIME, VERTEX_KERNEL, VERTEX_MEMCPY, VERTEX_MEMSET]
+        critical_paths = self.profile_data.critical_paths
+        steps_count = len(critical_paths)
+
+        steps_table = {"columns": [{"type": "string", "name": "Step"},
+                                   {"type": "number", "name": "Critical Path (us)"}],
+                       "rows": []}
+        for kind in kinds:
+            steps_table["columns"].append({"type": "number", "name": "{} (us)".format(kind)})
+        for step_name, critical_path in zip(self.profile_data.steps_names, critical_paths):
+            row = [step_name, round(critical_path.length)]
+            row.extend(round(critical_path.kind_costs.get(kind, 0)) for kind in kinds)
+            steps_table["rows"].append(row)
+
+        # Average time of each operator on the critical path per step.
+        op_costs = {}
+        for critical_path in critical_paths:
+            for op_name, kind_costs in critical_path.op_costs.items():
+                costs = op_costs.setdefault(op_name, {})
+                for kind, cost in kind_costs.items():
+                    costs[kind] = costs.get(kind, 0) + cost
+        op_table = {"columns": [{"type": "string", "name": "Operator"},
+                                {"type": "number", "name": "Total (us)"}],
+                    "rows": []}
+        for kind in kinds:
+            op_table["columns"].append({"type": "number", "name": "{} (us)".format(kind)})
+        for op_name, costs in sorted(op_costs.items(), key=lambda x: sum(x[1].values()), reverse=True):
+            row = [op_name, round(sum(costs.values()) / steps_count, 2)]
+            row.extend(round(costs.get(kind, 0) / steps_count, 2) for kind in kinds)
+            op_table["rows"].append(row)
+
+        # Average saved step time if the operator gets faster.
+        saved_times = {}
+        for critical_path in critical_paths:
+            for op_name, speedup, saved_time in critical_path.what_if:
+                saved_times[(op_name, speedup)] = saved_times.get((op_name, speedup), 0) + saved_time
+        avg_step_time = self.profile_data.avg_costs.step_total_cost
+        what_if_table = {"columns": [{"type": "string", "name": "Operator"},
+                                     {"type": "number", "name": "Speedup"},
+                                     {"type": "number", "name": "Saved Step Time (us)"},
+                                     {"type": "number", "name": "Saved Step Time (%)"}],
+                         "rows": []}
+        for (op_name, speedup), saved_time in sorted(saved_times.items(), key=lambda x: x[1], reverse=True):
+            saved_time /= steps_count
+            what_if_table["rows"].append([op_name, speedup, round(saved_time, 2),
+                                          round(saved_time / avg_step_time * 100, 2) if avg_step_time > 0 else 0])
+
+        data = {"steps": {"data": steps_table},
+                "operators": {"data": op_table},
+                "what_if": {"data": what_if_table}}
+        return data
+
+    def _generate_launch(self):
+        latency_columns = [{"type": "number", "name": "Launches"},
+                           {"type": "number", "name": "Mean Latency (us)"},
+                           {"type": "number", "name": "P50 Latency (us)"},
+                           {"type": "number", "name": "P90 Latency (us)"},
+                           {"type": "number", "name": "Max Latency (us)"}]
+
+        def latency_row(stats):
+            return [stats.count, round(stats.mean, 2), round(stats.p50, 2), round(stats.p90, 2), stats.max]
+
+        op_table = {"columns": [{"type": "string", "name": "Operator"}] + latency_columns, "rows": []}
+        for stats in self.profile_data.launch_op_latency_stats:
+            op_table["rows"].append([stats.name] + latency_row(stats))
+
+        steps_table = {"columns": [{"type": "string", "name": "Step"}] + latency_columns, "rows": []}
+        for step_name, stats in zip(self.profile_data.steps_names, self.profile_data.launch_steps_latency_stats):
+            steps_table["rows"].append([step_name] + latency_row(stats))
+
+        idle_table = {"columns": [{"type": "string", "name": "Step"}], "rows": []}
+        for cause in IDLE_CAUSES:
+            idle_table["columns"].append({"type": "number", "name": "{} (us)".format(cause)})
+        for step_name, idle_costs in zip(self.profile_data.steps_names, self.profile_data.launch_steps_idle_costs):
+            idle_table["rows"].append([step_name] + [round(idle_costs[cause]) for cause in IDLE_CAUSES])
+
+        total_idle = sum(self.profile_data.launch_idle_costs.values())
+        idle_summary = []
+        for cause in IDLE_CAUSES:
+            cost = self.profile_data.launch_idle_costs[cause]
+            idle_summary.append({"cause": cause,
+                                 "time": round(cost),
+                                 "percentage": round(cost / total_idle * 100, 2) if total_idle > 0 else 0})
+
+        data = {"op_latency": {"data": op_table},
+                "steps_latency": {"data": steps_table},
+                "steps_idle": {"data": idle_table},
+                "idle_summary": idle_summary}
+        return data
+
+    def _generate_memory_curves(self):
+        # Time is relative to the first memory event of all devices.
+        start_ts = min(curve[0][0] for curve in self.profile_data.memory_curves.values())
+        curves = {}
+        peaks = {}
+        for device in self.profile_data.memory_devices:
+            curve = self.profile_data.memory_curves[device]
+            curves[device] = [[round((ts - start_ts) / 1000, 3), round(allocated / 1024 / 1024, 3)]
+                              for ts, allocated in curve]
+            peak_ts, peak_allocated = self.profile_data.memory_peaks[device]
+            peaks[device] = {"time": round((peak_ts - start_ts) / 1000, 3),
+                             "allocated": round(peak_allocated / 1024 / 1024, 3)}
+        return curves, peaks
+
+    def _generate_memory_op_table(self):
+        tables = {}
+        for device in self.profile_data.memory_devices:
+            table = {}
+            table["columns"] = [{"type": "string", "name": "Name"}]
+            col_names = ["Allocations", "Frees", "Allocated (KB)", "Freed (KB)", "Increase (KB)",
+                         "Alive At Peak (KB)"]
+            for column in col_names:
+                table["columns"].append({"type": "number", "name": column})
+            table["rows"] = []
+            for stats in self.profile_data.memory_op_stats[device]:
+                table["rows"].append([stats.name, stats.allocation_count, stats.free_count,
+                                      round(stats.allocated_bytes / 1024, 2), round(stats.freed_bytes / 1024, 2),
+                                      round(stats.increase_bytes / 1024, 2), round(stats.peak_bytes / 1024, 2)])
+            tables[device] = {"data": table}
+        return tables
+
+    def _get_op_list(self, group_by=None):
+        if group_by == "input_shape":
+            return self.profile_data.op_list_groupby_name_input
+        elif group_by == "module":
+            return self.profile_data.op_list_groupby_name_module
+        elif group_by == "phase":
+            return self.profile_data.op_list_groupby_name_phase
+        else:
+            return self.profile_data.op_list_groupby_name
+
+    @staticmethod
+    def _generate_steps_tables(agg_list, generate_table):
+        """Split the aggregates by step, return dict of step -> table generated by generate_table(aggregates)."""
+        step_to_aggs = {}
+        for agg in agg_list:
+            step_to_aggs.setdefault(agg.step, []).append(agg)
+        return {step: generate_table(aggs) for step, aggs in step_to_aggs.items()}
+
+    def _generate_op_pie(self, group_by=None):
+        """group_by: None, or the extra grouping attribute of operators besides name in GROUP_BY_COLUMN_NAMES."""
         op_device_total_time = []
         op_device_self_time = []
         op_host_total_time = []
         op_host_self_time = []
 
-        if group_by_input_shape:
-            op_list = self.profile_data.op_list_groupby_name_input
-        else:
-            op_list = self.profile_data.op_list_groupby_name
+        op_list = self._get_op_list(group_by)
 
         for op_agg in op_list:
+            if group_by in ["module", "phase"]:
+                name = "{} ({})".format(op_agg.name, getattr(op_agg, group_by))
+            else:
+                name = op_agg.name
             # Whether device_duration & self_device_duration are accurate or not depends on the input tracing data.
             if op_agg.device_duration > 0:
-                op_device_total_time.append([op_agg.name, op_agg.device_duration])
+                op_device_total_time.append([name, op_agg.device_duration])
             if op_agg.self_device_duration > 0:
-                op_device_self_time.append([op_agg.name, op_agg.self_device_duration])
+                op_device_self_time.append([name, op_agg.self_device_duration])
             if op_agg.host_duration > 0:
-                op_host_total_time.append([op_agg.name, op_agg.host_duration])
+                op_host_total_time.append([name, op_agg.host_duration])
             if op_agg.self_host_duration > 0:
-                op_host_self_time.append([op_agg.name, op_agg.self_host_duration])
+                op_host_self_time.append([name, op_agg.self_host_duration])
 
         op_device_total_time.sort(key=lambda x: x[1], reverse=True)
         op_device_self_time.sort(key=lambda x: x[1], reverse=True)
@@ -198,12 +745,13 @@ class RunGenerator(object):
 
         return data
 
-    def _generate_op_table(self, group_by_input_shape=False):
+    def _generate_op_table(self, group_by=None, op_list=None):
+        """op_list: the operators aggregated by name and group_by, default to all operators of the profile."""
         show_gpu = self.profile_data.has_kernel or self.profile_data.has_memcpy_or_memset
 
         columns = [{"type": "string", "name": "Name"}]
-        if group_by_input_shape:
-            columns.append({"type": "string", "name": "Input Shape"})
+        if group_by is not None:
+            columns.append({"type": "string", "name": GROUP_BY_COLUMN_NAMES[group_by]})
 
         columns.append({"type": "number", "name": "Calls"})
         if show_gpu:
@@ -212,12 +760,12 @@ class RunGenerator(object):
 
         columns.extend([{"type": "number", "name": "Host Self Duration (us)"},
                         {"type": "number", "name": "Host Total Duration (us)"}])
+        if show_gpu:
+            columns.extend([{"type": "string", "name": "Tensor Cores Eligible"},
+                            {"type": "number", "name": "Tensor Cores Self (%)"}])
 
-        if group_by_input_shape:
-            op_list = self.profile_data.op_list_groupby_name_input
-        else:
-            op_list = self.profile_data.op_list_groupby_name
-
+        if op_list is None:
+            op_list = self._get_op_list(group_by)
         op_list = sorted(op_list,
                          key=lambda x: x.self_device_duration if show_gpu else x.self_host_duration,
                          reverse=True)
@@ -226,28 +774,32 @@ class RunGenerator(object):
         for op in op_list:
             # Whether device_duration & self_device_duration are accurate or not depends on the input tracing data.
             row = [op.name]
-            if group_by_input_shape:
-                row.append(op.input_shape)
+            if group_by is not None:
+                row.append(getattr(op, group_by))
 
             row.append(op.calls)
             if show_gpu:
                 row.extend([round(op.self_device_duration), round(op.device_duration)])
 
             row.extend([round(op.self_host_duration), round(op.host_duration)])
+            if show_gpu:
+                row.extend(["Yes" if op.tc_eligible else "No", round(op.tc_self_ratio * 100, 2)])
             rows.append(row)
 
         data = {"data": {"columns": columns, "rows": rows}}
         return data
 
-    def _generate_kernel_op_table(self):
+    def _generate_kernel_op_table(self, kernel_list=None):
+        """kernel_list: the kernels aggregated by name and operator, default to all kernels of the profile."""
+        if kernel_list is None:
+            kernel_list = self.profile_data.kernel_list_groupby_name_op
         table = {}
         table["columns"] = [{"type": "string", "name": "Name"}, {"type": "string", "name": "Operator"}]
         col_names = ["Calls", "Total Duration (us)", "Mean Duration (us)", "Max Duration (us)", "Min Duration (us)"]
         for column in col_names:
             table["columns"].append({"type": "number", "name": column})
         table["rows"] = []
-        kernel_list = sorted(self.profile_data.kernel_list_groupby_name_op, key=lambda x: x.total_duration,
-                             reverse=True)
+        kernel_list = sorted(kernel_list, key=lambda x: x.total_duration, reverse=True)
         for agg_by_name_op in kernel_list:
             kernel_op_row = [agg_by_name_op.name, agg_by_name_op.op_name, agg_by_name_op.calls,
                              agg_by_name_op.total_duration, agg_by_name_op.avg_duration,
@@ -256,10 +808,30 @@ class RunGenerator(object):
         data = {"data": table}
         return data
 
+    def _generate_kernel_group_table(self, group_by):
+        """group_by: the extra grouping attribute of kernels besides name, "module" or "phase"."""
+        table = {}
+        table["columns"] = [{"type": "string", "name": "Name"},
+                            {"type": "string", "name": GROUP_BY_COLUMN_NAMES[group_by]}]
+        col_names = ["Calls", "Total Duration (us)", "Mean Duration (us)", "Max Duration (us)", "Min Duration (us)"]
+        for column in col_names:
+            table["columns"].append({"type": "number", "name": column})
+        table["rows"] = []
+        if group_by == "module":
+            kernel_list = self.profile_data.kernel_list_groupby_name_module
+        else:
+            kernel_list = self.profile_data.kernel_list_groupby_name_phase
+        kernel_list = sorted(kernel_list, key=lambda x: x.total_duration, reverse=True)
+        for agg in kernel_list:
+            table["rows"].append([agg.name, getattr(agg, group_by), agg.calls, agg.total_duration,
+                                  round(agg.avg_duration, 2), agg.max_duration, agg.min_duration])
+        data = {"data": table}
+        return data
+
     def _generate_kernel_pie(self):
         pie = {"columns": [{"type": "string", "name": "name"}, {"type": "number", "name": "value"}], "rows": []}
-        for _id, (name, row) in enumerate(self.profile_data.kernel_stat.iterrows()):
-            pie["rows"].append([name, row["sum"]])
+        for name, total_duration in self.profile_data.kernel_stat["sum"].items():
+            pie["rows"].append([name, float(total_duration)])
         data = {"total": pie}
         return data
 
@@ -270,11 +842,136 @@ class RunGenerator(object):
         col_names = ["Calls", "Total Duration (us)", "Mean Duration (us)", "Max Duration (us)", "Min Duration (us)"]
         for column in col_names:
             table["columns"].append({"type": "number", "name": column})
+        launch_columns = [c for c in KERNEL_LAUNCH_COLUMN_NAMES if c[0] in self.profile_data.kernel_stat.columns]
+        for _, col_name, col_type in launch_columns:
+            table["columns"].append({"type": col_type, "name": col_name})
         table["rows"] = []
         for _id, (name, row) in enumerate(self.profile_data.kernel_stat.iterrows()):
             kernel_row = [name]
             for column in columns:
                 kernel_row.append(round(row[column]))
+            for column, _, col_type in launch_columns:
+                value = row[column]
+                if pd.isna(value):
+                    kernel_row.append(None)
+                elif col_type == "number":
+                    kernel_row.append(round(value, 2))
+                else:
+                    kernel_row.append(value)
             table["rows"].append(kernel_row)
         data = {"data": table}
         return data
+
+    def _generate_kernel_family_table(self):
+        table = {"columns": [{"type": "string", "name": "Family"},
+                             {"type": "number", "name": "Variants"}],
+                 "rows": []}
+        columns = ["count", "sum", "mean", "max", "min"]
+        col_names = ["Calls", "Total Duration (us)", "Mean Duration (us)", "Max Duration (us)", "Min Duration (us)"]
+        for column in col_names:
+            table["columns"].append({"type": "number", "name": column})
+        for family, row in self.profile_data.kernel_family_stat.iterrows():
+            table["rows"].append([family, int(row["variants"])] + [round(row[column]) for column in columns])
+        data = {"data": table}
+        return data
+
+
+def generate_step_skew_table(step_skews):
+    table = {}
+    table["columns"] = [{"type": "string", "name": "Step"}]
+    col_names = ["Max Step Time (us)", "Median Step Time (us)", "Skew (us)", "Skew (%)"]
+    for column in col_names:
+        table["columns"].append({"type": "number", "name": column})
+    table["columns"].extend([{"type": "string", "name": "Slowest Worker"},
+                             {"type": "string", "name": "Dominant Category"},
+                             {"type": "number", "name": "Dominant Category Extra Time (us)"}])
+    table["rows"] = []
+    for step_skew in step_skews:
+        row = [step_skew.step_name, round(step_skew.max_cost), round(step_skew.median_cost),
+               round(step_skew.skew), round(step_skew.skew_ratio * 100, 2), step_skew.slowest_worker,
+               step_skew.dominant_category if step_skew.dominant_category is not None else "N/A",
+               round(step_skew.dominant_category_cost)]
+        table["rows"].append(row)
+    data = {"data": table}
+    return data
+
+
+def generate_run_diff(base_profile, exp_profile, top=20):
+    """Compare two RunProfiles, return the top operators and kernels regressing the step time of exp_profile."""
+    run_diff = RunDiff()
+    run_diff.compare(base_profile, exp_profile)
+
+    def delta_columns(fields):
+        columns = []
+        for field in fields:
+            display_name = "Calls" if field == "calls" else field.replace("_", " ").title() + " (us)"
+            columns.extend([{"type": "number", "name": "Base " + display_name},
+                            {"type": "number", "name": "Exp " + display_name},
+                            {"type": "number", "name": "Delta " + display_name}])
+        columns.append({"type": "number", "name": "Step Time Contribution (us)"})
+        return columns
+
+    def delta_row(diff, fields):
+        row = []
+        for field in fields:
+            row.extend([diff.base[field], diff.exp[field], diff.delta[field]])
+        row.append(round(diff.step_contribution, 2))
+        return row
+
+    op_fields = ["calls", "host_duration", "self_host_duration", "device_duration", "self_device_duration"]
+    op_table = {"columns": [{"type": "string", "name": "Name"},
+                            {"type": "string", "name": "Input Shape"}] + delta_columns(op_fields),
+                "rows": []}
+    for diff in [d for d in run_diff.op_diffs if d.step_contribution > 0][:top]:
+        op_table["rows"].append(list(diff.key) + delta_row(diff, op_fields))
+
+    kernel_fields = ["calls", "total_duration"]
+    kernel_table = {"columns": [{"type": "string", "name": "Name"},
+                                {"type": "string", "name": "Operator"}] + delta_columns(kernel_fields),
+                    "rows": []}
+    for diff in [d for d in run_diff.kernel_diffs if d.step_contribution > 0][:top]:
+        kernel_table["rows"].append(list(diff.key) + delta_row(diff, kernel_fields))
+
+    data = {"summary": {"base_step_time": round(run_diff.base_step_time),
+                        "exp_step_time": round(run_diff.exp_step_time),
+                        "delta_step_time": round(run_diff.exp_step_time - run_diff.base_step_time)},
+            "operators": {"data": op_table},
+            "kernels": {"data": kernel_table}}
+    return data
+
+
+def generate_trend(summaries, top=10, order_by="name"):
+    """Return the average step costs and the top operators' self durations per step of the RunSummaries,
+    one row for each run. order_by is "name" to keep the order of summaries, or "time" to sort by the trace time.
+    The device durations are used for the operators if any run has them, otherwise the host durations."""
+    summaries = [s for s in summaries if s.workers_count > 0]
+    if order_by == "time":
+        summaries = sorted(summaries, key=lambda s: s.time)
+
+    fields = [(field, name) for field, name in TREND_COST_FIELDS
+              if field == "step_total_cost" or any(s.avg_costs.get(field, 0) > 0 for s in summaries)]
+    steps_table = {"columns": [{"type": "string", "name": "Run"},
+                               {"type": "string", "name": "Time"}] +
+                              [{"type": "number", "name": name + " (us)"} for _, name in fields],
+                   "rows": []}
+    for summary in summaries:
+        steps_table["rows"].append([summary.name, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(summary.time))] +
+                                   [summary.avg_costs.get(field, 0) for field, _ in fields])
+
+    use_device = any(durations[1] > 0 for s in summaries for durations in s.ops.values())
+    index = 1 if use_device else 0
+    op_totals = {}
+    for summary in summaries:
+        for name, durations in summary.ops.items():
+            op_totals[name] = op_totals.get(name, 0) + durations[index]
+    op_names = sorted(op_totals, key=lambda name: op_totals[name], reverse=True)[:top]
+    ops_table = {"columns": [{"type": "string", "name": "Run"}] +
+                            [{"type": "number", "name": name} for name in op_names],
+                 "rows": []}
+    for summary in summaries:
+        ops_table["rows"].append([summary.name] +
+                                 [summary.ops[name][index] if name in summary.ops else 0 for name in op_names])
+
+    metric = "Self Device Duration Per Step (us)" if use_device else "Self Host Duration Per Step (us)"
+    return {"steps": {"data": steps_table},
+            "operators": {"metric": metric, "data": ops_table}}
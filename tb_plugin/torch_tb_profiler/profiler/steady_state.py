@@ -0,0 +1,97 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import json
+import os
+
+from .. import consts, utils
+
+logger = utils.get_logger()
+
+# Warm-up is only detected with at least this many steps, and at most the first half of the steps are dropped.
+STEADY_STATE_MIN_STEPS = 4
+# A step converges if its time is at most this ratio above the median of the second half steps.
+STEP_TIME_TOLERANCE = 0.2
+# A step is stable if its count of device activities is within this ratio of the median of the second half steps.
+DEVICE_COUNT_TOLERANCE = 0.1
+# The last step is truncated if it has less device activities than this ratio of its previous step.
+TAIL_DEVICE_COUNT_RATIO = 0.8
+
+
+class StepsConfig:
+    """How many warm-up and tail steps to drop from the analysis. None means detecting it automatically."""
+
+    def __init__(self, warmup_steps=None, tail_steps=None):
+        self.warmup_steps = warmup_steps
+        self.tail_steps = tail_steps
+
+    @property
+    def key(self):
+        return self.warmup_steps, self.tail_steps
+
+    def update(self, overrides):
+        """Return a copy with the fields overridden, overrides is dict of field -> steps or None for detection."""
+        return StepsConfig(overrides.get("warmup_steps", self.warmup_steps),
+                           overrides.get("tail_steps", self.tail_steps))
+
+    @staticmethod
+    def parse_steps(value):
+        """Parse the number of steps, "auto" or empty means None. Raise ValueError if invalid."""
+        if value is None or value == "" or value == "auto":
+            return None
+        steps = int(value)
+        if steps < 0:
+            raise ValueError("The number of steps must not be negative: {}".format(value))
+        return steps
+
+    @staticmethod
+    def load(run_dir):
+        """Load the sidecar config file of the run, return the default config if there is no such file.
+        The file is like {"warmup_steps": 2, "tail_steps": "auto"}."""
+        path = os.path.join(run_dir, consts.STEPS_CONFIG_FILE_NAME)
+        if not os.path.isfile(path):
+            return StepsConfig()
+        try:
+            with open(path, "r") as f:
+                obj = json.load(f)
+            return StepsConfig(StepsConfig.parse_steps(obj.get("warmup_steps")),
+                               StepsConfig.parse_steps(obj.get("tail_steps")))
+        except Exception as ex:
+            logger.warning("Failed to load the steps config %s, use automatic detection. Exception=%s", path, ex)
+            return StepsConfig()
+
+
+def detect_tail_steps(steps_device_counts):
+    """Return the count of the tail steps to drop, because the profiler may fail to capture all the device
+    activities launched by them: the steps without any device activity at the end, and the last one with much
+    less device activities than its previous step."""
+    i_step = len(steps_device_counts) - 1
+    while i_step >= 0 and steps_device_counts[i_step] == 0:
+        i_step -= 1
+    if i_step < 0:
+        return 0
+    keep_steps = i_step + 1
+    if i_step > 0 and steps_device_counts[i_step - 1] * TAIL_DEVICE_COUNT_RATIO > steps_device_counts[i_step]:
+        keep_steps = i_step
+    return len(steps_device_counts) - keep_steps
+
+
+def detect_warmup_steps(steps_time, steps_device_counts):
+    """Return the count of the leading warm-up steps, such as the ones running cudnn autotuning or growing
+    the allocator's cache. The second half of the steps is taken as the steady state, and warm-up ends at the
+    first step whose time converges to the steady state and whose count of device activities is stable."""
+    steps_count = len(steps_time)
+    if steps_count < STEADY_STATE_MIN_STEPS:
+        return 0
+    half = steps_count // 2
+    ref_time = utils.percentile(sorted(steps_time[half:]), 50)
+    ref_count = utils.percentile(sorted(steps_device_counts[half:]), 50)
+    warmup_steps = 0
+    for i in range(half):
+        is_converged = steps_time[i] <= ref_time * (1 + STEP_TIME_TOLERANCE)
+        is_stable = abs(steps_device_counts[i] - ref_count) <= ref_count * DEVICE_COUNT_TOLERANCE
+        if is_converged and is_stable:
+            break
+        warmup_steps = i + 1
+    return warmup_steps
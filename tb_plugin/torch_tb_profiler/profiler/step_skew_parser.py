@@ -0,0 +1,81 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import statistics
+
+from .overall_parser import COST_CATEGORIES
+from .. import utils
+
+logger = utils.get_logger()
+
+
+class StepSkew:
+    def __init__(self):
+        self.step_name = None
+        self.worker_costs = {}  # worker -> OverallParser.Costs of this step.
+        self.max_cost = 0
+        self.median_cost = 0
+        self.skew = 0  # max_cost - median_cost
+        self.skew_ratio = 0  # skew / median_cost
+        self.slowest_worker = None
+        self.dominant_category = None  # Display name of the category which slows down the slowest worker most.
+        self.dominant_category_cost = 0  # Extra time of dominant category over the median of all workers.
+
+    def calculate(self):
+        step_costs = [costs.step_total_cost for costs in self.worker_costs.values()]
+        self.max_cost = max(step_costs)
+        self.median_cost = statistics.median(step_costs)
+        self.skew = self.max_cost - self.median_cost
+        self.skew_ratio = self.skew / self.median_cost if self.median_cost > 0 else 0
+        for worker, costs in self.worker_costs.items():
+            if costs.step_total_cost == self.max_cost:
+                self.slowest_worker = worker
+                break
+
+        slowest_costs = self.worker_costs[self.slowest_worker]
+        self.dominant_category = None
+        self.dominant_category_cost = 0
+        for attr, category in COST_CATEGORIES:
+            median = statistics.median([getattr(costs, attr) for costs in self.worker_costs.values()])
+            extra_cost = getattr(slowest_costs, attr) - median
+            if extra_cost > self.dominant_category_cost:
+                self.dominant_category = category
+                self.dominant_category_cost = extra_cost
+
+
+class StepSkewParser:
+    """Align "ProfilerStep#N" across all workers of a run, and find the straggler of each step.
+    """
+
+    def __init__(self):
+        self.step_skews = []  # List of StepSkew, in the order of steps.
+
+    def parse_profiles(self, profiles):
+        """profiles: dict of worker -> RunProfileData which has been processed."""
+        self.step_skews = []
+        if len(profiles) < 2:
+            return
+
+        step_to_worker_costs = {}
+        steps_names = []
+        for worker, profile in profiles.items():
+            if profile.steps_costs is None:
+                continue
+            for step_name, costs in zip(profile.steps_names, profile.steps_costs):
+                if step_name not in step_to_worker_costs:
+                    step_to_worker_costs[step_name] = {}
+                    steps_names.append(step_name)
+                step_to_worker_costs[step_name][worker] = costs
+
+        for step_name in steps_names:
+            worker_costs = step_to_worker_costs[step_name]
+            # Only steps captured by more than one worker can be compared.
+            if len(worker_costs) < 2:
+                logger.debug("Step {} is only found on one worker, skip it in skew analysis.".format(step_name))
+                continue
+            step_skew = StepSkew()
+            step_skew.step_name = step_name
+            step_skew.worker_costs = worker_costs
+            step_skew.calculate()
+            self.step_skews.append(step_skew)
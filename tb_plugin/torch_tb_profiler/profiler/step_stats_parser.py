@@ -0,0 +1,87 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+from .overall_parser import OverallParser
+from .. import utils
+
+logger = utils.get_logger()
+
+# Steps whose modified z-score of the step time exceeds it are outliers, as suggested by Iglewicz and Hoaglin.
+OUTLIER_Z_SCORE_THRESHOLD = 3.5
+# Outliers are not detected with fewer steps, since the median is not robust then.
+OUTLIER_MIN_STEPS = 4
+
+
+class CostStats:
+    """Distribution of one cost category across steps, in us."""
+
+    def __init__(self, values):
+        values = sorted(values)
+        self.mean = sum(values) / len(values) if len(values) > 0 else 0
+        self.std = (sum((v - self.mean) ** 2 for v in values) / len(values)) ** 0.5 if len(values) > 0 else 0
+        self.min = values[0] if len(values) > 0 else 0
+        self.max = values[-1] if len(values) > 0 else 0
+        self.p50 = utils.percentile(values, 50)
+        self.p90 = utils.percentile(values, 90)
+        self.p99 = utils.percentile(values, 99)
+
+
+def get_modified_z_scores(values):
+    """Return the modified z-score of each value based on the median absolute deviation (MAD),
+    which is robust to the outliers themselves. If more than half of the values are equal and MAD is 0,
+    the mean absolute deviation is used instead. Return all zeros if the values are constant."""
+    sorted_values = sorted(values)
+    median = utils.percentile(sorted_values, 50)
+    deviations = [abs(v - median) for v in values]
+    mad = utils.percentile(sorted(deviations), 50)
+    if mad > 0:
+        scale = 1.4826 * mad
+    else:
+        scale = 1.253314 * sum(deviations) / len(deviations) if len(deviations) > 0 else 0
+    if scale <= 0:
+        return [0] * len(values)
+    return [(v - median) / scale for v in values]
+
+
+class StepStatsParser:
+    """Compute the percentiles of each cost category across steps, detect the outlier steps by their step time,
+    and aggregate the operators of the outlier steps and the median step to tell what is different in the outliers.
+    """
+
+    def __init__(self):
+        self.costs_stats = {}  # Field of OverallParser.Costs -> CostStats.
+        self.z_scores = []  # Modified z-score of each step's step time.
+        self.outlier_steps = []  # Indices of the outlier steps.
+        self.median_step = None  # Index of the step whose step time is closest to the median.
+        self.avg_costs_without_outliers = None  # OverallParser.Costs averaged over the steps except outliers.
+        self.steps_ops = {}  # Index of outlier or median step -> name -> OperatorAgg.
+
+    def parse(self, steps_costs, steps_names, op_list_groupby_name_step):
+        """steps_costs: list of OverallParser.Costs. steps_names: name of each step.
+        op_list_groupby_name_step: OperatorAggs grouped by name and step, built by ModuleParser."""
+        if len(steps_costs) == 0:
+            return
+        for field in vars(steps_costs[0]):
+            self.costs_stats[field] = CostStats([getattr(costs, field) for costs in steps_costs])
+
+        step_times = [costs.step_total_cost for costs in steps_costs]
+        if len(steps_costs) >= OUTLIER_MIN_STEPS:
+            self.z_scores = get_modified_z_scores(step_times)
+        else:
+            self.z_scores = [0] * len(steps_costs)
+        self.outlier_steps = [i for i, z in enumerate(self.z_scores) if abs(z) > OUTLIER_Z_SCORE_THRESHOLD]
+        median_time = self.costs_stats["step_total_cost"].p50
+        self.median_step = min(range(len(step_times)), key=lambda i: abs(step_times[i] - median_time))
+        outliers = set(self.outlier_steps)
+        self.avg_costs_without_outliers = OverallParser.Costs.average(
+            [costs for i, costs in enumerate(steps_costs) if i not in outliers])
+
+        if len(self.outlier_steps) > 0:
+            step_indices = outliers | {self.median_step}
+            name_to_index = {steps_names[i]: i for i in step_indices}
+            self.steps_ops = {i: {} for i in step_indices}
+            for agg in op_list_groupby_name_step:
+                i_step = name_to_index.get(agg.step)
+                if i_step is not None:
+                    self.steps_ops[i_step][agg.name] = agg
@@ -0,0 +1,67 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import bisect
+
+from .module_parser import ProfilerStepNode
+from .overall_parser import is_sync_runtime
+from .. import utils
+
+logger = utils.get_logger()
+
+
+class SyncPointAgg:
+    def __init__(self, name, stack):
+        self.name = name  # Name of the synchronization runtime, such as "cudaStreamSynchronize".
+        self.stack = stack  # Tuple of the operator names calling it, from outermost to innermost.
+        self.calls = 0
+        self.total_duration = 0
+        self.max_duration = 0
+
+    @property
+    def avg_duration(self):
+        return self.total_duration / self.calls if self.calls > 0 else 0
+
+
+class SyncParser:
+    """Find the synchronization runtime calls blocking the host, aggregate them by their calling stack,
+    and sum up the blocked time of each step.
+    """
+
+    def __init__(self):
+        self.sync_points = []  # List of SyncPointAgg, sorted by total duration.
+        self.steps_sync_duration = []  # Blocked time in synchronization calls, one for each step.
+
+    def parse(self, tid2tree, steps):
+        """steps: host side spans of the steps, list of (start_time, end_time)."""
+        steps_start_time = [step[0] for step in steps]
+        self.steps_sync_duration = [0] * len(steps)
+        key_to_agg = {}
+        for root in tid2tree.values():
+            # Depth-first traversal, keeping the operator names from root to current node.
+            node_stack = [(root, ())]
+            while len(node_stack) > 0:
+                node, path = node_stack.pop()
+                for rt in node.runtimes:
+                    if not is_sync_runtime(rt.name):
+                        continue
+                    dur = rt.end_time - rt.start_time
+                    key = (rt.name, path)
+                    if key not in key_to_agg:
+                        key_to_agg[key] = SyncPointAgg(rt.name, path)
+                    agg = key_to_agg[key]
+                    agg.calls += 1
+                    agg.total_duration += dur
+                    agg.max_duration = max(agg.max_duration, dur)
+
+                    i_step = bisect.bisect_right(steps_start_time, rt.start_time) - 1
+                    if i_step >= 0 and rt.start_time < steps[i_step][1]:
+                        self.steps_sync_duration[i_step] += dur
+                for child in reversed(node.children):
+                    if type(child) is ProfilerStepNode:
+                        node_stack.append((child, path))
+                    else:
+                        node_stack.append((child, path + (child.name,)))
+
+        self.sync_points = sorted(key_to_agg.values(), key=lambda x: x.total_duration, reverse=True)
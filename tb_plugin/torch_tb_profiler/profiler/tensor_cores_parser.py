@@ -0,0 +1,61 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import re
+
+from .. import utils
+
+logger = utils.get_logger()
+
+# Name fragments of kernels which use Tensor Cores, such as "volta_h884gemm_64x64_ldg8_nn",
+# "ampere_s16816gemm_fp16_128x128_ldg8_f2f_nn", "sm80_xmma_fprop_implicit_gemm_f16f16_f16f32_f32_nhwckrsc_nhwc"
+# and "cutlass::Kernel<cutlass_tensorop_h1688gemm_128x128_32x2_tn_align8>".
+TC_KERNEL_PATTERN = re.compile(r"884|1688|16816|8816|hmma|wmma|xmma|tensorop|_tc_|imma", re.IGNORECASE)
+
+# Operators whose computation can be mapped to Tensor Cores when running in fp16/bf16/tf32 with proper shapes.
+TC_ELIGIBLE_OP_PATTERN = re.compile(
+    r"^aten::(mm|bmm|addmm|addmv|addbmm|baddbmm|matmul|linear|_?convolution\w*|conv\d?d|conv_transpose\dd|"
+    r"cudnn_convolution\w*|miopen_convolution\w*|thnn_conv\w*|slow_conv\w*|_thnn_fused_lstm_cell\w*|"
+    r"_cudnn_rnn\w*|lstm|gru|rnn_tanh|rnn_relu)$")
+
+
+def is_tc_kernel(name):
+    return name is not None and TC_KERNEL_PATTERN.search(name) is not None
+
+
+def is_tc_eligible_op(name):
+    return name is not None and TC_ELIGIBLE_OP_PATTERN.match(name) is not None
+
+
+class TensorCoresParser:
+    """Calculate the Tensor Cores usage of the whole run from kernels."""
+
+    def __init__(self):
+        self.total_kernel_duration = 0
+        self.tc_kernel_duration = 0  # Kernels using Tensor Cores.
+        self.tc_eligible_kernel_duration = 0  # Kernels launched by operators eligible for Tensor Cores.
+        self.tc_eligible_tc_kernel_duration = 0  # Kernels launched by eligible operators and using Tensor Cores.
+
+    @property
+    def tc_ratio(self):
+        return self.tc_kernel_duration / self.total_kernel_duration if self.total_kernel_duration > 0 else 0
+
+    @property
+    def tc_eligible_ratio(self):
+        """Ratio of Tensor Cores kernels' time in the kernels launched by Tensor Cores eligible operators."""
+        if self.tc_eligible_kernel_duration == 0:
+            return 0
+        return self.tc_eligible_tc_kernel_duration / self.tc_eligible_kernel_duration
+
+    def parse_kernels(self, kernel_list):
+        """kernel_list: list of DeviceNode with type of Kernel."""
+        for kernel in kernel_list:
+            dur = kernel.end_time - kernel.start_time
+            self.total_kernel_duration += dur
+            if kernel.tc_used:
+                self.tc_kernel_duration += dur
+            if kernel.op_node is not None and kernel.op_node.tc_eligible:
+                self.tc_eligible_kernel_duration += dur
+                if kernel.tc_used:
+                    self.tc_eligible_tc_kernel_duration += dur
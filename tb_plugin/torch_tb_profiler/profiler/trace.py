@@ -22,6 +22,7 @@ class EventTypes(object):
     MEMCPY = "MemcpyEvent"
     MEMSET = "MemsetEvent"
     PYTHON = "PythonEvent"
+    MEMORY = "MemoryEvent"
 
 
 class TraceEvent(object):
@@ -81,8 +82,43 @@ class PythonEvent(TraceEvent):
         super(PythonEvent, self).__init__(EventTypes.PYTHON, data)
 
 
+class MemoryEvent(TraceEvent):
+    def __init__(self, data):
+        super(MemoryEvent, self).__init__(EventTypes.MEMORY, data)
+        args = self.args or {}
+        # Device Type: 0 is CPU, 1 is CUDA.
+        self.device_type = args.get("Device Type", 0)
+        self.device_id = args.get("Device Id", -1)
+        self.addr = args.get("Addr", None)
+        # Positive for allocation and negative for free.
+        self.bytes = args.get("Bytes", 0)
+        # Total allocated bytes on this device after this event. Not available in old versions.
+        self.total_allocated = args.get("Total Allocated", None)
+
+    @property
+    def device_name(self):
+        if self.device_type == 1:
+            return "GPU{}".format(self.device_id)
+        return "CPU"
+
+
+class InputShape(tuple):
+    """Input dims of an operator, such as [[2, 3], []]. It is hashable so that the operators could be grouped by it,
+    and prints like the list in the trace."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "[" + ", ".join(repr(dims) for dims in self) + "]"
+
+
 class EventParser(object):
+    """Parse the events of one trace. The names, categories and input shapes repeat in the thousands of events,
+    so they are interned to share one object for each distinct value. It saves memory, and the aggregation keyed
+    by them hashes and compares the shared objects cheaply."""
+
     def __init__(self):
+        self._strings = {}  # String -> the shared one.
+        self._shapes = {}  # InputShape -> the shared one.
         self._handlers = {
             "X": {
                 "Net": NetEvent,
@@ -92,6 +128,11 @@ class EventParser(object):
                 "Memcpy": MemcpyEvent,
                 "Memset": MemsetEvent,
                 "Python": PythonEvent,
+                "python_function": PythonEvent,
+            },
+            "i": {
+                "cpu_instant_event": self._parse_instant_event,
+                "CPU Instant Event": self._parse_instant_event,
             }
         }
 
@@ -108,17 +149,42 @@ class EventParser(object):
             handler = self._get_handler(type, category)
             if handler is None:
                 return None
-            return handler(event)
+            trace_event = handler(event)
+            if trace_event is not None:
+                self._intern_event(trace_event)
+            return trace_event
         except Exception as ex:
             logger.warning("Failed to parse profile event. Exception=%s. Event=%s", ex, event, exc_info=True)
             raise ex
 
+    def _intern_event(self, event):
+        event.name = self._intern_string(event.name)
+        event.category = self._intern_string(event.category)
+        if event.args is not None and "Input dims" in event.args:
+            event.args["Input dims"] = self._intern_shape(event.args["Input dims"])
+
+    def _intern_string(self, value):
+        if value is None:
+            return None
+        return self._strings.setdefault(value, value)
+
+    def _intern_shape(self, dims):
+        if not isinstance(dims, list):
+            return dims
+        shape = InputShape(self._intern_shape(d) for d in dims)
+        return self._shapes.setdefault(shape, shape)
+
     def _parse_operator_event(self, event):
         name = event.get("name")
         if name.startswith("ProfilerStep#"):
             return ProfilerStepEvent(event)
         return OperatorEvent(event)
 
+    def _parse_instant_event(self, event):
+        if event.get("name") == "[memory]":
+            return MemoryEvent(event)
+        return None
+
 
 def get_event_parser(version=None):
     return EventParser()
@@ -0,0 +1,139 @@
+# -------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# --------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+
+from .overall_parser import COSTS_DISPLAY_NAMES
+from .. import consts, utils
+
+logger = utils.get_logger()
+
+# Cost fields shown in the trend. The total communication time is used instead of the exposed part.
+TREND_COST_FIELDS = [(field, name) for field, name in COSTS_DISPLAY_NAMES if field != "exposed_communication_cost"]
+
+
+def get_run_fingerprint(run_dir):
+    """Return the fingerprint of the trace files and the steps config under run_dir, by their names, sizes and
+    modified times. It is cheap enough to check hundreds of runs at every scan."""
+    sha1 = hashlib.sha1()
+    for name in sorted(os.listdir(run_dir)):
+        path = os.path.join(run_dir, name)
+        is_input = name.endswith((consts.TRACE_FILE_SUFFIX, consts.TRACE_GZIP_FILE_SUFFIX)) \
+            or name == consts.STEPS_CONFIG_FILE_NAME
+        if is_input and os.path.isfile(path):
+            stat = os.stat(path)
+            sha1.update("{}:{}:{};".format(name, stat.st_size, stat.st_mtime_ns).encode())
+    return sha1.hexdigest()
+
+
+class RunSummary:
+    """Lightweight summary of a run for the trend across many runs. The costs and the operator durations
+    are per step and averaged over the workers, since the workers' names might differ between runs."""
+
+    def __init__(self, name, run_dir):
+        self.name = name
+        self.run_dir = run_dir
+        self.fingerprint = None
+        self.time = 0  # Last modified time of the trace files, in seconds since epoch.
+        self.workers_count = 0
+        self.steps_count = 0
+        self.avg_costs = {}  # Field of Costs -> average time per step in us.
+        # Operator name -> [self host duration, self device duration] per step in us.
+        # Only the top operators are kept to bound the size.
+        self.ops = {}
+
+    def summarize(self, profiles):
+        """Summarize the processed RunProfileData of all workers, profiles is dict of worker -> RunProfileData."""
+        self.fingerprint = get_run_fingerprint(self.run_dir)
+        self.time = 0
+        self.workers_count = 0
+        self.steps_count = 0
+        self.avg_costs = {field: 0 for field, _ in TREND_COST_FIELDS}
+        ops = {}
+        for data in profiles.values():
+            if data.avg_costs is None or len(data.steps_costs) == 0:
+                continue
+            self.workers_count += 1
+            self.steps_count = max(self.steps_count, len(data.steps_costs))
+            if data.trace_file_path is not None and os.path.isfile(data.trace_file_path):
+                self.time = max(self.time, os.path.getmtime(data.trace_file_path))
+            for field, _ in TREND_COST_FIELDS:
+                self.avg_costs[field] += getattr(data.avg_costs, field)
+            steps_count = len(data.steps_costs)
+            for op in data.op_list_groupby_name:
+                durations = ops.setdefault(op.name, [0, 0])
+                durations[0] += op.self_host_duration / steps_count
+                durations[1] += op.self_device_duration / steps_count
+
+        if self.workers_count == 0:
+            self.ops = {}
+            return
+        for field in self.avg_costs:
+            self.avg_costs[field] = round(self.avg_costs[field] / self.workers_count, 2)
+        # Keep the top operators by either the host or the device duration.
+        names = set()
+        for i in range(2):
+            names.update(sorted(ops, key=lambda name: ops[name][i], reverse=True)[:consts.TREND_SUMMARY_MAX_OPS])
+        self.ops = {name: [round(d / self.workers_count, 2) for d in ops[name]] for name in names}
+
+    def to_dict(self):
+        return {"name": self.name,
+                "run_dir": self.run_dir,
+                "fingerprint": self.fingerprint,
+                "time": self.time,
+                "workers_count": self.workers_count,
+                "steps_count": self.steps_count,
+                "avg_costs": self.avg_costs,
+                "ops": self.ops}
+
+    @staticmethod
+    def from_dict(obj):
+        summary = RunSummary(obj["name"], obj["run_dir"])
+        summary.fingerprint = obj["fingerprint"]
+        summary.time = obj["time"]
+        summary.workers_count = obj["workers_count"]
+        summary.steps_count = obj["steps_count"]
+        summary.avg_costs = obj["avg_costs"]
+        summary.ops = obj["ops"]
+        return summary
+
+
+class SummaryCache:
+    """Persist the RunSummaries as json files under cache_dir, so that the trend of the runs is available
+    without loading them again. A cached summary is only used if the trace files are not changed."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _get_path(self, run_dir):
+        key = hashlib.sha1(os.path.abspath(run_dir).encode()).hexdigest()
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, run_dir):
+        """Return the cached RunSummary of run_dir, or None if not cached or the traces are changed."""
+        path = self._get_path(run_dir)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                summary = RunSummary.from_dict(json.load(f))
+        except Exception as ex:
+            logger.warning("Failed to read the cached summary %s. Exception=%s", path, ex)
+            return None
+        if summary.fingerprint != get_run_fingerprint(run_dir):
+            return None
+        return summary
+
+    def put(self, summary):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._get_path(summary.run_dir)
+            temp_path = path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(summary.to_dict(), f)
+            os.replace(temp_path, path)
+        except Exception as ex:
+            logger.warning("Failed to cache the summary of run %s. Exception=%s", summary.name, ex)
@@ -18,6 +18,8 @@ class Run(object):
         self.name = name
         self.run_dir = run_dir
         self.profiles = OrderedDict()
+        self.step_skew = None
+        self.summary = None  # RunSummary for the trend across runs.
 
     @property
     def workers(self):
@@ -50,13 +52,59 @@ class RunProfile(object):
         self.views = []
         self.has_runtime = False
         self.has_kernel = False
+        self.has_communication = False
         self.has_memcpy_or_memset = False
+        self.has_memory = False
+        self.has_sync = False
+        self.steps_count = 0
+        self.avg_step_time = 0
         self.overview = None
+        self.overview_without_outliers = None  # Overview averaging the steps except outliers, None if no outlier.
+        self.step_stats = None
         self.operation_pie_by_name = None
         self.operation_table_by_name = None
         self.operation_pie_by_name_input = None
         self.operation_table_by_name_input = None
+        self.operation_pie_by_name_module = None
+        self.operation_table_by_name_module = None
+        self.operation_pie_by_name_phase = None
+        self.operation_table_by_name_phase = None
+        self.operation_table_by_step = None  # Step -> operator table grouped by name of the step.
+        self.call_tree = None  # Flat list of call tree nodes indexed by id, the first one is the root.
+        self.flamegraph = None  # metric ("host" or "device") -> folded stacks.
         self.kernel_op_table = None
+        self.kernel_op_table_by_step = None  # Step -> kernel table grouped by name and operator of the step.
+        self.kernel_module_table = None
+        self.kernel_phase_table = None
         self.kernel_pie = None
         self.kernel_table = None
+        self.kernel_family_table = None  # Kernels grouped by the family of the templated kernel names.
+        self.kernel_family_op_table = None  # Kernels grouped by family and operator.
+        self.gpu_metrics = None
+        self.launch = None
+        self.sync = None
+        self.dataloader = None
+        self.findings = None
+        self.optimizer = None
+        self.critical_path = None
+        self.memory_devices = []
+        self.memory_curves = None
+        self.memory_peaks = None
+        self.memory_op_table = None
         self.trace_file_path = None
+        # Raw aggregates kept for comparing runs.
+        self.op_list_groupby_name_input = None
+        self.kernel_list_groupby_name_op = None
+
+    def get_call_subtree(self, node_id=0, depth=1):
+        """Return the call tree node with its descendants expanded to the given depth.
+        Deeper nodes only have their children's ids, so that the frontend could load them lazily."""
+        def expand(node_id, depth):
+            node = dict(self.call_tree[node_id])
+            if depth > 0:
+                node["children"] = [expand(child_id, depth - 1) for child_id in node["children"]]
+            return node
+
+        if node_id < 0 or node_id >= len(self.call_tree):
+            return None
+        return expand(node_id, depth)
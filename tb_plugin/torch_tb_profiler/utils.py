@@ -7,6 +7,7 @@ from __future__ import division
 from __future__ import print_function
 
 import logging
+import os
 
 from . import consts
 
@@ -19,3 +20,70 @@ def get_logger():
 
 def is_chrome_trace_file(path):
     return path.endswith(consts.TRACE_GZIP_FILE_SUFFIX) or path.endswith(consts.TRACE_FILE_SUFFIX)
+
+
+def get_run_dirs(logdir):
+    """Scan logdir, find PyTorch Profiler run directories.
+    A directory is considered to be a run if it contains 1 or more *.pt.trace.json[.gz].
+    E.g. there are 2 runs: run1, run2
+        /run1
+            /[worker1].pt.trace.json.gz
+            /[worker2].pt.trace.json.gz
+        /run2
+            /[worker1].pt.trace.json
+    """
+    logdir = os.path.abspath(logdir)
+    for root, _, files in os.walk(logdir):
+        for file in files:
+            if is_chrome_trace_file(file):
+                run_dir = os.path.abspath(root)
+                if run_dir == logdir:
+                    name = os.path.basename(run_dir)
+                else:
+                    name = os.path.relpath(run_dir, logdir)
+                yield name, run_dir
+                break
+
+
+def downsample_curve(points, max_points):
+    """Reduce a curve of [x, y] points to about max_points points.
+    The points with min and max y in each bucket are kept, so peaks are not lost.
+    """
+    if max_points <= 0 or len(points) <= max_points:
+        return points
+    buckets = max(max_points // 2, 1)
+    bucket_size = (len(points) + buckets - 1) // buckets
+    result = []
+    for start in range(0, len(points), bucket_size):
+        bucket = points[start:start + bucket_size]
+        min_index = min(range(len(bucket)), key=lambda i: bucket[i][1])
+        max_index = max(range(len(bucket)), key=lambda i: bucket[i][1])
+        for i in sorted({min_index, max_index}):
+            result.append(bucket[i])
+    return result
+
+
+def percentile(sorted_values, p):
+    """Return the p-th (0~100) percentile of an ascending sorted list, using linear interpolation."""
+    if len(sorted_values) == 0:
+        return 0
+    k = (len(sorted_values) - 1) * p / 100
+    f = int(k)
+    c = min(f + 1, len(sorted_values) - 1)
+    return sorted_values[f] + (sorted_values[c] - sorted_values[f]) * (k - f)
+
+
+def pearson_correlation(xs, ys):
+    """Return the Pearson correlation coefficient of two equal length lists,
+    or None if there are less than 2 values or either of them is constant."""
+    n = len(xs)
+    if n < 2 or n != len(ys):
+        return None
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    if var_x <= 0 or var_y <= 0:
+        return None
+    return cov / (var_x * var_y) ** 0.5